@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""End-to-end benchmarks of the CLI commands against the stub Kimai server.
+
+Every scenario runs the real click command in-process against a seeded
+dataset and reports the HTTP round trips, wall time and peak memory. Since
+the stub server runs in the same process, its allocations are part of the
+peak memory.
+
+Run from the repository root with ``python -m benchmarks.bench_commands``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Never touch the config of the user running the benchmarks.
+_home = tempfile.mkdtemp(prefix='kimai-bench-')
+os.environ['HOME'] = _home
+os.environ['KIMAI_CONFIG_PATH'] = os.path.join(_home, '.kimai', 'config')
+
+from click.testing import CliRunner  # noqa: E402
+
+from kimai.cli import cli  # noqa: E402
+from kimai.config import config  # noqa: E402
+from kimai.store import get_store  # noqa: E402
+from kimai.transport import reset_transport  # noqa: E402
+from tests.stub_backend import StubBackend, API_KEY, PASSWORD, USER_ID  # noqa: E402
+from tests.stub_server import StubKimaiServer  # noqa: E402
+
+
+def scenarios(server):
+    """Yields the name, setup and arguments of every benchmarked command."""
+
+    def start_with_comment():
+        invoke('start', '-p', '1', '-t', '1')
+        config.set('Comment', 'Benchmarked')
+
+    def new_record():
+        return server.backend.insert(1, 1533459600, 1533463200, 1, 1, '')
+
+    yield 'today', None, lambda: ('today',)
+    yield 'today (cached)', lambda: invoke('today'), lambda: ('today',)
+    yield 'get-current', lambda: invoke('start', '-p', '1', '-t', '1'), lambda: ('get-current',)
+    yield 'stop', start_with_comment, lambda: ('stop',)
+    yield 'record add', None, lambda: (
+        'record', 'add', '-s', '2018-08-05 10:00', '-e', '2018-08-05 11:00', '-p', '1', '-t', '1', '-c', 'x'
+    )
+    yield 'record edit', None, lambda: ('record', 'edit', '-i', str(new_record()), '-c', 'Edited')
+    yield 'record delete (10)', None, lambda: ('record', 'delete') + tuple(
+        arg for _ in range(10) for arg in ('-i', str(new_record()))
+    )
+    yield 'report (10 years)', None, lambda: (
+        'report', '--from', '10 years ago', '--group-by', 'customer,project'
+    )
+    yield 'projects download', None, lambda: ('projects', 'download')
+    yield 'tasks download', None, lambda: ('tasks', 'download')
+    yield 'configure', None, lambda: ('configure', '-k', server.url, '-u', 'user', '-p', PASSWORD)
+
+
+def invoke(*args):
+    result = CliRunner().invoke(cli, list(args), catch_exceptions=False)
+    if result.exit_code != 0:
+        raise RuntimeError(result.output)
+
+
+def measure(server, setup, arguments):
+    get_store().invalidate()
+    reset_transport()
+
+    if setup is not None:
+        setup()
+
+    args = arguments()
+    server.reset_counters()
+    tracemalloc.start()
+
+    started = time.perf_counter()
+    invoke(*args)
+    elapsed = time.perf_counter() - started
+
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return server.requests, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of latency per request')
+    args = parser.parse_args()
+
+    backend = StubBackend(projects=args.projects, records=args.records)
+
+    with StubKimaiServer.from_service_map(backend, latency=args.latency) as server:
+        config.set('KimaiUrl', server.url)
+        config.set('ApiKey', API_KEY)
+        config.set('User', {'Id': str(USER_ID), 'ApiKey': API_KEY})
+
+        # Warm up so that one-off imports are not attributed to the first command.
+        measure(server, None, lambda: ('today',))
+
+        print('%-20s %12s %10s %12s' % ('command', 'round trips', 'wall ms', 'peak KiB'))
+        for name, setup, arguments in scenarios(server):
+            requests, elapsed, peak = measure(server, setup, arguments)
+            print('%-20s %12d %10.1f %12.1f' % (name, requests, elapsed * 1000, peak / 1024))
+
+
+if __name__ == '__main__':
+    main()
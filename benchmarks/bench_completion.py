@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Per-keystroke latency of the fuzzy completion against large catalogs.
+
+Types a query one character at a time and reports the slowest and the mean
+keystroke for the completion index and, if it is installed, for a plain
+fuzzyfinder scan like the CLI used before.
+
+Run from the repository root with ``python -m benchmarks.bench_completion``.
+"""
+
+import time
+
+from kimai.completion import CompletionIndex
+
+SIZES = [1000, 5000, 20000]
+QUERY = '(customer 42) project 1'
+
+
+def catalog(size):
+    return ['(Customer %d) Project %d' % (i % 97, i) for i in range(size)]
+
+
+def keystrokes(search):
+    timings = []
+
+    for end in range(1, len(QUERY) + 1):
+        started = time.perf_counter()
+        list(search(QUERY[:end]))
+        timings.append(time.perf_counter() - started)
+
+    return max(timings), sum(timings) / len(timings)
+
+
+def main():
+    try:
+        from fuzzyfinder import fuzzyfinder
+    except ImportError:
+        fuzzyfinder = None
+
+    print('%-8s %-12s %10s %10s' % ('names', 'completer', 'max ms', 'mean ms'))
+
+    for size in SIZES:
+        names = catalog(size)
+        runs = [('index', CompletionIndex(names).search)]
+
+        if fuzzyfinder is not None:
+            runs.append(('fuzzyfinder', lambda query: fuzzyfinder(query, names)))
+
+        for name, search in runs:
+            slowest, mean = keystrokes(search)
+            print('%-8d %-12s %10.2f %10.2f' % (size, name, slowest * 1000, mean * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""Throughput of `kimai.dates.parse` over a mix of date expressions.
+
+Parses 100k expressions as a bulk import would: ISO dates, times of day and
+durations relative to the start of every row. The same expressions are
+parsed like before, with a new parsedatetime calendar for every call, on a
+sample and extrapolated, since that takes minutes.
+
+Run from the repository root with ``python -m benchmarks.bench_dates``.
+"""
+
+import argparse
+import time
+import warnings
+
+from datetime import datetime, timedelta
+
+from kimai import dates
+
+DURATIONS = ['+1 hour', '+90 minutes', '+2 hours', '+15 minutes']
+
+
+def expressions(count):
+    start = datetime(2018, 1, 1, 8)
+
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            yield (start + timedelta(minutes=15 * i)).strftime('%Y-%m-%d %H:%M'), None
+        elif kind == 1:
+            yield '%d:%02d' % (8 + i % 10, 15 * (i % 4)), start
+        else:
+            # Imports usually start on the quarter hour, so the same few
+            # starts come up over and over.
+            yield DURATIONS[i % len(DURATIONS)], start + timedelta(minutes=15 * (i % 96))
+
+
+def parse_uncached(expression, relative_date=None):
+    import parsedatetime
+
+    struct, status = parsedatetime.Calendar().parse(expression, relative_date)
+    return datetime(*struct[:6]) if status else None
+
+
+def measure(parse, items):
+    started = time.perf_counter()
+    for expression, relative_date in items:
+        parse(expression, relative_date)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--sample', type=int, default=2000)
+    args = parser.parse_args()
+
+    items = list(expressions(args.count))
+    # parsedatetime warns about its deprecated flag style on every call.
+    warnings.simplefilter('ignore')
+
+    print('%-12s %12s %12s' % ('', 'total s', 'us/parse'))
+
+    elapsed = measure(parse_uncached, items[:args.sample]) * len(items) / args.sample
+    print('%-12s %12.2f %12.1f  (extrapolated)' % ('before', elapsed, elapsed / len(items) * 1e6))
+
+    dates._parse.cache_clear()
+    elapsed = measure(dates.parse, items)
+    print('%-12s %12.2f %12.1f' % ('parse', elapsed, elapsed / len(items) * 1e6))
+    print(dates._parse.cache_info())
+
+
+if __name__ == '__main__':
+    main()
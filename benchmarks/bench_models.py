@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""Memory footprint and speed of records created from raw timesheet items.
+
+Converts the items of a seeded dataset into `Record` objects, into records
+as they were built before the models had slots and shared their projects,
+tasks and customers, and into a columnar `RecordBatch`. Keeps the result
+alive and reports the memory it takes per record, measured with
+tracemalloc. The raw items are created before measuring, so only the
+converted records (and whatever they share) are counted. Summing up the
+durations by project is timed for all of them.
+
+Run from the repository root with ``python -m benchmarks.bench_models``.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta
+
+from kimai.columnar import RecordBatch, numpy
+from kimai.models import create_record
+from tests.stub_backend import StubBackend
+
+
+class BaselineEntity(object):
+    """A project, task or customer without slots, one per record."""
+
+    def __init__(self, entity_id, name):
+        self.id = entity_id
+        self.name = name
+
+
+class BaselineRecord(object):
+    """`Record` as it was before it had slots."""
+
+    def __init__(self, record_id, start=None, end=None, project=None, task=None,
+                 customer=None, comment=None, duration=None, formatted_duration=None, user_id=None):
+        start = datetime.fromtimestamp(int(start))
+        end = datetime.fromtimestamp(int(end)) if end and end != '0' else None
+
+        if duration is not None:
+            duration = timedelta(seconds=int(duration))
+
+        if not duration and not end:
+            duration = datetime.now() - start
+
+        self.id = record_id
+        self.customer = customer
+        self.task = task
+        self.project = project
+        self.end = end
+        self.start = start
+        self.comment = comment
+        self.duration = duration
+        self.formatted_duration = formatted_duration
+        self.user_id = user_id
+
+
+def create_baseline_record(data):
+    return BaselineRecord(
+        data['timeEntryID'],
+        start=data['start'],
+        end=data['end'],
+        duration=data['duration'],
+        formatted_duration=data.get('formattedDuration'),
+        comment=data['comment'],
+        customer=BaselineEntity(data['customerID'], data['customerName']),
+        project=BaselineEntity(data['projectID'], data['projectName']),
+        task=BaselineEntity(data['activityID'], data['activityName']),
+        user_id=data['userID']
+    )
+
+
+def group_records(records):
+    totals = {}
+    for record in records:
+        totals[record.project.name] = totals.get(record.project.name, 0) + record.duration.total_seconds()
+    return totals
+
+
+def measure(name, convert, group, items):
+    gc.collect()
+    tracemalloc.start()
+    converted = convert(items)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    convert(items)
+    converting = time.perf_counter() - started
+
+    started = time.perf_counter()
+    group(converted)
+    grouping = time.perf_counter() - started
+
+    print('%-20s %10.1f %10.0f %12.0f %12.0f' % (
+        name, size / 1024 / 1024, size / len(items), converting * 1000, grouping * 1000
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--projects', type=int, default=2000)
+    args = parser.parse_args()
+
+    backend = StubBackend(projects=args.projects, records=args.records)
+    items = [backend.item(backend.rows[record_id]) for _, record_id in backend.order]
+
+    print('%-20s %10s %10s %12s %12s' % ('', 'MiB', 'B/record', 'convert ms', 'group ms'))
+    measure('Record (baseline)', lambda items: [create_baseline_record(i) for i in items], group_records, items)
+    measure('Record', lambda items: [create_record(i) for i in items], group_records, items)
+    measure(
+        'RecordBatch' + (' (numpy)' if numpy() else ''),
+        RecordBatch.from_items,
+        lambda batch: batch.group_by(['project']),
+        items,
+    )
+
+
+if __name__ == '__main__':
+    main()
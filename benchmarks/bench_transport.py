@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""Compares one-connection-per-call requests with the pooled transport.
+
+Run from the repository root with ``python -m benchmarks.bench_transport``.
+"""
+
+import time
+
+import requests
+
+from kimai.transport import Transport
+from tests.stub_server import StubKimaiServer, success
+
+CALLS = 200
+# Roughly what a TLS handshake to a nearby server costs.
+HANDSHAKE_LATENCY = 0.005
+PAYLOAD = '{"jsonrpc":"2.0", "method": "getTimesheetRecord", "params": ["key", "1"], "id": 1}'
+
+
+def run(server, post):
+    server.reset_counters()
+    url = '%s/core/json.php' % server.url
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        post(url, PAYLOAD)
+    elapsed = time.perf_counter() - started
+
+    return server.connections, elapsed
+
+
+def main():
+    handlers = {'getTimesheetRecord': lambda api_key, record_id: success([{'timeEntryID': record_id}])}
+
+    with StubKimaiServer(handlers, connect_latency=HANDSHAKE_LATENCY) as server:
+        transport = Transport()
+
+        results = [
+            ('requests.post', run(server, lambda url, data: requests.post(url, data=data))),
+            ('pooled session', run(server, transport.post)),
+        ]
+
+        transport.close()
+
+    print('%d calls per run' % CALLS)
+    for name, (connections, elapsed) in results:
+        print('%-16s %5d connections %8.1f ms' % (name, connections, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,13 @@
 autoload -Uz bashcompinit
 bashcompinit -i
 
+# Completions are served by the lightweight kimai-complete entry point, which
+# answers from a precomputed file instead of running the whole CLI.
 _kimai_completion() {
+    local IFS=$'\n'
     COMPREPLY=( $( env COMP_WORDS="${COMP_WORDS[*]}" \
                    COMP_CWORD=$COMP_CWORD \
-                   _KIMAI_COMPLETE=complete $1 ) )
+                   kimai-complete ) )
     return 0
 }
 
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+# Imported first so that tracing can tell how long the imports took.
+from . import trace  # noqa: F401
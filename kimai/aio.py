@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .config import config
+from .kimai import (
+    KimaiResponse, active_item, active_recording_payload, add_payload, cached_user_id,
+    delete_payload, forget_current, invalidate_store, record_payload, remember_current,
+    remember_user_id, start_payload, stop_payload, timesheet_payload, update_payload,
+    user_id_from_responses, user_payloads,
+)
+from .models import create_record
+from .transport import Transport, api_url, DEFAULT_TIMEOUT
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncKimaiClient(object):
+    """Asyncio counterpart of the request functions in `kimai.kimai`.
+
+    Payloads and responses are the same as for the synchronous functions.
+    The requests themselves run on a small thread pool over one pooled
+    session, and a semaphore keeps at most `concurrency` of them in flight,
+    so callers can gather as many calls as they like:
+
+        async with AsyncKimaiClient() as client:
+            records = await asyncio.gather(*map(client.get_single_record, ids))
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, transport=None):
+        self.concurrency = concurrency
+        self._owns_transport = transport is None
+
+        # The pool holds a connection for every request that may be in flight.
+        self.transport = transport or Transport(
+            pool_size=concurrency,
+            timeout=config.get('Timeout', DEFAULT_TIMEOUT),
+            compress=config.get('Compression', True),
+        )
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        # Created on first use so that it belongs to the running event loop.
+        self._semaphore = None
+
+    async def send_request(self, payload):
+        """Sends the request described in the payload to the Kimai API."""
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        data = payload.build()
+        loop = asyncio.get_event_loop()
+
+        async with self._semaphore:
+            response = await loop.run_in_executor(self._executor, self.transport.post, api_url(), data)
+
+        invalidate_store([payload])
+
+        return KimaiResponse(response)
+
+    async def get_timesheet(self, start_date=0, end_date=0, limit=0):
+        """Returns all time sheets for a user"""
+
+        response = await self.send_request(timesheet_payload(start_date, end_date, limit))
+
+        return [create_record(r) for r in response.items]
+
+    async def get_single_record(self, record_id):
+        """Retrieves a single record from Kimai"""
+
+        response = await self.send_request(record_payload(record_id))
+
+        if not response.successful:
+            raise KeyError('No record exists for id %s' % record_id)
+
+        return create_record(response.items[0])
+
+    async def get_current(self):
+        """Returns the currently running record if there is any."""
+
+        item = active_item(await self.send_request(active_recording_payload()))
+        remember_current(item)
+
+        return create_record(item) if item else None
+
+    async def current_user_id(self):
+        """Returns the id of the current user, see `kimai.current_user_id`."""
+
+        user_id = cached_user_id()
+
+        if user_id is None:
+            users, timesheet = await asyncio.gather(*map(self.send_request, user_payloads()))
+            user_id = user_id_from_responses(users, timesheet)
+            remember_user_id(user_id)
+
+        return user_id
+
+    async def authorize_user(self, record_id):
+        """Checks that the current user may edit the record (see
+        `kimai.authorize_user`) and returns it."""
+
+        record, user_id = await asyncio.gather(self.get_single_record(record_id), self.current_user_id())
+
+        if user_id is None or record.user_id != user_id:
+            raise RuntimeError('You are not authorized to edit this record')
+
+        return record
+
+    async def add_record(self, start, end, project, task, comment=''):
+        """Add a new record to Kimai"""
+        return await self.send_request(add_payload(start, end, project, task, comment))
+
+    async def edit_record(self, record_id, start=None, end=None, comment=None, project_id=None, task_id=None):
+        record = await self.authorize_user(record_id)
+
+        return await self.send_request(update_payload(record, start, end, comment, project_id, task_id))
+
+    async def delete_record(self, id):
+        """Delete a record by its id. You can only delete your own records."""
+        await self.authorize_user(id)
+        return await self.send_request(delete_payload(id))
+
+    async def start_recording(self, task_id, project_id):
+        """Starts a new recording for the provided task and project."""
+
+        response = await self.send_request(start_payload(task_id, project_id))
+
+        if response.successful:
+            items = response.items or [{}]
+            if 'id' in items[0]:
+                config.set('CurrentEntry', str(items[0]['id']))
+                forget_current()
+            else:
+                await self.get_current()
+
+        return response
+
+    async def stop_recording(self):
+        """Stops the running record if there is one and saves the comment the
+        user entered for it, see `kimai.stop_recording`."""
+
+        time_entry_id = config.get('CurrentEntry')
+
+        if time_entry_id is not None:
+            record = await self.authorize_user(time_entry_id)
+        else:
+            record = await self.get_current()
+
+            if record is None:
+                return None
+
+        response = await self.send_request(stop_payload(record.id))
+
+        if response.successful:
+            comment = config.get('Comment')
+
+            if comment:
+                end = datetime.now().replace(microsecond=0)
+                update = await self.send_request(update_payload(record, end=end, comment=comment))
+
+                if update.successful:
+                    config.delete('Comment')
+
+            remember_current(None)
+
+        return response
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+        if self._owns_transport:
+            self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
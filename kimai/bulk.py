@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from .kimai import KimaiResponse
+
+
+DEFAULT_WORKERS = 4
+
+# Records per second. Kimai is usually a small PHP install, so bulk runs
+# should not hammer it.
+DEFAULT_RATE = 20
+
+# Records handled by a single worker at once, i.e. per batch request.
+CHUNK_SIZE = 20
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket limiting how fast work may be started.
+
+    The bucket fills up with `rate` tokens per second and holds at most
+    `capacity` of them. `acquire` blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+
+                wait = (tokens - self.tokens) / self.rate
+
+            self._sleep(wait)
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_bulk(operation, record_ids, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+             chunk_size=CHUNK_SIZE, progress=None):
+    """Applies a bulk operation like `kimai.delete_records` to all record ids.
+
+    The ids are split into chunks that a pool of workers hands to the
+    operation, which has to return a dict of responses by id. Before a chunk
+    is started it takes one token per record from a bucket shared by all
+    workers, so that no more than `rate` records per second are processed
+    (a rate of 0 disables the limit). `progress` is called from the calling
+    thread with the number of records every time a chunk is done.
+
+    Returns the responses by record id in the order of the ids. If a chunk
+    fails as a whole, e.g. because the connection dropped, all of its ids
+    get a failed response with the error.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    record_ids = list(dict.fromkeys(record_ids))
+    bucket = TokenBucket(rate, max(rate, chunk_size)) if rate else None
+
+    def run_chunk(chunk):
+        if bucket is not None:
+            bucket.acquire(len(chunk))
+        return operation(chunk)
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_chunk, c): c for c in chunked(record_ids, chunk_size)}
+
+        for future in as_completed(futures):
+            chunk = futures[future]
+
+            try:
+                results.update(future.result())
+            except Exception as e:
+                # Whatever went wrong only affects the records of this chunk.
+                results.update((i, KimaiResponse.failure(str(e))) for i in chunk)
+
+            if progress is not None:
+                progress(len(chunk))
+
+    return {i: results[i] for i in record_ids}
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+import time
+
+from collections.abc import Mapping
+
+from . import trace
+from .config import config, data_path
+
+
+PROJECTS = 'Projects'
+TASKS = 'Tasks'
+
+# Seconds after which downloaded projects and tasks are refreshed.
+DEFAULT_TTL = 24 * 60 * 60
+
+# Seconds a command waits for a background refresh when it ends.
+REFRESH_TIMEOUT = 2
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS entries (
+        collection TEXT NOT NULL,
+        name TEXT NOT NULL,
+        id NOT NULL,
+        PRIMARY KEY (collection, name)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS fetches (
+        collection TEXT PRIMARY KEY,
+        fetched_at REAL NOT NULL
+    );
+'''
+
+
+def project_tasks(project_id):
+    """Returns the name of the collection with the tasks of a project."""
+    return '%s/%s' % (TASKS, project_id)
+
+
+def project_entries(projects):
+    """Maps the projects returned by Kimai to their ids by name."""
+    return {'(%s) %s' % (p['customerName'], p['name']): p['projectID'] for p in projects}
+
+
+def task_entries(tasks):
+    """Maps the tasks returned by Kimai to their ids by name."""
+    return {t['name']: t['activityID'] for t in tasks}
+
+
+class Catalog(object):
+    """Local cache of the project and task catalogs used for autocompletion
+    and name lookup.
+
+    The catalogs used to live in the YAML config, which meant parsing them on
+    every start. Here they are kept in SQLite, indexed by collection and name,
+    and only read by the commands that actually need them.
+
+    Every collection remembers when it was last fetched from Kimai, so that
+    it can be refreshed once it is older than a TTL. Refreshes may run in a
+    background thread, so a lock serializes access to the connection.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.modified = False
+        self._lock = threading.RLock()
+
+    def replace(self, collection, entries, fetched_at=None):
+        """Replaces the whole collection with the given mapping of names to ids."""
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM entries WHERE collection = ?', (collection,))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO entries (collection, name, id) VALUES (?, ?, ?)',
+                ((collection, name, entry_id) for name, entry_id in entries.items())
+            )
+            self._fetched(collection, fetched_at)
+
+        self.modified = True
+
+    def update(self, collection, entries):
+        """Makes the collection match the given mapping of names to ids, but
+        only writes the entries that were added, changed or removed. Returns
+        how many that were."""
+        with self._lock, self.connection:
+            current = dict(self.connection.execute(
+                'SELECT name, id FROM entries WHERE collection = ?', (collection,)
+            ))
+
+            removed = [(collection, name) for name in current if name not in entries]
+            changed = [
+                (collection, name, entry_id) for name, entry_id in entries.items()
+                if name not in current or current[name] != entry_id
+            ]
+
+            self.connection.executemany('DELETE FROM entries WHERE collection = ? AND name = ?', removed)
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO entries (collection, name, id) VALUES (?, ?, ?)', changed
+            )
+            self._fetched(collection)
+
+        if removed or changed:
+            self.modified = True
+
+        return len(removed) + len(changed)
+
+    def fetched_at(self, collection):
+        """Returns when the collection was last fetched or None if never."""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT fetched_at FROM fetches WHERE collection = ?', (collection,)
+            ).fetchone()
+
+        return None if row is None else row[0]
+
+    def is_stale(self, collection, ttl=DEFAULT_TTL):
+        """Whether the collection was fetched, but longer than `ttl` seconds ago."""
+        fetched_at = self.fetched_at(collection)
+        return fetched_at is not None and time.time() - fetched_at >= ttl
+
+    def collection(self, collection):
+        """Returns a read-only mapping of names to ids for the collection."""
+        return CatalogCollection(self.connection, collection, self._lock)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def _fetched(self, collection, fetched_at=None):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO fetches (collection, fetched_at) VALUES (?, ?)',
+            (collection, time.time() if fetched_at is None else fetched_at)
+        )
+
+
+class CatalogCollection(Mapping):
+    """A mapping of names to ids that is answered by the catalog's index
+    instead of being loaded into memory."""
+
+    def __init__(self, connection, collection, lock):
+        self.connection = connection
+        self.collection = collection
+        self._lock = lock
+
+    def __getitem__(self, name):
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT id FROM entries WHERE collection = ? AND name = ?', (self.collection, name)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(name)
+
+        return row[0]
+
+    def __iter__(self):
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT name FROM entries WHERE collection = ? ORDER BY name', (self.collection,)
+            ).fetchall()
+        return (name for name, in rows)
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM entries WHERE collection = ?', (self.collection,)
+            ).fetchone()[0]
+
+    def items(self):
+        """Returns all `(name, id)` pairs ordered by name, read with a single
+        query instead of one lookup per name."""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT name, id FROM entries WHERE collection = ? ORDER BY name', (self.collection,)
+            ).fetchall()
+
+    def values(self):
+        return [entry_id for _, entry_id in self.items()]
+
+
+def migrate_from_config(catalog, config):
+    """Moves catalogs that older versions stored in the config into the catalog."""
+    for collection in (PROJECTS, TASKS):
+        entries = config.get(collection)
+
+        if entries is not None:
+            # We don't know how old they are, so they are refreshed soon.
+            catalog.replace(collection, entries, fetched_at=0)
+            config.delete(collection)
+
+
+_catalog = None
+
+
+def get_catalog():
+    """Returns the catalog of the configured user, opening it on first use."""
+    global _catalog
+
+    if _catalog is None:
+        _catalog = Catalog(data_path('catalog.db'))
+        migrate_from_config(_catalog, config)
+
+    return _catalog
+
+
+def tasks_of_project(project_id, ttl=None):
+    """Returns the tasks of a project by name. They are fetched the first
+    time they are needed and again once they are older than the TTL."""
+    from . import kimai
+
+    catalog = get_catalog()
+    collection = project_tasks(project_id)
+    ttl = config.get('CatalogTTL', DEFAULT_TTL) if ttl is None else ttl
+
+    if catalog.fetched_at(collection) is None or catalog.is_stale(collection, ttl):
+        catalog.update(collection, task_entries(kimai.get_tasks(project_id)))
+
+    return catalog.collection(collection)
+
+
+_refresh = None
+
+
+def refresh_in_background(ttl=None):
+    """Starts refreshing projects and tasks in a background thread if they
+    are older than the TTL. Catalogs that were never downloaded are left
+    alone, `kimai configure` does that.
+
+    The command goes on with the entries it has and should wait for the
+    refresh before it exits, see `wait_for_refresh`. The thread has its own
+    connection to Kimai and does not touch the request scope or the config
+    of the command."""
+    global _refresh
+
+    catalog = get_catalog()
+    ttl = config.get('CatalogTTL', DEFAULT_TTL) if ttl is None else ttl
+
+    if _refresh is not None or not any(catalog.is_stale(c, ttl) for c in (PROJECTS, TASKS)):
+        return None
+
+    _refresh = threading.Thread(target=_refresh_quietly, args=(catalog,), daemon=True)
+    _refresh.start()
+
+    return _refresh
+
+
+def wait_for_refresh(timeout=None):
+    if _refresh is not None:
+        _refresh.join(timeout)
+
+
+def _refresh_quietly(catalog):
+    from . import kimai
+    from .transport import Transport, api_url, DEFAULT_TIMEOUT
+
+    # The command waits for the refresh at most REFRESH_TIMEOUT seconds.
+    transport = Transport(pool_size=1, timeout=min(config.get('Timeout', DEFAULT_TIMEOUT), REFRESH_TIMEOUT),
+                          compress=config.get('Compression', True))
+
+    try:
+        with trace.span('catalog refresh'):
+            projects, tasks = (
+                kimai.KimaiResponse(transport.post(api_url(), kimai.RequestPayload(action).build())).items
+                for action in (kimai.RequestAction.GET_PROJECTS, kimai.RequestAction.GET_TASKS)
+            )
+            catalog.update(PROJECTS, project_entries(projects))
+            catalog.update(TASKS, task_entries(tasks))
+    except Exception:
+        # Nothing the user asked for depends on it. The fetch time stays
+        # as it is, so the next command tries again.
+        pass
+    finally:
+        transport.close()
+
+
+def was_modified():
+    """Whether the catalog was changed during this invocation."""
+    return _catalog is not None and _catalog.modified
+
+
+def reset_catalog():
+    global _catalog, _refresh
+
+    wait_for_refresh()
+    _refresh = None
+
+    if _catalog is not None:
+        _catalog.close()
+        _catalog = None
@@ -2,20 +2,40 @@
 
 import atexit
 import click
-import tabulate
 import datetime
+import functools
+import itertools
+import sys
 
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import Completer, Completion
-from fuzzyfinder import fuzzyfinder
-
-from . import kimai, dates
+from . import kimai, dates, complete, trace
 from . import favorites as fav
+from .catalog import get_catalog, project_entries, task_entries, PROJECTS, TASKS
 from .models import Record
 from .config import config, flush_config
+from .__version__ import __version__
+
+# Only the modules needed by every command are imported up here. Everything
+# else (prompt_toolkit, requests, csv, ...) is imported by the commands
+# that need it, because `kimai` is often called from shell prompts and status
+# lines where startup time matters most.
+
+
+def on_exit():
+    """Flushes changes to the config and keeps the shell completion file
+    up to date with them."""
+    with trace.span('exit'):
+        completions_changed = complete.sources_changed(config)
+
+        flush_config(config)
 
-# Ensure that the config gets flushed at the end of each execution.
-atexit.register(flush_config, config)
+        if completions_changed:
+            complete.write_completions()
+
+    trace.finish()
+
+
+# Ensure that changes to the config get flushed at the end of each execution.
+atexit.register(on_exit)
 
 
 def print_success(message):
@@ -28,46 +48,82 @@ def print_error(message):
     click.echo(click.style(message, fg='red'), err=True)
 
 
-def print_table(rows, columns=None):
-    """Print a table to the console."""
+def output_option(command):
+    """Lets a listing command write its rows as a table or in a machine
+    readable format."""
+    from .output import FORMATS
 
-    if columns is not None:
-        rows = map(lambda r: {k: r[k] for k in columns if k in r}, rows)
+    return click.option('--output', '-o', type=click.Choice(FORMATS), default='table', show_default=True,
+                        help='Output format')(command)
 
-    click.echo(tabulate.tabulate(rows, headers='keys', tablefmt="grid"))
 
+def print_table(rows, columns=None, output='table'):
+    """Print a list of dicts to the console. Without columns, the keys of
+    the first row are used."""
+    from .output import write_rows
 
-def print_records(records):
-    """Prints a list of record as a table"""
+    rows = iter(rows)
+
+    if columns is None:
+        first = next(rows, None)
+        if first is None:
+            return
+        columns = list(first)
+        rows = itertools.chain([first], rows)
+
+    write_rows(([r.get(k) for k in columns] for r in rows), columns, output)
 
-    def extract_record_row(record: Record):
-        if record.end:
-            end = record.end.strftime('%H:%M:%S')
-        else:
-            end = '-'
 
-        duration = ':'.join(str(record.duration).split(':')[:2])
+def print_records(records, output='table'):
+    """Prints records as they are produced"""
+    from .output import write_rows
 
+    def extract_record_row(record: Record):
         return [
             record.id,
-            record.start.strftime('%H:%M:%S'),
-            end,
-            duration,
+            record.start,
+            record.end,
+            record.duration,
             record.customer,
             record.project,
             record.task,
             record.comment
         ]
 
+    def display_record_row(row):
+        record_id, start, end, duration, *names = row
+        return [
+            record_id,
+            start.strftime('%H:%M:%S'),
+            end.strftime('%H:%M:%S') if end else '-',
+            ':'.join(str(duration).split(':')[:2]),
+        ] + names
+
     headers = ['Id', 'Start Time', 'End Time', 'Duration', 'Customer', 'Project', 'Task', 'Comment']
-    rows = [extract_record_row(r) for r in records]
 
-    table = tabulate.tabulate(rows, headers, tablefmt="grid")
-    click.echo(table)
+    write_rows(map(extract_record_row, records), headers, output, display=display_record_row)
+
+
+def prompt_with_autocomplete(prompt_title, collection_name, resolve_title=True, project_id=None):
+    """Prompts for a name of the collection with fuzzy autocompletion. Tasks
+    are limited to those of the project if one is given."""
+    from prompt_toolkit import prompt
+    from .catalog import tasks_of_project
+    from .completion import fuzzy_completer
+
+    cached_collection = None
 
+    if collection_name == TASKS and project_id is not None:
+        try:
+            cached_collection = tasks_of_project(project_id)
+        except Exception as e:
+            click.echo('Could not fetch the tasks of project %s: %s' % (project_id, e), err=True)
 
-def prompt_with_autocomplete(prompt_title, collection_name, resolve_title=True):
-    cached_collection = config.get(collection_name, {})
+    if not cached_collection:
+        if collection_name in (PROJECTS, TASKS):
+            cached_collection = get_catalog().collection(collection_name)
+        else:
+            cached_collection = config.get(collection_name, {})
 
     if not cached_collection:
         click.echo('Falling back to ids. If you want to have fuzzy '
@@ -76,9 +132,10 @@ def prompt_with_autocomplete(prompt_title, collection_name, resolve_title=True):
         return prompt(prompt_title)
 
     title = None
+    completer = fuzzy_completer(cached_collection.keys())
 
     while title not in cached_collection:
-        title = prompt(prompt_title, completer=FuzzyCompleter(cached_collection.keys()))
+        title = prompt(prompt_title, completer=completer)
 
     if resolve_title:
         return cached_collection[title]
@@ -87,9 +144,103 @@ def prompt_with_autocomplete(prompt_title, collection_name, resolve_title=True):
 
 
 @click.group()
-@click.version_option()
-def cli():
-    pass
+@click.version_option(version=__version__)
+@click.option('--trace', 'tracing', is_flag=True, envvar='KIMAI_TRACE',
+              help='Time every phase and request of the command')
+@click.option('--trace-format', type=click.Choice(trace.FORMATS), default='tree', show_default=True,
+              envvar='KIMAI_TRACE_FORMAT')
+@click.option('--trace-file', type=click.Path(dir_okay=False), envvar='KIMAI_TRACE_FILE',
+              help='Write the trace to this file instead of stderr')
+@click.pass_context
+def cli(ctx, tracing, trace_format, trace_file):
+    if tracing:
+        trace.start('kimai %s' % ctx.invoked_subcommand, trace_format, trace_file)
+        ctx.with_resource(trace.span('command'))
+
+    # Commands often need the same record more than once, e.g. to check
+    # permissions and then to edit it. Fetch it only once per invocation.
+    ctx.with_resource(kimai.request_scope())
+
+    if ctx.invoked_subcommand != 'sync':
+        from . import journal
+
+        # Operations saved while Kimai was unreachable are sent along with
+        # the next command that finds it reachable again.
+        if journal.replay_due():
+            print_replay(journal.replay(), quiet=True)
+
+
+def refreshes_catalog(command):
+    """Refreshes stale projects and tasks in the background while the
+    command talks to Kimai anyway, which keeps autocompletion current
+    without making the user wait for it. When the command ends it waits at
+    most `catalog.REFRESH_TIMEOUT` seconds for the refresh to finish."""
+
+    @functools.wraps(command)
+    def refreshing_command(*args, **kwargs):
+        from . import journal
+        from .catalog import refresh_in_background, wait_for_refresh, REFRESH_TIMEOUT
+
+        # Not worth a connection while Kimai is known to be unreachable.
+        if not kwargs.get('offline') and not journal.get_journal().has_entries() \
+                and config.get('JournalRetry') is None and refresh_in_background() is not None:
+            click.get_current_context().call_on_close(lambda: wait_for_refresh(REFRESH_TIMEOUT))
+
+        return command(*args, **kwargs)
+
+    return refreshing_command
+
+
+def offline_option(command):
+    return click.option('--offline', is_flag=True,
+                        help='Save to the offline journal instead of sending it to Kimai')(command)
+
+
+# Returned by `send_or_journal` for operations saved to the offline journal.
+JOURNALED = object()
+
+
+def send_or_journal(offline, send, op, **values):
+    """Runs `send` unless we are offline. The operation is saved to the
+    offline journal instead if requested, if Kimai can't be reached or if
+    the journal still has entries that have to be sent first. Returns what
+    `send` returned or `JOURNALED` if the operation was journaled."""
+    from . import journal
+
+    log = journal.get_journal()
+
+    if not offline and not log.has_entries():
+        try:
+            return send()
+        except Exception as e:
+            if not journal.is_offline_error(e):
+                raise
+
+    log.append(op, **values)
+    print_success('Saved to the offline journal. It is sent with the next command or by \'kimai sync\'.')
+
+    return JOURNALED
+
+
+def print_replay(result, quiet=False):
+    for operation, error in result.rejected:
+        print_error('%s could not be sent: %s' % (operation, error))
+
+    if result.error and not quiet:
+        print_error('%s, %d entries are left in the offline journal.' % (result.error, result.remaining))
+
+    if result.applied or result.rejected or not quiet:
+        click.echo('Synced %d, rejected %d, %d left in the offline journal' % (
+            len(result.applied), len(result.rejected), result.remaining
+        ), err=quiet)
+
+
+@cli.command('sync')
+def sync():
+    """Send the operations saved while Kimai was unreachable"""
+    from . import journal
+
+    print_replay(journal.replay())
 
 
 @cli.command()
@@ -109,17 +260,24 @@ def configure(ctx, kimai_url, username, password):
 
     config.set('ApiKey', r.api_key)
 
-    ctx.invoke(download_projects)
-    ctx.invoke(download_tasks)
+    # Resolved once here so that checking permissions on a record does not
+    # need to look up the current user every time.
+    if kimai.current_user_id(refresh=True) is None:
+        print_error('Could not determine your user id. It will be looked up again when you edit a record.')
+
+    remote_projects, remote_tasks = kimai.get_projects_and_tasks()
+    save_projects(remote_projects)
+    save_tasks(remote_tasks)
 
     print_success('Configuration complete')
 
 
 @cli.command('stop')
+@offline_option
 @click.pass_context
-def stop(ctx):
+def stop(ctx, offline):
     """Stop the currently running record"""
-    ctx.invoke(stop_record)
+    ctx.invoke(stop_record, offline=offline)
 
 
 @cli.command('start')
@@ -127,10 +285,12 @@ def stop(ctx):
 @click.option('--project-id', '-p', type=int)
 @click.option('--favorite', '-f', type=str)
 @click.option('--comment', '-c', type=str)
+@offline_option
 @click.pass_context
-def start(ctx, task_id, project_id, favorite, comment):
+def start(ctx, task_id, project_id, favorite, comment, offline):
     """Start a new record"""
-    ctx.invoke(start_record, task_id=task_id, project_id=project_id, favorite=favorite, comment=comment)
+    ctx.invoke(start_record, task_id=task_id, project_id=project_id, favorite=favorite, comment=comment,
+               offline=offline)
 
 
 @cli.command('comment')
@@ -138,9 +298,12 @@ def start(ctx, task_id, project_id, favorite, comment):
               type=str, help='Providing a comment through this option overrides any existing comment')
 def comment(comment):
     """Comment on the currently running record"""
+    from .journal import get_journal
+
     record_id = config.get('CurrentEntry')
 
-    if not record_id:
+    # Records started offline have no id until the journal is sent.
+    if not record_id and not get_journal().has_entries():
         print_error('No record currently running')
         return
 
@@ -152,17 +315,87 @@ def comment(comment):
 
 
 @cli.command('get-current')
+@click.option('--refresh', '-r', is_flag=True, help='Ignore the local timesheet cache')
+@output_option
 @click.pass_context
-def get_current(ctx):
+def get_current(ctx, refresh, output):
     """Show the currently running record"""
-    ctx.invoke(get_current_record)
+    ctx.invoke(get_current_record, refresh=refresh, output=output)
 
 
 @cli.command('today')
+@click.option('--refresh', '-r', is_flag=True, help='Ignore the local timesheet cache')
+@output_option
 @click.pass_context
-def today(ctx):
+def today(ctx, refresh, output):
     """Show today's tracked records"""
-    ctx.invoke(get_today)
+    ctx.invoke(get_today, refresh=refresh, output=output)
+
+
+@cli.command('report')
+@click.option('--from', 'start_time', required=True, help='Start of the range, e.g. "2018-01-01" or "7 days ago"')
+@click.option('--to', 'end_time', default='now', show_default=True, help='End of the range')
+@click.option('--group-by', '-g', default='project', show_default=True,
+              help='Comma separated list of customer, project, task, user, day and week')
+@click.option('--refresh', '-r', is_flag=True, help='Ignore the local timesheet cache')
+@output_option
+@click.pass_context
+@refreshes_catalog
+def report(ctx, start_time, end_time, group_by, refresh, output):
+    """Sum up the recorded time of a range by groups"""
+    from .report import Report
+
+    if config.get('ApiKey') is None:
+        print_error(
+            '''kimai-cli has not yet been configured. Use \'kimai configure\'
+            first before using any other command'''
+        )
+        ctx.abort()
+
+    start, end = dates.parse(start_time), dates.parse(end_time)
+
+    if start is None or end is None:
+        raise click.BadParameter('Could not parse %s' % (start_time if start is None else end_time))
+
+    try:
+        # Records crossing the edges of the range only count inside of it.
+        summary = Report([g.strip() for g in group_by.split(',') if g.strip()],
+                         start=start.timestamp(), end=end.timestamp())
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--group-by')
+
+    try:
+        summary.add_all(kimai.get_items_between(start, end, refresh=refresh))
+    except RuntimeError as e:
+        print_error(str(e))
+        ctx.exit(1)
+
+    print_report(summary, output)
+
+
+def print_report(summary, output='table'):
+    """Prints the groups of a report followed by their subtotals."""
+    from .output import write_rows
+    from .report import format_duration
+
+    def extract_report_row(key, seconds, count):
+        cells = list(key)
+
+        if None in cells:
+            # The first empty group of a subtotal row labels it.
+            first = cells.index(None)
+            cells = [c or '' for c in cells]
+            cells[first] = 'Total' if first == 0 else 'Subtotal'
+
+        return cells + [count, datetime.timedelta(seconds=seconds)]
+
+    def display_report_row(row):
+        return row[:-1] + [format_duration(int(row[-1].total_seconds()))]
+
+    headers = [g.capitalize() for g in summary.groups] + ['Records', 'Duration']
+    rows = (extract_report_row(*row) for row in summary.rows())
+
+    write_rows(rows, headers, output, display=display_report_row)
 
 
 @cli.group()
@@ -178,11 +411,13 @@ def projects(ctx):
 
 
 @projects.command('list')
-def list_projects():
+@output_option
+def list_projects(output):
     """Lists all available projects"""
     print_table(
         kimai.get_projects(),
         columns=['projectID', 'name', 'customerName'],
+        output=output,
     )
 
 
@@ -190,15 +425,11 @@ def list_projects():
 def download_projects():
     """Downloads all existing projects to disk so they can be used
     for autocompletion"""
-    remote_projects = kimai.get_projects()
+    save_projects(kimai.get_projects())
 
-    project_map = {}
 
-    for project in remote_projects:
-        map_key = "(%s) %s" % (project['customerName'], project['name'])
-        project_map[map_key] = project['projectID']
-
-    config.set('Projects', project_map)
+def save_projects(remote_projects):
+    get_catalog().update(PROJECTS, project_entries(remote_projects))
     print_success('Successfully downloaded projects.')
 
 
@@ -214,22 +445,21 @@ def tasks(ctx):
 
 
 @tasks.command('list')
-def list_tasks():
+@click.option('--project-id', '-p', type=int, help='Only list the tasks of this project')
+@output_option
+def list_tasks(project_id, output):
     """Lists all available tasks"""
-    print_table(kimai.get_tasks())
+    print_table(kimai.get_tasks(project_id), output=output)
 
 
 @tasks.command('download')
 def download_tasks():
     """Downloads all existing tasks to disk so they can be used for autocompletion"""
-    remote_tasks = kimai.get_tasks()
-
-    task_map = {}
+    save_tasks(kimai.get_tasks())
 
-    for task in remote_tasks:
-        task_map[task['name']] = task['activityID']
 
-    config.set('Tasks', task_map)
+def save_tasks(remote_tasks):
+    get_catalog().update(TASKS, task_entries(remote_tasks))
     print_success('Successfully downloaded tasks.')
 
 
@@ -250,7 +480,9 @@ def record(ctx):
 @click.option('--project-id', '-p', type=int)
 @click.option('--favorite', '-f', type=str)
 @click.option('--comment', '-c', type=str)
-def start_record(task_id, project_id, favorite, comment):
+@offline_option
+@refreshes_catalog
+def start_record(task_id, project_id, favorite, comment, offline):
     """Start a new time recording"""
     if not favorite and not (project_id and task_id):
         favorite = prompt_with_autocomplete('Favorite: ', 'Favorites', resolve_title=False)
@@ -264,9 +496,17 @@ def start_record(task_id, project_id, favorite, comment):
             print_error(str(e))
             return
 
-    response = kimai.start_recording(task_id, project_id)
+    response = send_or_journal(
+        offline,
+        lambda: kimai.start_recording(task_id, project_id),
+        'start', project_id=project_id, task_id=task_id, comment=comment
+    )
 
-    if response.successful:
+    if response is JOURNALED:
+        # The new record has no id until the journal is sent.
+        kimai.remember_current(None)
+        config.set('Comment', comment)
+    elif response.successful:
         config.set('Comment', comment)
         print_success(
             'Started recording. To stop recording type \'kimai record stop\''
@@ -276,9 +516,17 @@ def start_record(task_id, project_id, favorite, comment):
 
 
 @record.command('stop')
-def stop_record():
+@offline_option
+@refreshes_catalog
+def stop_record(offline):
     """Stops the currently running recording (if there is one)"""
-    response = kimai.stop_recording()
+    response = send_or_journal(offline, kimai.stop_recording, 'stop', comment=config.get('Comment'))
+
+    if response is JOURNALED:
+        kimai.remember_current(None)
+        if config.get('Comment') is not None:
+            config.delete('Comment')
+        return
 
     if not response:
         print_success('No recording running.')
@@ -291,31 +539,44 @@ def stop_record():
 
 
 @record.command('get-current')
-def get_current_record():
+@click.option('--refresh', '-r', is_flag=True, help='Ignore the local timesheet cache')
+@output_option
+def get_current_record(refresh, output):
     """Get the currently running time recording."""
-    current = kimai.get_current()
+    from . import journal
+
+    started = journal.open_start(journal.get_journal().entries())
+
+    # Kimai doesn't know about a recording started offline yet.
+    current = journal.started_record(started) if started else kimai.get_current(cached=not refresh)
 
     if not current:
         return
 
     current.comment = config.get('Comment')
 
-    print_records([current])
+    print_records([current], output)
 
 
 @record.command('get-today')
-def get_today():
+@click.option('--refresh', '-r', is_flag=True, help='Ignore the local timesheet cache')
+@output_option
+@refreshes_catalog
+def get_today(refresh, output):
     """Returns all recorded entries for today"""
-    records = kimai.get_todays_records()
+    try:
+        records = kimai.get_todays_records(refresh=refresh)
+    except RuntimeError as e:
+        print_error(str(e))
+        return
 
-    total = datetime.timedelta()
-    for r in records:
-        total += r.duration
-    total = ':'.join(str(total).split(':')[:2])
+    print_records(records, output)
 
-    print_records(records)
+    if output == 'table':
+        total = sum((r.duration for r in records), datetime.timedelta())
+        total = ':'.join(str(total).split(':')[:2])
 
-    click.echo(click.style('Total: ', fg='green', bold=True) + total + 'h')
+        click.echo(click.style('Total: ', fg='green', bold=True) + total + 'h')
 
 
 @record.command('add')
@@ -327,7 +588,9 @@ def get_today():
 @click.option('--task-id', '-t', type=int)
 @click.option('--favorite', '-f', type=str)
 @click.option('--comment', '-c', default='', type=str)
-def add_record(start_time, end_time, last_entry_id, duration, favorite, project_id, task_id, comment):
+@offline_option
+@refreshes_catalog
+def add_record(start_time, end_time, last_entry_id, duration, favorite, project_id, task_id, comment, offline):
     if not end_time and not duration:
         print_error('Need either an end time or a duration.')
         return
@@ -381,19 +644,20 @@ def add_record(start_time, end_time, last_entry_id, duration, favorite, project_
     if not comment:
         comment = click.edit('# Please enter a description of your activity')
 
-    result = kimai.add_record(
-        start_time,
-        end_time,
-        project_id,
-        task_id,
-        comment=comment
+    result = send_or_journal(
+        offline,
+        lambda: kimai.add_record(start_time, end_time, project_id, task_id, comment=comment),
+        'add', start=int(start_time.timestamp()), end=int(end_time.timestamp()),
+        project_id=project_id, task_id=task_id, comment=comment
     )
 
-    print_success(str(result.items[0]['id']))
+    if result is not JOURNALED:
+        print_success(str(result.items[0]['id']))
 
 
 @record.command('edit')
-@click.option('--id', '-i', prompt="Record Id", type=int)
+@click.option('--id', '-i', type=int, multiple=True, required=True,
+              help='Can be given multiple times to apply the same changes to several records')
 @click.option('--start-time', '-s', type=str)
 @click.option('--end-time', '-e', type=str)
 @click.option('--last-entry-id', '-l', type=int, help='ID of the last entry this record should snap to')
@@ -401,6 +665,7 @@ def add_record(start_time, end_time, last_entry_id, duration, favorite, project_
 @click.option('--task-id', '-t', type=int)
 @click.option('--favorite', '-f', type=str)
 @click.option('--comment', '-c', type=str)
+@refreshes_catalog
 def edit_record(id, start_time, end_time, last_entry_id, project_id, task_id, favorite, comment):
     """Edit a record"""
     if last_entry_id:
@@ -413,9 +678,17 @@ def edit_record(id, start_time, end_time, last_entry_id, project_id, task_id, fa
     elif start_time:
         start_time = dates.parse(start_time)
 
+        if start_time is None:
+            print_error('Could not parse start date')
+            return
+
     if end_time:
         end_time = dates.parse(end_time)
 
+        if end_time is None:
+            print_error('Could not parse end date')
+            return
+
     if favorite:
         try:
             favorite = fav.get_favorite(favorite)
@@ -425,7 +698,7 @@ def edit_record(id, start_time, end_time, last_entry_id, project_id, task_id, fa
             print_error(str(e))
             return
 
-    kimai.edit_record(
+    responses = kimai.edit_records(
         id,
         start=start_time,
         end=end_time,
@@ -434,23 +707,169 @@ def edit_record(id, start_time, end_time, last_entry_id, project_id, task_id, fa
         comment=comment
     )
 
-    print_success('Successfully updated record %s' % id)
+    for record_id, response in responses.items():
+        if not response.successful:
+            print_error(response.error)
+        else:
+            print_success('Successfully updated record %s' % record_id)
+
+
+def read_record_ids(ids, file):
+    """Returns the ids given as options followed by the ones listed in the
+    file, one per line. Empty lines and lines starting with # are skipped."""
+    ids = list(ids)
+
+    if file is not None:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                ids.append(int(line))
+            except ValueError:
+                raise click.BadParameter('Line %d is not a record id: %s' % (number, line), param_hint='--file')
+
+    if not ids:
+        raise click.UsageError('No record ids given. Use --id or --file.')
+
+    return ids
+
+
+def run_bulk_command(operation, ids, workers, rate, success_message):
+    """Runs a bulk operation with a progress bar and prints a line for
+    every record followed by a summary."""
+    from .bulk import run_bulk
+
+    with click.progressbar(length=len(ids), label='Processing records', file=sys.stderr) as bar:
+        responses = run_bulk(operation, ids, workers=workers, rate=rate, progress=bar.update)
+
+    failed = 0
+
+    for record_id, response in responses.items():
+        if not response.successful:
+            failed += 1
+            print_error('Record %s: %s' % (record_id, response.error))
+        else:
+            print_success(success_message % record_id)
+
+    click.echo('%d succeeded, %d failed' % (len(responses) - failed, failed))
+
+
+def pool_options(command):
+    """Options for the commands that send many requests in parallel."""
+    command = click.option('--workers', type=click.IntRange(1), default=4, show_default=True,
+                           help='How many requests run in parallel')(command)
+    command = click.option('--rate', type=click.FloatRange(0), default=20, show_default=True,
+                           help='Maximum records per second, 0 for no limit')(command)
+    return command
+
+
+def bulk_options(command):
+    """Options shared by the commands that work on many records at once."""
+    command = click.option('--file', type=click.File(), help='File with one record id per line')(command)
+    return pool_options(command)
+
+
+@record.command('bulk-edit')
+@click.option('--id', '-i', type=int, multiple=True)
+@click.option('--project-id', '-p', type=int)
+@click.option('--task-id', '-t', type=int)
+@click.option('--favorite', '-f', type=str)
+@click.option('--comment', '-c', type=str)
+@bulk_options
+@refreshes_catalog
+def bulk_edit_records(id, project_id, task_id, favorite, comment, file, workers, rate):
+    """Apply the same changes to many records, e.g. reassign them to another
+    project and task"""
+    ids = read_record_ids(id, file)
+
+    if favorite:
+        try:
+            favorite = fav.get_favorite(favorite)
+            project_id = favorite.Project
+            task_id = favorite.Task
+        except KeyError as e:
+            print_error(str(e))
+            return
+
+    def edit(chunk):
+        return kimai.edit_records(chunk, comment=comment, project_id=project_id, task_id=task_id)
+
+    run_bulk_command(edit, ids, workers, rate, 'Successfully updated record %s')
 
 
 @record.command('delete')
-@click.option('--id', '-i', required=True, type=int, multiple=True)
-def delete_record(id):
-    for record_id in id:
+@click.option('--id', '-i', type=int, multiple=True)
+@bulk_options
+@refreshes_catalog
+def delete_record(id, file, workers, rate):
+    """Delete records"""
+    ids = read_record_ids(id, file)
+
+    run_bulk_command(kimai.delete_records, ids, workers, rate, 'Record %s successfully deleted')
+
+
+@record.command('import')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='Format of the file, by default guessed from its extension')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Progress of the import, by default FILE.checkpoint')
+@click.option('--skip-invalid', is_flag=True, help='Import the valid rows even if others are invalid')
+@pool_options
+@click.pass_context
+@refreshes_catalog
+def import_records(ctx, file, file_format, checkpoint, skip_invalid, workers, rate):
+    """Create records from a CSV or JSON lines file.
+
+    Every row needs a start, an end or a duration, a favorite or a project
+    and a task id and optionally a comment. Imported rows are logged to the
+    checkpoint file, so running the same import again after it was
+    interrupted only creates the missing records.
+    """
+    import csv
+
+    from . import importer
+
+    favorites = {f.Name: f for f in fav.list_favorites()}
+    rows, invalid = [], 0
+
+    with open(file, newline='') as f:
         try:
-            response = kimai.delete_record(record_id)
-        except RuntimeError as e:
+            for line, values in importer.read_rows(f, file_format or importer.detect_format(file)):
+                try:
+                    rows.append(importer.validate(line, values, favorites))
+                except ValueError as e:
+                    invalid += 1
+                    print_error('Line %d: %s' % (line, e))
+        except (ValueError, csv.Error) as e:
+            print_error(str(e))
+            ctx.exit(1)
+
+    if invalid and not skip_invalid:
+        print_error('%d invalid rows, nothing was imported. Fix them or use --skip-invalid.' % invalid)
+        ctx.exit(1)
+
+    with importer.Checkpoint(checkpoint or file + '.checkpoint') as log:
+        try:
+            with click.progressbar(length=len(rows), label='Importing records', file=sys.stderr) as bar:
+                responses = importer.import_rows(rows, log, workers=workers, rate=rate, progress=bar.update)
+        except (ValueError, RuntimeError) as e:
             print_error(str(e))
-            continue
+            ctx.exit(1)
+
+    failed = 0
 
+    for line, response in responses.items():
         if not response.successful:
-            print_error(response.error)
-        else:
-            print_success('Record %s successfully deleted' % record_id)
+            failed += 1
+            print_error('Line %d: %s' % (line, response.error))
+            if not response.answered:
+                print_error('Run the import again to check whether the record was created.')
+
+    click.echo('%d imported, %d already imported, %d failed, %d invalid' % (
+        len(responses) - failed, len(rows) - len(responses), failed, invalid
+    ))
 
 
 @record.command('comment')
@@ -489,9 +908,10 @@ def favorites(ctx):
 
 
 @favorites.command('list')
-def list_favorites():
+@output_option
+def list_favorites(output):
     """List all favorites"""
-    print_table(fav.list_favorites())
+    print_table(fav.list_favorites(), output=output)
 
 
 @favorites.command('add')
@@ -501,10 +921,10 @@ def list_favorites():
 def add_favorite(project_id, task_id, name):
     """Adds a favorite."""
     if not project_id:
-        project_id = prompt_with_autocomplete('Project: ', 'Projects')
+        project_id = prompt_with_autocomplete('Project: ', PROJECTS)
 
     if not task_id:
-        task_id = prompt_with_autocomplete('Task: ', 'Tasks')
+        task_id = prompt_with_autocomplete('Task: ', TASKS, project_id=project_id)
 
     try:
         fav.add_favorite(name, project_id, task_id)
@@ -546,14 +966,3 @@ def start_recording_favorite(ctx, name, comment):
         project_id=favorite.Project,
         comment=comment
     )
-
-
-class FuzzyCompleter(Completer):
-    def __init__(self, projects):
-        self.projects = projects
-
-    def get_completions(self, document, complete_event):
-        word_before_cursor = document.get_word_before_cursor(WORD=True)
-        matches = fuzzyfinder(word_before_cursor, self.projects)
-        for m in matches:
-            yield Completion(m, start_position=-len(word_before_cursor))
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from array import array
+from datetime import datetime
+from operator import itemgetter
+
+
+# Local dates are computed once per quarter of an hour of start times. Every
+# timezone offset and DST switch is a multiple of 15 minutes, so all starts
+# inside one such bucket fall on the same local day.
+DATE_BUCKET = 900
+
+GROUPS = ('customer', 'project', 'task', 'user', 'day', 'week')
+
+# The fields of the raw timesheet items holding the values of the groups
+# that are read directly.
+FIELDS = {
+    'customer': 'customerName',
+    'project': 'projectName',
+    'task': 'activityName',
+    'user': 'userID',
+}
+
+# Grouping combines the codes of all columns into one integer per record.
+# With NumPy that integer has to fit into 64 bits.
+MAX_NUMPY_KEY = 2 ** 62
+
+_numpy = None
+
+
+def numpy():
+    """Returns the numpy module, or None if it is not installed. NumPy is
+    optional: without it batches fall back to the array module and loops
+    over plain ints."""
+    global _numpy
+
+    if _numpy is None:
+        try:
+            import numpy as module
+        except ImportError:
+            module = False
+        _numpy = module
+
+    return _numpy or None
+
+
+class RecordBatch(object):
+    """Columnar representation of many timesheet records.
+
+    Ids, start and end times and durations (all in seconds) are kept in
+    `array`s of 64 bit integers. Customers, projects, tasks and users are
+    dictionary encoded: a column holds an integer code per record that
+    indexes a list of the distinct values. The day and week columns are
+    derived from the start times the first time they are needed.
+
+    No per-record objects are created or kept. Summing and grouping work on
+    the columns directly, with NumPy if it is installed.
+    """
+
+    def __init__(self, ids, start, end, columns, now=None):
+        self.now = int(time.time() if now is None else now)
+        self.ids = ids
+        self.start = start
+        self.end = end
+        self.duration = _durations(start, end, self.now)
+        self.columns = columns
+
+    @classmethod
+    def from_items(cls, items, now=None):
+        """Converts raw items as returned by getTimesheet column by column."""
+        items = list(items)
+
+        def column(field, convert=int):
+            return array('q', map(convert, map(itemgetter(field), items)))
+
+        columns = {
+            name: encode(map(str, map(itemgetter(field), items))) for name, field in FIELDS.items()
+        }
+
+        return cls(
+            column('timeEntryID'),
+            column('start'),
+            # Running records have an end of 0 (or nothing at all).
+            column('end', lambda end: int(end or 0)),
+            columns,
+            now,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def clip(self, lower=None, upper=None):
+        """Cuts the records to the range between the `lower` and `upper`
+        timestamps, either of which may be None. Only the part of a record
+        inside the range counts towards its duration, and a record that
+        started before the range is dated to its start."""
+        lower = None if lower is None else int(lower)
+        upper = None if upper is None else int(upper)
+
+        self.start, self.end = _clip(self.start, self.end, self.now, lower, upper)
+        self.duration = _durations(self.start, self.end, self.now)
+
+        # The day and week columns are derived from the start times.
+        self.columns.pop('day', None)
+        self.columns.pop('week', None)
+
+        return self
+
+    def total(self):
+        """Returns the total duration in seconds and the number of records."""
+        return sum(self.duration), len(self)
+
+    def column(self, name):
+        """Returns the codes and the distinct values of a column."""
+        if name not in self.columns:
+            if name == 'day':
+                self.columns[name] = self._days()
+            elif name == 'week':
+                codes, days = self.column('day')
+                self.columns[name] = recode(codes, [_week(day) for day in days])
+            else:
+                raise KeyError('Unknown column %s' % name)
+
+        return self.columns[name]
+
+    def group_by(self, names):
+        """Sums up the durations by the values of the given columns. Returns
+        `[seconds, count]` by tuples of the values."""
+        columns = [self.column(name) for name in names]
+
+        if not len(self):
+            return {}
+
+        sizes = [len(values) for _, values in columns]
+        np = numpy()
+
+        if np is not None and _product(sizes) < MAX_NUMPY_KEY:
+            totals = _group_numpy(np, columns, self.duration)
+        else:
+            totals = _group_python(columns, self.duration)
+
+        return {_decode(key, columns, sizes): total for key, total in totals}
+
+    def _days(self):
+        buckets, starts = encode(start // DATE_BUCKET for start in self.start)
+        days = [datetime.fromtimestamp(bucket * DATE_BUCKET).date().isoformat() for bucket in starts]
+        return recode(buckets, days)
+
+
+def encode(values):
+    """Dictionary encodes the values. Returns their codes as an array and
+    the distinct values in the order they first appeared."""
+    index = {}
+    codes = array('q', map(lambda value: index.setdefault(value, len(index)), values))
+    return codes, list(index)
+
+
+def recode(codes, mapped):
+    """Maps the distinct values of an encoded column to new (possibly equal)
+    values and encodes the column again, without looking at every value."""
+    new_codes, values = encode(mapped)
+    return array('q', map(new_codes.__getitem__, codes)), values
+
+
+def _durations(start, end, now):
+    np = numpy()
+
+    if np is not None and len(start):
+        start, end = np.frombuffer(start, dtype=np.int64), np.frombuffer(end, dtype=np.int64)
+        return array('q', np.where(end == 0, now - start, end - start).tobytes())
+
+    return array('q', [(e or now) - s for s, e in zip(start, end)])
+
+
+def _clip(start, end, now, lower, upper):
+    np = numpy()
+
+    if np is not None and len(start):
+        start, end = np.frombuffer(start, dtype=np.int64), np.frombuffer(end, dtype=np.int64)
+        end = np.where(end == 0, now, end)
+        if lower is not None:
+            start = np.maximum(start, lower)
+        if upper is not None:
+            end = np.minimum(end, upper)
+        return array('q', start.tobytes()), array('q', np.maximum(end, start).tobytes())
+
+    lower = min(start, default=0) if lower is None else lower
+    upper = max(max(end, default=0), now) if upper is None else upper
+    start = array('q', [max(s, lower) for s in start])
+    end = array('q', [max(min(e or now, upper), s) for s, e in zip(start, end)])
+
+    return start, end
+
+
+def _group_numpy(np, columns, duration):
+    key = np.zeros(len(duration), dtype=np.int64)
+
+    for codes, values in columns:
+        key = key * len(values) + np.frombuffer(codes, dtype=np.int64)
+
+    keys, inverse = np.unique(key, return_inverse=True)
+    seconds = np.bincount(inverse, weights=np.frombuffer(duration, dtype=np.int64))
+    counts = np.bincount(inverse)
+
+    return (
+        (key, [int(s), int(c)]) for key, s, c in zip(keys.tolist(), seconds.tolist(), counts.tolist())
+    )
+
+
+def _group_python(columns, duration):
+    key = [0] * len(duration)
+
+    for codes, values in columns:
+        size = len(values)
+        key = [k * size + c for k, c in zip(key, codes)]
+
+    totals = {}
+
+    for k, seconds in zip(key, duration):
+        total = totals.get(k)
+        if total is None:
+            totals[k] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+
+    return totals.items()
+
+
+def _decode(key, columns, sizes):
+    values = []
+
+    for (_, column_values), size in zip(reversed(columns), reversed(sizes)):
+        key, code = divmod(key, size)
+        values.append(column_values[code])
+
+    return tuple(reversed(values))
+
+
+def _product(sizes):
+    product = 1
+    for size in sizes:
+        product *= size
+    return product
+
+
+def _week(day):
+    year, week, _ = datetime.strptime(day, '%Y-%m-%d').isocalendar()
+    return '%d-W%02d' % (year, week)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""Minimal entry point for shell completion.
+
+Running the click CLI on every TAB means importing all of it and parsing the
+config. Instead, everything completion needs (the command tree, favorites,
+catalog ids and recent record ids) is precomputed into a single JSON file next
+to the config, and this module answers from that file. It only imports `os`,
+`sys`, `json` and `shlex` unless the file is missing or was written by another
+version.
+It never talks to the server.
+
+The CLI rewrites the file on exit whenever a command changed one of its
+sources (see `sources_changed`).
+"""
+
+import json
+import os
+import shlex
+import sys
+
+from .__version__ import __version__
+
+
+# How many of the most recent record ids are offered for completion.
+RECENT_RECORDS = 20
+
+# Where the values of options come from. Options not listed here complete
+# to nothing, which lets the shell fall back to its default completion.
+OPTION_SOURCES = {
+    '--favorite': 'favorites',
+    '--project-id': 'projects',
+    '--task-id': 'tasks',
+    '--id': 'records',
+    '--last-entry-id': 'records',
+}
+
+COMMAND_OPTION_SOURCES = {
+    ('favorites delete', '--name'): 'favorites',
+    ('favorites start', '--name'): 'favorites',
+}
+
+
+def _directory():
+    # Mirrors kimai.config.config_path without importing the config module.
+    default = os.path.join(os.path.expanduser('~/.kimai'), 'config')
+    return os.path.dirname(os.environ.get('KIMAI_CONFIG_PATH', default))
+
+
+def completions_path():
+    return os.path.join(_directory(), 'completions.json')
+
+
+def sources_changed(config):
+    """Checks whether the current invocation changed anything the
+    completion file is built from. Must be called before the config is
+    flushed."""
+    from . import catalog, store
+
+    favorites_changed = 'Favorites' in config.changed or 'Favorites' in config.deleted
+
+    return favorites_changed or catalog.was_modified() or store.was_modified()
+
+
+def build_completions():
+    """Collects everything completion needs from the CLI, the config, the
+    catalog and the timesheet store."""
+    from .catalog import get_catalog, PROJECTS, TASKS
+    from .cli import cli
+    from .config import config
+    from .store import get_store
+
+    commands, options = {}, {}
+
+    def walk(command, path):
+        key = ' '.join(path)
+        options[key] = {}
+
+        for param in command.params:
+            takes_value = not getattr(param, 'is_flag', False) and param.param_type_name == 'option'
+            names = list(param.opts) + list(param.secondary_opts)
+            canonical = max(names, key=len)
+            for name in names:
+                if name.startswith('-'):
+                    options[key][name] = [canonical, takes_value]
+
+        options[key]['--help'] = ['--help', False]
+
+        sub_commands = getattr(command, 'commands', {})
+        if sub_commands:
+            commands[key] = sorted(sub_commands)
+            for name, sub_command in sub_commands.items():
+                walk(sub_command, path + [name])
+
+    walk(cli, [])
+
+    catalog = get_catalog()
+
+    return {
+        'version': __version__,
+        'commands': commands,
+        'options': options,
+        'values': {
+            'favorites': sorted(config.get('Favorites', {})),
+            'projects': sorted(str(i) for i in catalog.collection(PROJECTS).values()),
+            'tasks': sorted(str(i) for i in catalog.collection(TASKS).values()),
+            'records': [str(i) for i in get_store().recent_ids(RECENT_RECORDS)],
+        },
+    }
+
+
+def write_completions():
+    """Rebuilds the completion file. It is replaced atomically so that a
+    concurrent TAB never reads half of it."""
+    data = build_completions()
+    path = completions_path()
+    temp_path = '%s.%d' % (path, os.getpid())
+
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+
+    os.replace(temp_path, path)
+    return data
+
+
+def load_completions():
+    try:
+        with open(completions_path()) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return write_completions()
+
+    if data.get('version') != __version__:
+        return write_completions()
+
+    return data
+
+
+def complete(data, words, current):
+    """Returns the completions for the word at index `current` of the
+    command line `words` (including the program name)."""
+    args = words[1:current]
+    incomplete = words[current] if current < len(words) else ''
+
+    path = []
+    for arg in args:
+        if arg in data['commands'].get(' '.join(path), []):
+            path.append(arg)
+
+    key = ' '.join(path)
+    options = data['options'].get(key, {})
+
+    if args and args[-1] in options:
+        canonical, takes_value = options[args[-1]]
+
+        if takes_value:
+            source = COMMAND_OPTION_SOURCES.get((key, canonical), OPTION_SOURCES.get(canonical))
+            candidates = data['values'].get(source, [])
+            return [c for c in candidates if c.startswith(incomplete)]
+
+    if incomplete.startswith('-'):
+        candidates = sorted(options)
+    else:
+        candidates = data['commands'].get(key, [])
+
+    return [c for c in candidates if c.startswith(incomplete)]
+
+
+def split_words(line):
+    """Splits COMP_WORDS into words. The completion script joins the words
+    with newlines so that names with spaces stay in one piece. Quotes and
+    escapes the user typed are removed, also from a word that is still
+    unfinished like `'Team Me`."""
+    if '\n' not in line:
+        return _split(line)
+
+    words = line.split('\n')
+
+    for i, word in enumerate(words):
+        if any(c in word for c in '\'"\\'):
+            words[i] = ' '.join(_split(word))
+
+    return words
+
+
+def _split(text):
+    # The word being completed may lack its closing quote.
+    for closing in ('', "'", '"'):
+        try:
+            return shlex.split(text + closing)
+        except ValueError:
+            continue
+
+    return text.split()
+
+
+def main():
+    """Reads the command line from COMP_WORDS and COMP_CWORD like click's
+    bash completion and prints one completion per line. Completions with
+    spaces are quoted for the shell."""
+    words = split_words(os.environ.get('COMP_WORDS', ''))
+    current = int(os.environ.get('COMP_CWORD', len(words)))
+
+    # A trailing space means the user starts a new, still empty word.
+    if current >= len(words):
+        words.append('')
+
+    for completion in complete(load_completions(), words, current):
+        sys.stdout.write(shlex.quote(completion) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import re
+import threading
+
+from prompt_toolkit.completion import Completer, Completion, ThreadedCompleter
+
+
+# How many previous queries (and their matches) the index remembers to
+# narrow down from when the user keeps typing.
+HISTORY_SIZE = 32
+
+# The maximum number of completions shown for a single keystroke.
+COMPLETION_LIMIT = 100
+
+
+class CompletionIndex(object):
+    """Prebuilt index for fuzzy matching names against what the user typed.
+
+    A name matches if the query is a case insensitive subsequence of it.
+    Like with fuzzyfinder, shorter matches rank first, then earlier ones,
+    then names in alphabetical order. The match of a name is its leftmost
+    occurrence of the query.
+
+    All names are normalized once up front, and a character index narrows a
+    new query down to the names containing all of its characters. Matches of
+    earlier queries are remembered, so that typing more characters only looks
+    at the names that matched before.
+    """
+
+    def __init__(self, names):
+        # Sorting up front lets the position in the list break ties.
+        self.names = sorted(names)
+        self.normalized = [name.lower() for name in self.names]
+
+        self.characters = {}
+        for i, name in enumerate(self.normalized):
+            for character in set(name):
+                self.characters.setdefault(character, set()).add(i)
+
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def search(self, query, limit=COMPLETION_LIMIT):
+        """Returns up to `limit` matching names, best match first."""
+        query = query.lower()
+
+        if not query:
+            return self.names[:limit]
+
+        candidates = list(self._candidates(query))
+        matches = map(_pattern(query).search, [self.normalized[i] for i in candidates])
+
+        scored = [
+            (match.end() - match.start(), match.start(), i)
+            for i, match in zip(candidates, matches) if match is not None
+        ]
+
+        self._remember(query, [i for _, _, i in scored])
+
+        return [self.names[i] for _, _, i in heapq.nsmallest(limit, scored)]
+
+    def _candidates(self, query):
+        with self._lock:
+            # Longest earlier query the current one extends.
+            for end in range(len(query), 0, -1):
+                matches = self._history.get(query[:end])
+                if matches is not None:
+                    return matches
+
+        sets = sorted((self.characters.get(c, set()) for c in set(query)), key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def _remember(self, query, matches):
+        with self._lock:
+            if len(self._history) >= HISTORY_SIZE:
+                self._history.pop(next(iter(self._history)))
+            self._history[query] = matches
+
+
+def _pattern(query):
+    """Compiles a regex matching the leftmost occurrence of the query as a
+    subsequence. `[^x]*x` instead of `.*?x` avoids backtracking on names
+    that don't match."""
+    parts = [re.escape(query[0])]
+
+    for character in query[1:]:
+        parts.append('[^%s]*%s' % (re.escape(character), re.escape(character)))
+
+    return re.compile(''.join(parts))
+
+
+class FuzzyCompleter(Completer):
+    def __init__(self, projects):
+        self.index = CompletionIndex(projects)
+
+    def get_completions(self, document, complete_event):
+        # Names like "(Customer) Project" contain spaces, so we match against
+        # everything that was typed instead of just the last word.
+        text = document.text_before_cursor
+        for m in self.index.search(text):
+            yield Completion(m, start_position=-len(text))
+
+
+def fuzzy_completer(names):
+    """Returns a fuzzy completer for the names that runs off the UI thread so
+    that typing never waits for it."""
+    return ThreadedCompleter(FuzzyCompleter(names))
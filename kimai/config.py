@@ -1,15 +1,53 @@
 # -*- coding: utf-8 -*-
 
 import os
-import yaml
+import tempfile
+
+from contextlib import contextmanager
+
+from . import trace
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
 
 
 DEFAULT_CONFIG_PATH = os.path.join(os.path.expanduser('~/.kimai'), 'config')
 
 
 class Config(object):
-    def __init__(self, values=None):
-        self.values = {} if values is None else values
+    """Holds the config values. If a loader is given, it is only called the
+    first time the values are accessed so that commands which never look at
+    the config don't pay for parsing it.
+
+    The config remembers which keys were set or deleted since it was loaded,
+    so that only those changes need to be written back."""
+
+    def __init__(self, values=None, loader=None):
+        self._values = values
+        self._loader = loader
+        self.changed = set()
+        self.deleted = set()
+
+    @property
+    def values(self):
+        if self._values is None:
+            self._values = {} if self._loader is None else self._loader()
+
+        return self._values
+
+    @property
+    def loaded(self):
+        return self._values is not None
+
+    @property
+    def dirty(self):
+        return bool(self.changed or self.deleted)
+
+    def mark_clean(self):
+        self.changed.clear()
+        self.deleted.clear()
 
     def get(self, key: str, default=None):
         if key in self.values:
@@ -19,35 +57,103 @@ class Config(object):
 
     def set(self, key: str, value):
         self.values[key] = value
+        self.changed.add(key)
+        self.deleted.discard(key)
 
     def delete(self, key):
         del self.values[key]
+        self.deleted.add(key)
+        self.changed.discard(key)
 
     def __repr__(self):
-        return self.values
+        return repr(self.values)
 
 
 def config_path():
     return os.environ.get('KIMAI_CONFIG_PATH', DEFAULT_CONFIG_PATH)
 
 
+def data_path(name):
+    """Returns the path of a file that lives next to the config file."""
+    directory = os.path.dirname(config_path())
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def read_config():
+    """Reads the config values from the configured path."""
+    if not os.path.exists(config_path()):
+        return {}
+
+    with trace.span('config'):
+        import yaml
+
+        with open(config_path(), 'r') as file:
+            return yaml.safe_load(file) or {}
+
+
 def load_config():
     """Loads the config values from the configured path and returns
     a config object."""
-    if not os.path.exists(config_path()):
-        conf = Config()
-    else:
-        with open(config_path(), 'r') as file:
-            conf = Config(yaml.load(file))
-    return conf
+    return Config(read_config())
 
 
 def flush_config(config: Config):
-    """Write the contents of the given config to disk."""
-    os.makedirs(os.path.dirname(config_path()), exist_ok=True)
+    """Write the changes of the given config to disk.
+
+    Nothing is written if nothing changed. Otherwise the file is re-read
+    while holding a lock and only our changes are applied on top of it, so
+    that parallel invocations don't lose each other's writes. The new file
+    replaces the old one atomically."""
+    if not config.dirty:
+        return
+
+    import yaml
+
+    path = config_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    with _locked(path + '.lock'):
+        values = read_config()
+
+        for key in config.changed:
+            values[key] = config.values[key]
+
+        for key in config.deleted:
+            values.pop(key, None)
+
+        # mkstemp creates the file readable by the owner only, which is what
+        # we want for a file containing the api key.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.config-')
+
+        try:
+            with os.fdopen(fd, 'w') as outfile:
+                yaml.safe_dump(values, outfile, default_flow_style=False)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    config.mark_clean()
+
+
+@contextmanager
+def _locked(path):
+    """Holds an exclusive lock on the given file for the duration of the
+    block. Where file locks are not available this does nothing."""
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
 
-    with open(DEFAULT_CONFIG_PATH, 'w') as outfile:
-        yaml.dump(config.values, outfile, default_flow_style=False)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
-config = load_config()
+config = Config(loader=read_config)
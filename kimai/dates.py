@@ -1,11 +1,69 @@
 # -*- coding: utf-8 -*-
 
-import parsedatetime
+import re
 
 from datetime import datetime
+from functools import lru_cache
+
+
+# Dates like "2018-08-05", "2018-8-5 10:00" or "2018-08-05T10:00:30" and
+# times of day like "9:30" are read without parsedatetime. Like parsedatetime,
+# a date without a time keeps the time of day of the relative date.
+ISO_DATE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[T ](\d{1,2}):(\d{2})(?::(\d{2}))?)?$')
+TIME_OF_DAY = re.compile(r'(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+
+# How many of the other expressions are remembered together with the date
+# they were relative to.
+MEMO_SIZE = 1024
+
+_calendar = None
+
+
+def calendar():
+    """Returns the shared parsedatetime calendar. Creating one loads all of
+    its locale constants, so it is only done once."""
+    global _calendar
+
+    if _calendar is None:
+        import parsedatetime
+        _calendar = parsedatetime.Calendar()
+
+    return _calendar
 
 
 def parse(expression, relative_date=None):
-    cal = parsedatetime.Calendar()
-    struct, status = cal.parse(expression, relative_date)
+    """Parses a date expression like "2018-08-05 10:00" or "15 minutes ago".
+    Returns None if the expression is not a date."""
+    reference = (relative_date or datetime.now()).replace(microsecond=0)
+    expression = expression.strip()
+
+    match = ISO_DATE.match(expression)
+    if match:
+        year, month, day, hour, minute, second = match.groups()
+        if hour is None:
+            hour, minute, second = reference.hour, reference.minute, reference.second
+        date = _build(year, month, day, hour, minute, second)
+    else:
+        match = TIME_OF_DAY.match(expression)
+        date = match and _build(reference.year, reference.month, reference.day, *match.groups())
+
+    # Whatever the fast path can't read, like "24:00", is left to parsedatetime.
+    return date or _parse(expression, reference)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _parse(expression, reference):
+    struct, status = calendar().parse(expression, reference)
+
+    if not status:
+        return None
+
     return datetime(*struct[:6])  # I know, right?
+
+
+def _build(year, month, day, hour=None, minute=None, second=None):
+    try:
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError:
+        # Like the 30th of February or 24:00.
+        return None
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import hashlib
+import json
+import os
+import threading
+
+from . import dates, kimai
+from .bulk import DEFAULT_RATE, DEFAULT_WORKERS, run_bulk
+
+
+FORMATS = ('csv', 'jsonl')
+
+FIELDS = ('start', 'end', 'duration', 'favorite', 'project_id', 'task_id', 'comment')
+
+
+class ImportRow(object):
+    """A validated row of an import file, ready to be sent to Kimai."""
+
+    __slots__ = ('line', 'key', 'start', 'end', 'project_id', 'task_id', 'comment')
+
+    def __init__(self, line, key, start, end, project_id, task_id, comment=''):
+        self.line = line
+        self.key = key
+        self.start = start
+        self.end = end
+        self.project_id = project_id
+        self.task_id = task_id
+        self.comment = comment
+
+    def payload(self):
+        return kimai.add_payload(self.start, self.end, self.project_id, self.task_id, self.comment)
+
+    def signature(self):
+        """Identifies the record this row creates in a timesheet."""
+        return int(self.start.timestamp()), int(self.end.timestamp()), str(self.project_id), str(self.task_id)
+
+
+def detect_format(path):
+    return 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.json', '.ndjson') else 'csv'
+
+
+def read_rows(file, file_format='csv'):
+    """Yields `(line, values)` for every row of an open CSV or JSON lines
+    file. CSV files need a header naming the fields, see `FIELDS`."""
+
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for values in reader:
+            yield reader.line_num, values
+    elif file_format == 'jsonl':
+        for line, text in enumerate(file, 1):
+            if not text.strip():
+                continue
+            try:
+                values = json.loads(text)
+            except ValueError as e:
+                raise ValueError('Line %d is not valid JSON: %s' % (line, e))
+            if not isinstance(values, dict):
+                raise ValueError('Line %d is not a JSON object' % line)
+            yield line, values
+    else:
+        raise ValueError('Unknown import format %s' % file_format)
+
+
+def validate(line, values, favorites):
+    """Turns the values of a row into an `ImportRow`. Raises a ValueError
+    describing the first problem with the row."""
+
+    values = {k: v for k, v in values.items() if k is not None and v not in (None, '')}
+    unknown = sorted(set(values) - set(FIELDS))
+
+    if unknown:
+        raise ValueError('Unknown field %s' % ', '.join(unknown))
+
+    if 'start' not in values:
+        raise ValueError('Missing start')
+
+    start = dates.parse(str(values['start']))
+
+    if start is None:
+        raise ValueError('Could not parse start date %s' % values['start'])
+
+    if 'end' in values:
+        end = dates.parse(str(values['end']))
+    elif 'duration' in values:
+        end = dates.parse('+' + str(values['duration']), start)
+    else:
+        raise ValueError('Need either an end or a duration')
+
+    if end is None:
+        raise ValueError('Could not parse end date %s' % values.get('end', values.get('duration')))
+
+    if end <= start:
+        raise ValueError('The end is not after the start')
+
+    if 'favorite' in values:
+        if values['favorite'] not in favorites:
+            raise ValueError('No favorite for name \'%s\' exists' % values['favorite'])
+        favorite = favorites[values['favorite']]
+        project_id, task_id = favorite.Project, favorite.Task
+    elif 'project_id' in values and 'task_id' in values:
+        try:
+            project_id, task_id = int(values['project_id']), int(values['task_id'])
+        except ValueError:
+            raise ValueError('Project and task ids have to be numbers')
+    else:
+        raise ValueError('Need either a favorite or a project and a task id')
+
+    key = hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    return ImportRow(line, key, start, end, project_id, task_id, str(values.get('comment', '')))
+
+
+class Checkpoint(object):
+    """Append-only log of an import, one JSON object per line.
+
+    Before the rows of a chunk are sent they are logged as pending, and as
+    done (with the id of the new record) or failed once the response
+    arrived. Every write is flushed to disk, so after a crash the log tells
+    which rows were certainly imported and which ones may have been.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+        if os.path.exists(path):
+            with open(path) as file:
+                for text in file:
+                    try:
+                        entry = json.loads(text)
+                    except ValueError:
+                        # The last line is cut off if the import was killed while writing it.
+                        continue
+                    self.entries[entry['line']] = entry
+
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def write(self, entries):
+        with self._lock:
+            for entry in entries:
+                self.entries[entry['line']] = entry
+                self._file.write(json.dumps(entry) + '\n')
+
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def pending(self, rows):
+        self.write({'line': r.line, 'key': r.key, 'status': 'pending'} for r in rows)
+
+    def done(self, row, record_id):
+        self.write([{'line': row.line, 'key': row.key, 'status': 'done', 'id': record_id}])
+
+    def finish(self, rows, responses):
+        """Logs the rows as done or failed. Rows whose call was not answered
+        stay pending, `resume` looks for them in the timesheet."""
+        entries = []
+
+        for row, response in zip(rows, responses):
+            entry = {'line': row.line, 'key': row.key}
+
+            if not response.answered:
+                continue
+            elif response.successful:
+                entry.update(status='done', id=(response.items or [{}])[0].get('id'))
+            else:
+                entry.update(status='failed', error=response.error)
+
+            entries.append(entry)
+
+        self.write(entries)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def resume(rows, checkpoint):
+    """Returns the rows that still have to be imported.
+
+    Rows logged as done are skipped. Rows logged as pending were sent, but
+    the import stopped before their response was logged, so the timesheet
+    is searched for records with the same times, project and task. Raises a
+    ValueError if a row differs from the one logged for its line.
+    """
+
+    todo, pending = [], []
+
+    for row in rows:
+        entry = checkpoint.entries.get(row.line)
+
+        if entry is None:
+            todo.append(row)
+        elif entry['key'] != row.key:
+            raise ValueError('Line %d has changed since the checkpoint was written' % row.line)
+        elif entry['status'] == 'pending':
+            pending.append(row)
+        elif entry['status'] != 'done':
+            todo.append(row)
+
+    if pending:
+        start = min(r.start for r in pending).isoformat()
+        end = max(r.end for r in pending).isoformat()
+
+        existing = {}
+        for items in kimai.iter_timesheet_pages(start, end):
+            for item in items:
+                # Kimai answers with numbers or strings depending on the version.
+                signature = (
+                    int(item['start']), int(item['end'] or 0), str(item['projectID']), str(item['activityID'])
+                )
+                existing.setdefault(signature, []).append(item['timeEntryID'])
+
+        for row in pending:
+            ids = existing.get(row.signature())
+
+            if ids:
+                checkpoint.done(row, ids.pop(0))
+            else:
+                todo.append(row)
+
+    return sorted(todo, key=lambda r: r.line)
+
+
+def import_rows(rows, checkpoint, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, progress=None):
+    """Creates a record for every row that the checkpoint does not know as
+    imported yet. Chunks of rows are sent as batch requests by a pool of
+    workers, see `bulk.run_bulk`. Returns the responses by line number.
+
+    Rows are sent only once. If Kimai does not answer for a row it is left
+    pending, so the next import checks the timesheet instead of creating
+    the record a second time."""
+
+    rows = {row.line: row for row in resume(rows, checkpoint)}
+
+    def create(lines):
+        chunk = [rows[line] for line in lines]
+        checkpoint.pending(chunk)
+
+        responses = kimai.send_batch([row.payload() for row in chunk])
+        checkpoint.finish(chunk, responses)
+
+        return dict(zip(lines, responses))
+
+    if not rows:
+        return {}
+
+    return run_bulk(create, list(rows), workers=workers, rate=rate, progress=progress)
+
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import time
+
+from datetime import datetime
+
+from . import trace
+from .config import config, data_path
+
+
+JOURNAL_FILE = 'journal.jsonl'
+
+# Entries that could not be replayed end up here together with the reason,
+# so that no tracked time is ever thrown away.
+REJECTED_FILE = 'journal-rejected.jsonl'
+
+# Seconds to wait before replaying on the next command after the server was
+# unreachable. The wait doubles with every failed attempt.
+MIN_BACKOFF = 30
+MAX_BACKOFF = 3600
+
+
+class Journal(object):
+    """Append-only log of the start, stop and add operations made while
+    Kimai could not be reached.
+
+    Every entry is a JSON object on its own line with the operation and the
+    local time it happened at. Entries are written to disk before the
+    command returns and are only removed once `replay` has dealt with them.
+    """
+
+    def __init__(self, path, rejected_path):
+        self.path = path
+        self.rejected_path = rejected_path
+
+    def entries(self):
+        if not os.path.exists(self.path):
+            return []
+
+        entries = []
+
+        with open(self.path) as file:
+            for text in file:
+                try:
+                    entries.append(json.loads(text))
+                except ValueError:
+                    # The last line is cut off if we were killed while writing it.
+                    continue
+
+        return entries
+
+    def has_entries(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def append(self, op, at=None, **values):
+        entry = dict(values, op=op, at=int(time.time() if at is None else at))
+        _append(self.path, [entry])
+        return entry
+
+    def reject(self, entry, reason):
+        _append(self.rejected_path, [dict(entry, reason=reason)])
+
+    def replace(self, entries):
+        """Atomically replaces all entries of the journal."""
+        directory = os.path.dirname(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.journal-')
+
+        with os.fdopen(fd, 'w') as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, self.path)
+
+
+def get_journal():
+    return Journal(data_path(JOURNAL_FILE), data_path(REJECTED_FILE))
+
+
+def is_offline_error(error):
+    """Whether an exception means that Kimai could not be reached, as
+    opposed to Kimai answering with an error."""
+    import requests
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def open_start(entries):
+    """Returns the start the journal ends with, i.e. the record that was
+    started offline and is still running, or None."""
+    return entries[-1] if entries and entries[-1]['op'] == 'start' else None
+
+
+def has_operations(entries):
+    """Whether replaying the entries would send anything now. A start that
+    has not been stopped yet is replayed together with its stop, so a
+    journal holding only that needs no request."""
+    return len(entries) > 1 or (len(entries) == 1 and open_start(entries) is None)
+
+
+def started_record(entry):
+    """Returns the running record of a journaled start. Kimai has not seen
+    it yet, so it has no id and its project and task are only known by id."""
+    from .models import Project, Record, Task
+
+    return Record(
+        '-',
+        start=entry['at'],
+        project=Project(entry['project_id'], str(entry['project_id'])),
+        task=Task(entry['task_id'], str(entry['task_id'])),
+        comment=entry.get('comment'),
+    )
+
+
+class Operation(object):
+    """A change to the timesheet that replays one or more journal entries.
+
+    Operations either add a finished record, close the record that is
+    running on the server, or could not be planned at all. `conflict` holds
+    the reason why an operation must not be sent."""
+
+    __slots__ = ('kind', 'entries', 'start', 'end', 'project_id', 'task_id', 'comment', 'item', 'conflict')
+
+    def __init__(self, kind, entries, start=None, end=None, project_id=None, task_id=None,
+                 comment=None, item=None, conflict=None):
+        self.kind = kind
+        self.entries = entries
+        self.start = start
+        self.end = end
+        self.project_id = project_id
+        self.task_id = task_id
+        self.comment = comment
+        self.item = item
+        self.conflict = conflict
+
+    def __str__(self):
+        if self.kind == 'close':
+            return 'Stop record %s at %s' % (self.item['timeEntryID'], _format(self.end))
+        if self.kind == 'add':
+            return 'Record from %s to %s' % (_format(self.start), _format(self.end))
+        return 'Stop at %s' % _format(self.entries[0]['at'])
+
+
+def plan(entries, items):
+    """Turns journal entries into the operations that replay them.
+
+    A start followed by a stop (or by another start) becomes a finished
+    record with both times taken from the journal, so the times are those
+    of the commands, not those of the replay. A stop or start that comes
+    first closes the record running on the server. A start that has not
+    been stopped yet is returned separately, it stays in the journal.
+
+    `items` are the server's timesheet items around the journal. Records
+    that would overlap any of them, or an earlier operation, conflict.
+    """
+
+    finished = [(int(i['start']), int(i['end'])) for i in items if int(i['end'] or 0)]
+    running = next((i for i in items if not int(i['end'] or 0)), None)
+    opened = None
+    operations = []
+
+    def add(consumed, start, end, project_id, task_id, comment):
+        conflict = None
+
+        if end <= start:
+            conflict = 'The end is not after the start'
+        elif _overlaps(finished, start, end) or (running is not None and int(running['start']) < end):
+            conflict = 'Overlaps a record on the server'
+        else:
+            finished.append((start, end))
+
+        operations.append(Operation('add', consumed, start, end, project_id, task_id, comment, conflict=conflict))
+
+    def close(consumed, end, comment):
+        start = int(running['start'])
+        conflict = None
+
+        if end <= start:
+            conflict = 'The record running on the server started later'
+        elif _overlaps(finished, start, end):
+            conflict = 'Overlaps a record on the server'
+        else:
+            finished.append((start, end))
+
+        operations.append(Operation('close', consumed, start, end, comment=comment, item=running, conflict=conflict))
+
+    for entry in entries:
+        at = entry['at']
+
+        if entry['op'] == 'start':
+            if opened is not None:
+                add([opened], opened['at'], at, opened['project_id'], opened['task_id'], opened.get('comment'))
+            elif running is not None:
+                # Kimai stops the running record when a new one is started.
+                close([], at, None)
+                running = None
+            opened = entry
+        elif entry['op'] == 'stop':
+            if opened is not None:
+                add([opened, entry], opened['at'], at, opened['project_id'], opened['task_id'],
+                    entry.get('comment') or opened.get('comment'))
+                opened = None
+            elif running is not None:
+                close([entry], at, entry.get('comment'))
+                running = None
+            else:
+                operations.append(Operation('stop', [entry], conflict='Nothing was running'))
+        elif entry['op'] == 'add':
+            add([entry], entry['start'], entry['end'], entry['project_id'], entry['task_id'], entry.get('comment'))
+
+    return operations, opened
+
+
+class ReplayResult(object):
+
+    def __init__(self):
+        self.applied = []
+        self.rejected = []
+        self.remaining = 0
+        self.error = None
+
+
+def replay(journal=None):
+    """Sends the journal to Kimai in order.
+
+    Applied and rejected operations are removed from the journal, rejected
+    entries are moved to the rejected file. If Kimai can't be reached or the
+    replay fails otherwise, the remaining entries are kept, the error is
+    set on the result and the next automatic replay is postponed, see
+    `replay_due`."""
+    from . import kimai
+
+    journal = journal or get_journal()
+    entries = journal.entries()
+    result = ReplayResult()
+
+    if not has_operations(entries):
+        result.remaining = len(entries)
+        return result
+
+    handled = set()
+
+    try:
+        with trace.span('journal replay', entries=len(entries)):
+            _replay(kimai, journal, entries, handled, result)
+    except Exception as e:
+        if is_offline_error(e):
+            result.error = 'Kimai could not be reached'
+        else:
+            result.error = 'Replaying failed (%s: %s)' % (type(e).__name__, e)
+    finally:
+        # Operations that were applied before the error must not be sent again.
+        remaining = [e for e in entries if id(e) not in handled]
+        journal.replace(remaining)
+        result.remaining = len(remaining)
+
+    if result.error:
+        retry = config.get('JournalRetry', {'Attempts': 0})
+        attempts = retry['Attempts'] + 1
+        backoff = min(MIN_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+        config.set('JournalRetry', {'Attempts': attempts, 'NextAt': time.time() + backoff})
+    elif config.get('JournalRetry') is not None:
+        config.delete('JournalRetry')
+
+    return result
+
+
+def _replay(kimai, journal, entries, handled, result):
+    """Plans and applies the operations of the journal. The entries of every
+    operation that was dealt with are added to `handled`."""
+    since = min(e['start'] if e['op'] == 'add' else e['at'] for e in entries)
+    items = [
+        item
+        for page in kimai.iter_timesheet_pages(datetime.fromtimestamp(since).isoformat(), 0)
+        for item in page
+    ]
+
+    operations, _ = plan(entries, items)
+
+    for operation in operations:
+        error = operation.conflict or _apply(kimai, operation)
+
+        if error:
+            for entry in operation.entries:
+                journal.reject(entry, error)
+            result.rejected.append((operation, error))
+        else:
+            result.applied.append(operation)
+
+        handled.update(id(e) for e in operation.entries)
+
+
+def replay_due(journal=None):
+    """Whether the journal should be replayed automatically now, i.e. it has
+    entries and the backoff after the last failed attempt is over."""
+    journal = journal or get_journal()
+
+    if not journal.has_entries() or config.get('ApiKey') is None:
+        return False
+
+    retry = config.get('JournalRetry')
+
+    if retry is not None and time.time() < retry['NextAt']:
+        return False
+
+    return has_operations(journal.entries())
+
+
+def _apply(kimai, operation):
+    """Sends an operation and returns the error message if it failed."""
+
+    if operation.kind == 'add':
+        responses = [kimai.send_request(kimai.add_payload(
+            datetime.fromtimestamp(operation.start),
+            datetime.fromtimestamp(operation.end),
+            operation.project_id,
+            operation.task_id,
+            operation.comment or '',
+        ))]
+    else:
+        record = kimai.create_record(operation.item)
+        responses = kimai.send_batch([
+            kimai.stop_payload(record.id),
+            kimai.update_payload(record, end=datetime.fromtimestamp(operation.end), comment=operation.comment),
+        ], ordered=True)
+
+        if responses[0].successful:
+            kimai.remember_current(None)
+
+    for response in responses:
+        if not response.successful:
+            return response.error
+
+    return None
+
+
+def _overlaps(ranges, start, end):
+    return any(s < end and e > start for s, e in ranges)
+
+
+def _append(path, entries):
+    with open(path, 'a') as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + '\n')
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _format(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
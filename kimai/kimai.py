@@ -1,34 +1,66 @@
 # -*- coding: utf-8 -*-
 
-import requests
 import json
+import time
+import itertools
 
+from datetime import datetime
 from enum import Enum
 from typing import List
-from functools import lru_cache
+from contextlib import contextmanager
 
-from . import dates
+from . import dates, trace
 from .config import config
 from .models import create_record
+from .store import get_store, DEFAULT_TTL, DEFAULT_HISTORY_TTL
+from .transport import api_url, get_transport, DEFAULT_POOL_SIZE
 
 
 class RequestAction(Enum):
     """Represents one of the possible api services the Kimai API supports."""
 
     AUTHENTICATE = 'authenticate'
+    GET_USERS = 'getUsers'
     GET_PROJECTS = 'getProjects'
     GET_TASKS = 'getTasks'
     START_RECORD = 'startRecord'
     STOP_RECORD = 'stopRecord'
+    GET_ACTIVE_RECORDING = 'getActiveRecording'
     GET_TIMESHEET = 'getTimesheet'
     GET_TIMESHEET_RECORD = 'getTimesheetRecord'
     SET_TIMESHEET_RECORD = 'setTimesheetRecord'
     REMOVE_TIMESHEET_RECORD = 'removeTimesheetRecord'
 
+    @property
+    def is_write(self):
+        """Whether the action changes the user's timesheet."""
+        return self in WRITE_ACTIONS
+
+    @property
+    def is_cacheable(self):
+        """Whether responses to the action may be reused inside a `request_scope`."""
+        return self in CACHEABLE_ACTIONS
+
     def __str__(self):
         return self._value_
 
 
+WRITE_ACTIONS = {
+    RequestAction.START_RECORD,
+    RequestAction.STOP_RECORD,
+    RequestAction.SET_TIMESHEET_RECORD,
+    RequestAction.REMOVE_TIMESHEET_RECORD,
+}
+
+CACHEABLE_ACTIONS = {
+    RequestAction.GET_ACTIVE_RECORDING,
+    RequestAction.GET_TIMESHEET,
+    RequestAction.GET_TIMESHEET_RECORD,
+    RequestAction.GET_PROJECTS,
+    RequestAction.GET_TASKS,
+}
+
+
 class RequestParameter(object):
     """Represents a single parameter that gets sent as part of the request
     payload."""
@@ -59,35 +91,217 @@ class RequestParameter(object):
 class RequestPayload(object):
     """Represents the string that gets send as the request payload."""
 
-    def __init__(self, action: RequestAction, requires_auth=True, params: List[RequestParameter]=None):
+    def __init__(self, action: RequestAction, requires_auth=True, params: List[RequestParameter]=None,
+                 record_id=None, span=None):
         self.action = action
         self.api_key = None if not requires_auth else config.get('ApiKey')
         self.params = [] if not params else params
+        # The record and the time span a write touches, so that only the
+        # matching part of the local timesheet store goes stale.
+        self.record_id = record_id
+        self.span = span
 
-    def build(self):
+    def build(self, request_id=1):
         params = [p.build() for p in self.params]
 
         # Prepend api key to parameters if it exists
         if self.api_key:
             params = ['"%s"' % self.api_key] + params
 
-        return '{"jsonrpc":"2.0", "method": "%s", "params": [%s], "id": 1}' \
-               % (self.action, ','.join(params))
+        return '{"jsonrpc":"2.0", "method": "%s", "params": [%s], "id": %d}' \
+               % (self.action, ','.join(params), request_id)
 
     def __repr__(self):
         return self.build()
 
 
+# Responses to cacheable requests by their payload while a `request_scope`
+# is active.
+_responses = None
+
+
+@contextmanager
+def request_scope():
+    """Reuses the responses to read-only requests until the block ends, so
+    that a command fetches the same record or timesheet only once. Every
+    write forgets all responses, since they may be outdated by it."""
+    global _responses
+
+    previous, _responses = _responses, {}
+    try:
+        yield
+    finally:
+        _responses = previous
+
+
+def _cached_response(payload):
+    if _responses is None or not payload.action.is_cacheable:
+        return None
+    return _responses.get(payload.build())
+
+
+def invalidate_store(payloads):
+    """Marks the parts of the local timesheet store that the write payloads
+    among `payloads` touch as stale."""
+
+    store = get_store()
+
+    for payload in payloads:
+        if not payload.action.is_write:
+            continue
+
+        if payload.record_id is None and payload.span is None:
+            store.invalidate()
+        else:
+            store.invalidate(payload.record_id, payload.span)
+
+
+def _remember(payloads, responses):
+    if any(p.action.is_write for p in payloads):
+        invalidate_store(payloads)
+        if _responses is not None:
+            _responses.clear()
+        return
+
+    if _responses is not None:
+        for payload, response in zip(payloads, responses):
+            if payload.action.is_cacheable and response.successful:
+                _responses[payload.build()] = response
+
+
 def send_request(payload: RequestPayload):
     """Sends the request described in the payload to the Kimai API."""
 
-    kimai_url = config.get('KimaiUrl')
-    response = requests.post('{}/core/json.php'.format(kimai_url), data=payload.build())
+    response = _cached_response(payload)
+
+    if response is None:
+        data = payload.build()
+
+        with trace.span('request', action=payload.action) as span:
+            http_response = get_transport().post(api_url(), data)
+            response = KimaiResponse(http_response)
+            span.set(bytes=len(data), status=http_response.status_code, successful=response.successful)
+
+        _remember([payload], [response])
+
+    return response
+
+
+# Ids of calls inside a batch have to be unique so that we can match the
+# responses back to their requests.
+_request_ids = itertools.count(1)
+
+# How many batches in a row the server has to reject before we stop sending
+# them.
+BATCH_REJECTIONS = 3
+
+
+def send_batch(payloads: List[RequestPayload], ordered=False):
+    """Sends all payloads to the Kimai API as a single JSON-RPC batch and
+    returns their responses in the same order as the payloads. Payloads
+    answered by the `request_scope` are left out of the batch.
+
+    If the server rejects the batch as a whole the payloads are sent as
+    concurrent single requests instead, or one after another if they are
+    `ordered`. After `BATCH_REJECTIONS` rejections in a row this is
+    remembered in the config so that we don't try again.
+
+    Calls the server did not answer are only sent again if they don't change
+    the timesheet. Writes may have been applied anyway, they get a failed
+    response that is not `answered`."""
+
+    responses = [_cached_response(p) for p in payloads]
+    missing = [i for i, response in enumerate(responses) if response is None]
+
+    for i, response in zip(missing, _send_batch([payloads[i] for i in missing], ordered)):
+        responses[i] = response
+
+    return responses
+
+
+def _send_batch(payloads, ordered):
+    send_singly = _send_sequentially if ordered else _send_concurrently
+
+    if len(payloads) < 2 or not config.get('BatchRequests', True):
+        return send_singly(payloads)
+
+    ids = [next(_request_ids) for _ in payloads]
+    body = '[%s]' % ','.join(p.build(request_id=i) for p, i in zip(payloads, ids))
+
+    with trace.span('batch', calls=len(payloads)) as span:
+        response = get_transport().post(api_url(), body)
+        results = _parse_batch_response(response)
+        span.set(bytes=len(body), status=response.status_code, rejected=results is None)
+
+    if results is None:
+        # None of the calls were run.
+        _reject_batches()
+        return send_singly(payloads)
+
+    if config.get('BatchRejections') is not None:
+        config.delete('BatchRejections')
+
+    responses = [KimaiResponse.from_result(results[i]) if i in results else None for i in ids]
+    unanswered = [k for k, r in enumerate(responses) if r is None]
+
+    if any(p.action.is_write for p in payloads):
+        _remember(payloads, [])
+    else:
+        answered = [k for k, r in enumerate(responses) if r is not None]
+        _remember([payloads[k] for k in answered], [responses[k] for k in answered])
+
+    repeatable = [k for k in unanswered if not payloads[k].action.is_write]
+
+    for k, response in zip(repeatable, send_singly([payloads[k] for k in repeatable])):
+        responses[k] = response
+
+    return [KimaiResponse.unanswered() if r is None else r for r in responses]
+
+
+def _reject_batches():
+    rejections = config.get('BatchRejections', 0) + 1
+
+    if rejections < BATCH_REJECTIONS:
+        config.set('BatchRejections', rejections)
+    else:
+        config.delete('BatchRejections')
+        config.set('BatchRequests', False)
+
 
-    return KimaiResponse(response)
+def _parse_batch_response(response):
+    """Returns the results of a batch response by id, leaving out calls
+    that were not answered with a result. Returns None if the server
+    rejected the batch as a whole with a single error."""
+    try:
+        data = json.loads(response.text)
+    except ValueError:
+        return {}
+
+    if isinstance(data, dict) and 'error' in data and data.get('id') is None:
+        return None
+
+    if not isinstance(data, list):
+        return {}
+
+    return {item.get('id'): item['result'] for item in data if isinstance(item, dict) and 'result' in item}
+
+
+def _send_sequentially(payloads):
+    return [send_request(p) for p in payloads]
+
+
+def _send_concurrently(payloads):
+    if len(payloads) < 2:
+        return [send_request(p) for p in payloads]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(len(payloads), config.get('PoolSize', DEFAULT_POOL_SIZE))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(send_request, payloads))
 
 
-@lru_cache()
 def authorize_user(record_id):
     record = get_single_record(record_id)
 
@@ -95,19 +309,64 @@ def authorize_user(record_id):
         raise RuntimeError('No record exists for id %s' % record_id)
 
     # This is hack around the fact that the Kimai API does not check whether or not
-    # the current user actually has permissions to edit a record. Since there is no
-    # direct way of retrieving the current user's id, we have to help ourselves by
-    # simply retrieving any record using the saved API key and compare the returned
-    # record's user id with the user id of the record we're trying to operate on.
-    user_records = get_timesheet(limit=1)
+    # the current user actually has permissions to edit a record. We compare the
+    # record's user id with the id of the user the API key belongs to instead.
+    user_id = current_user_id()
 
-    if not user_records:
+    if user_id is None or record.user_id != user_id:
         raise RuntimeError('You are not authorized to edit this record')
 
-    current_user_item = user_records[0]
+    return record
 
-    if not record.user_id == current_user_item.user_id:
-        raise RuntimeError('You are not authorized to edit this record')
+
+def user_payloads():
+    return [RequestPayload(RequestAction.GET_USERS), timesheet_payload(limit=1)]
+
+
+def user_id_from_responses(users, timesheet):
+    """Works out the current user's id from the responses to the
+    `user_payloads`. Kimai has no direct way of asking who the API key
+    belongs to, so we take the user of the newest record. Users without any
+    records can only be identified if getUsers lists nobody but them."""
+
+    if timesheet.items:
+        return str(timesheet.items[0]['userID'])
+
+    if users.items and len(users.items) == 1:
+        return str(users.items[0]['userID'])
+
+    return None
+
+
+def cached_user_id():
+    """Returns the cached id of the current user if it belongs to the
+    configured API key."""
+    user = config.get('User')
+
+    if user and user.get('ApiKey') == config.get('ApiKey'):
+        # Older configs may hold the id as a number.
+        return str(user['Id'])
+
+    return None
+
+
+def remember_user_id(user_id):
+    if user_id is not None:
+        config.set('User', {'Id': str(user_id), 'ApiKey': config.get('ApiKey')})
+
+
+def current_user_id(refresh=False):
+    """Returns the id of the user the API key belongs to. It is resolved
+    with a single round trip and then cached in the config until the API
+    key changes."""
+
+    user_id = None if refresh else cached_user_id()
+
+    if user_id is None:
+        user_id = user_id_from_responses(*send_batch(user_payloads()))
+        remember_user_id(user_id)
+
+    return user_id
 
 
 def authenticate(username, password):
@@ -121,11 +380,22 @@ def authenticate(username, password):
             RequestParameter(password),
         ]
     )
-    response = requests.post('{}/core/json.php'.format(config.get('KimaiUrl')), data=payload.build())
+    with trace.span('request', action=payload.action):
+        response = get_transport().post(api_url(), payload.build())
 
     return KimaiAuthResponse(response)
 
 
+def get_projects_and_tasks():
+    """Return all available projects and tasks with a single round trip."""
+    projects, tasks = send_batch([
+        RequestPayload(RequestAction.GET_PROJECTS),
+        RequestPayload(RequestAction.GET_TASKS),
+    ])
+
+    return projects.items, tasks.items
+
+
 def get_projects():
     """Return a list of all available projects."""
     return send_request(
@@ -133,119 +403,318 @@ def get_projects():
     ).items
 
 
-def get_tasks():
-    """Return a list of all available tasks."""
+def get_tasks(project_id=None):
+    """Return a list of all available tasks, or only those of a project."""
+    params = None if project_id is None else [RequestParameter(project_id)]
+
     return send_request(
-        RequestPayload(RequestAction.GET_TASKS)
+        RequestPayload(RequestAction.GET_TASKS, params=params)
     ).items
 
 
-def start_recording(task_id, project_id):
-    """Starts a new recording for the provided task and project."""
-
-    payload = RequestPayload(
+def start_payload(task_id, project_id):
+    return RequestPayload(
         RequestAction.START_RECORD,
         params=[
             RequestParameter(project_id),
             RequestParameter(task_id),
-        ]
+        ],
+        span=(datetime.now(), None)
     )
 
-    response = send_request(payload)
+
+def start_recording(task_id, project_id):
+    """Starts a new recording for the provided task and project."""
+
+    response = send_request(start_payload(task_id, project_id))
 
     if response.successful:
-        current = get_current()
-        config.set('CurrentEntry', current.id)
+        items = response.items or [{}]
+        if 'id' in items[0]:
+            # We don't know the details of the new record yet, the next
+            # `get_current` will ask for them.
+            config.set('CurrentEntry', str(items[0]['id']))
+            forget_current()
+        else:
+            get_active_recording()
 
     return response
 
 
+def stop_payload(record_id):
+    return RequestPayload(RequestAction.STOP_RECORD, params=[RequestParameter(record_id)], record_id=record_id)
+
+
 def stop_recording():
-    """Stops the running record if there is one."""
+    """Stops the running record if there is one and saves the comment the
+    user entered for it.
 
-    time_entry_id = config.get('CurrentEntry')
+    This takes at most two round trips: one to look up the record, which is
+    skipped while the local snapshot is fresh, and one batch that stops the
+    record and sets its comment."""
 
-    if time_entry_id is not None:
-        # Since the saved time entry id could have been tampered with by someone
-        # editing the config directly, we have to check it again here.
-        authorize_user(time_entry_id)
-    else:
-        current_record = get_current()
-        time_entry_id = current_record.id
+    record = _running_record()
 
-    payload = RequestPayload(
-        RequestAction.STOP_RECORD,
-        params=[RequestParameter(time_entry_id)]
-    )
+    if record is None:
+        return None
 
-    response = send_request(payload)
+    payloads = [stop_payload(record.id)]
+    comment = config.get('Comment')
 
-    # If we were successful in stopping the running record we now try to set
-    # its comment if the user entered one. We have to do it like this because
-    # Kimai does not expose a direct way to edit a running record.
-    if response.successful:
-        comment = config.get('Comment')
+    # Kimai does not expose a direct way to edit a running record, so the
+    # comment is set by updating the record right after stopping it.
+    if comment:
+        end = datetime.now().replace(microsecond=0)
+        payloads.append(update_payload(record, end=end, comment=comment))
 
-        if comment:
-            comment_on_record(time_entry_id, comment)
-            # Make sure we delete the comment if we successfully saved it.
-            # Otherwise it would show up for the next record as well.
+    response, *comment_responses = send_batch(payloads, ordered=True)
+
+    if response.successful:
+        # Only forget the comment once it is saved. Otherwise it would be
+        # lost, or show up for the next record if we kept it too long.
+        if comment and comment_responses[0].successful:
             config.delete('Comment')
 
-        config.delete('CurrentEntry')
+        remember_current(None)
 
     return response
 
 
-def get_current():
-    """Returns the currently running record if there is any."""
+def _running_record():
+    time_entry_id = config.get('CurrentEntry')
 
-    timesheet = get_timesheet(limit=1)
-    if not timesheet:
-        return
+    if time_entry_id is None:
+        return get_current()
 
-    record = timesheet[0]
+    item = _snapshot_item()
 
-    if record.end:
-        return
+    if item:
+        return create_record(item)
+
+    # Since the saved time entry id could have been tampered with by someone
+    # editing the config directly, we have to check it again here.
+    return authorize_user(time_entry_id)
 
-    return record
 
+def get_current(cached=False):
+    """Returns the currently running record if there is any. With `cached`
+    the answer comes from the local snapshot as long as it is fresh,
+    otherwise Kimai is asked with a single request."""
 
-def get_todays_records():
+    if cached:
+        item = _snapshot_item()
+
+        if item is not False:
+            return create_record(item) if item else None
+
+    return get_active_recording()
+
+
+def _snapshot_item():
+    """Returns the item of the running record from the local snapshot, None
+    if the snapshot says that nothing is running, or False if it can't be
+    trusted.
+
+    The snapshot only counts if it was taken for the configured account, if
+    it still describes the entry we think is running, and if it was taken
+    recently enough that changes made elsewhere (like in Kimai's web UI) are
+    unlikely."""
+
+    snapshot = config.get('CurrentRecord')
+    ttl = config.get('CacheTTL', DEFAULT_TTL)
+
+    if not snapshot or snapshot.get('ApiKey') != config.get('ApiKey'):
+        return False
+
+    if time.time() - snapshot['SyncedAt'] >= ttl:
+        return False
+
+    item = snapshot['Item']
+
+    if (item and item['timeEntryID']) != config.get('CurrentEntry'):
+        return False
+
+    return item
+
+
+def get_active_recording():
+    """Asks Kimai for the running record and updates the local snapshot."""
+
+    item = active_item(send_request(active_recording_payload()))
+    remember_current(item)
+
+    return create_record(item) if item else None
+
+
+def active_recording_payload():
+    return RequestPayload(RequestAction.GET_ACTIVE_RECORDING)
+
+
+def active_item(response):
+    # Kimai answers with an error if nothing is running.
+    return response.items[0] if response.successful and response.items else None
+
+
+def remember_current(item):
+    """Updates the local snapshot of the running record."""
+    if item is None:
+        if config.get('CurrentEntry') is not None:
+            config.delete('CurrentEntry')
+    else:
+        config.set('CurrentEntry', item['timeEntryID'])
+
+    config.set('CurrentRecord', {'Item': item, 'SyncedAt': time.time(), 'ApiKey': config.get('ApiKey')})
+
+
+def forget_current():
+    if config.get('CurrentRecord') is not None:
+        config.delete('CurrentRecord')
+
+
+def get_todays_records(refresh=False):
     """Returns all records for the current day"""
-    return get_timesheet(
-        dates.parse('today at 00:00').isoformat(),
-        dates.parse('today at 23:59:59').isoformat()
+    return get_records_between(
+        dates.parse('today at 00:00'),
+        dates.parse('today at 23:59:59'),
+        refresh=refresh
     )
 
 
-def get_timesheet(start_date=0, end_date=0, limit=0):
-    """Returns all time sheets for a user"""
+def get_records_between(start, end, refresh=False):
+    """Returns all records between the two dates, see `get_items_between`."""
 
-    payload = RequestPayload(
+    items = get_items_between(start, end, refresh=refresh)
+
+    with trace.span('records') as span:
+        records = [create_record(item) for item in items]
+        span.set(count=len(records))
+
+    return records
+
+
+def get_items_between(start, end, refresh=False):
+    """Returns the raw items of all records between the two dates, newest
+    first. They are read from the local timesheet store; only the parts of
+    the range the store has not synced recently (see `TimesheetStore.missing`)
+    are fetched from Kimai, or the whole range if `refresh` is set."""
+
+    store = get_store()
+
+    if refresh:
+        gaps = [(start, end)]
+    else:
+        gaps = store.missing(
+            start, end,
+            ttl=config.get('CacheTTL', DEFAULT_TTL),
+            history_ttl=config.get('HistoryTTL', DEFAULT_HISTORY_TTL)
+        )
+
+    for gap_start, gap_end in gaps:
+        sync_timesheet(gap_start, gap_end)
+
+    return store.items(start, end)
+
+
+def sync_timesheet(start, end):
+    """Fetches all records between the two dates page by page and replaces
+    the range in the local timesheet store."""
+
+    pages = iter_timesheet_pages(start.isoformat(), end.isoformat())
+    get_store().replace_range(start, end, itertools.chain.from_iterable(pages))
+
+
+# Paging of the timesheet. The page size starts out at DEFAULT_PAGE_SIZE and,
+# if adaptive, grows or shrinks within the bounds depending on how long the
+# server took to answer compared to TARGET_PAGE_LATENCY (in seconds).
+DEFAULT_PAGE_SIZE = 250
+MIN_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 2000
+TARGET_PAGE_LATENCY = 0.5
+
+
+def iter_timesheet_pages(start_date=0, end_date=0, page_size=DEFAULT_PAGE_SIZE, adaptive=True):
+    """Walks the timesheet page by page and yields the raw items of every
+    page as soon as it arrived."""
+
+    offset = 0
+
+    while True:
+        started = time.monotonic()
+        response = send_request(timesheet_payload(start_date, end_date, page_size, offset))
+        latency = time.monotonic() - started
+
+        if not response.successful:
+            raise RuntimeError('Could not fetch the timesheet: %s' % response.error)
+
+        items = response.items
+
+        if items:
+            yield items
+
+        if len(items) < page_size:
+            return
+
+        offset += len(items)
+
+        if adaptive:
+            page_size = adapt_page_size(page_size, latency)
+
+
+def adapt_page_size(page_size, latency):
+    """Returns the page size for the next request based on the latency of
+    the last one."""
+
+    if latency < TARGET_PAGE_LATENCY / 2:
+        return min(page_size * 2, MAX_PAGE_SIZE)
+
+    if latency > TARGET_PAGE_LATENCY:
+        return max(page_size // 2, MIN_PAGE_SIZE)
+
+    return page_size
+
+
+def iter_timesheet(start_date=0, end_date=0, page_size=DEFAULT_PAGE_SIZE, adaptive=True):
+    """Lazily yields all records of a user. Unlike `get_timesheet` only one
+    page of records is held in memory at a time."""
+
+    for items in iter_timesheet_pages(start_date, end_date, page_size, adaptive):
+        for item in items:
+            yield create_record(item)
+
+
+def timesheet_payload(start_date=0, end_date=0, limit=0, offset=0):
+    return RequestPayload(
         RequestAction.GET_TIMESHEET,
         params=[
             RequestParameter(start_date),  # Time of first entry to fetch
             RequestParameter(end_date),    # Time of last entry to fetch
             RequestParameter(-1),          # Whatever this one is
-            RequestParameter(0),           # No particular starting id
+            RequestParameter(offset),      # How many records to skip
             RequestParameter(limit)        # How many records to fetch
         ]
     )
-    response = send_request(payload)
 
-    return [create_record(r) for r in response.items]
 
+def get_timesheet(start_date=0, end_date=0, limit=0):
+    """Returns all time sheets for a user"""
 
-def get_single_record(record_id):
-    """Retrieves a single record from Kimai"""
+    response = send_request(timesheet_payload(start_date, end_date, limit))
 
-    payload = RequestPayload(
+    with trace.span('records', count=len(response.items)):
+        return [create_record(r) for r in response.items]
+
+
+def record_payload(record_id):
+    return RequestPayload(
         RequestAction.GET_TIMESHEET_RECORD,
         params=[RequestParameter(record_id)]
     )
-    response = send_request(payload)
+
+
+def get_single_record(record_id):
+    """Retrieves a single record from Kimai"""
+
+    response = send_request(record_payload(record_id))
 
     if not response.successful:
         raise KeyError('No record exists for id %s' % record_id)
@@ -253,9 +722,7 @@ def get_single_record(record_id):
     return create_record(response.items[0])
 
 
-def add_record(start, end, project, task, comment=''):
-    """Add a new record to Kimai"""
-
+def add_payload(start, end, project, task, comment=''):
     record_param = RequestParameter({
         'start': start.isoformat(),
         'end': end.isoformat(),
@@ -265,18 +732,17 @@ def add_record(start, end, project, task, comment=''):
         'comment': comment
     }, quoted=False)
 
-    payload = RequestPayload(RequestAction.SET_TIMESHEET_RECORD, params=[record_param])
-
-    return send_request(payload)
+    return RequestPayload(RequestAction.SET_TIMESHEET_RECORD, params=[record_param], span=(start, end))
 
 
-def edit_record(record_id, start=None, end=None, comment=None, project_id=None, task_id=None):
-    authorize_user(record_id)
+def add_record(start, end, project, task, comment=''):
+    """Add a new record to Kimai"""
+    return send_request(add_payload(start, end, project, task, comment))
 
-    record = get_single_record(record_id)
 
-    if not record:
-        raise KeyError('No entry exists for id %s' % record_id)
+def update_payload(record, start=None, end=None, comment=None, project_id=None, task_id=None):
+    """Builds the payload to update an existing record. Every value that
+    was not provided is taken over from the record."""
 
     start = record.start if start is None else start
     end = record.end if end is None else end
@@ -285,7 +751,7 @@ def edit_record(record_id, start=None, end=None, comment=None, project_id=None,
     task_id = record.task.id if task_id is None else task_id
 
     record_param = RequestParameter({
-        'id': record_id,
+        'id': record.id,
         'start': start.isoformat(),
         'end': end.isoformat(),
         'projectId': project_id,
@@ -294,34 +760,121 @@ def edit_record(record_id, start=None, end=None, comment=None, project_id=None,
         'comment': comment
     }, quoted=False)
 
-    payload = RequestPayload(
+    return RequestPayload(
         RequestAction.SET_TIMESHEET_RECORD,
         params=[
             record_param,
             RequestParameter(True)  # Update the record
-        ]
+        ],
+        record_id=record.id,
+        span=(start, end)
     )
 
-    return send_request(payload)
+
+def edit_record(record_id, start=None, end=None, comment=None, project_id=None, task_id=None):
+    record = authorize_user(record_id)
+
+    return send_request(update_payload(record, start, end, comment, project_id, task_id))
+
+
+def edit_records(record_ids, start=None, end=None, comment=None, project_id=None, task_id=None):
+    """Applies the same changes to several records. The records are fetched
+    in one batch and updated in a second one. Returns a dict of responses by
+    record id."""
+
+    records, results = fetch_authorized_records(record_ids)
+
+    ids = list(records)
+    responses = send_batch([
+        update_payload(records[i], start, end, comment, project_id, task_id) for i in ids
+    ])
+    results.update(zip(ids, responses))
+
+    return {i: results[i] for i in record_ids}
 
 
 def comment_on_record(record_id, comment):
     return edit_record(record_id, comment=comment)
 
 
+def delete_payload(record_id):
+    return RequestPayload(RequestAction.REMOVE_TIMESHEET_RECORD, params=[RequestParameter(record_id)],
+                          record_id=record_id)
+
+
 def delete_record(id):
     """Delete a record by its id. You can only delete your own records."""
     authorize_user(id)
-    payload = RequestPayload(RequestAction.REMOVE_TIMESHEET_RECORD, params=[RequestParameter(id)])
-    return send_request(payload)
+    return send_request(delete_payload(id))
+
+
+def delete_records(record_ids):
+    """Deletes several records with two batched round trips. Returns a
+    dict of responses by record id."""
+
+    records, results = fetch_authorized_records(record_ids)
+
+    ids = list(records)
+    results.update(zip(ids, send_batch([delete_payload(i) for i in ids])))
+
+    return {i: results[i] for i in record_ids}
+
+
+def fetch_authorized_records(record_ids):
+    """Fetches the given records in a single batch and checks that the
+    current user may edit them (see `authorize_user`).
+
+    Returns the editable records by id, plus a failed response for every id
+    that cannot be edited."""
+
+    user_id = current_user_id()
+    responses = send_batch([record_payload(i) for i in record_ids])
+
+    records, failures = {}, {}
+
+    for record_id, response in zip(record_ids, responses):
+        if not response.successful or not response.items:
+            failures[record_id] = KimaiResponse.failure('No record exists for id %s' % record_id)
+            continue
+
+        record = create_record(response.items[0])
+
+        if user_id is None or record.user_id != user_id:
+            failures[record_id] = KimaiResponse.failure('You are not authorized to edit this record')
+        else:
+            records[record_id] = record
+
+    return records, failures
 
 
 class KimaiResponse(object):
     """Generic response object for the Kimai (sort of) JSON API"""
 
+    answered = True
+
     def __init__(self, response):
         self.data = json.loads(response.text)['result']
 
+    @classmethod
+    def from_result(cls, result):
+        """Creates a response from the already decoded result of a call."""
+        response = cls.__new__(cls)
+        response.data = result
+        return response
+
+    @classmethod
+    def failure(cls, message):
+        """Creates a failed response for an error that was detected locally."""
+        return cls.from_result({'success': False, 'error': {'msg': message}})
+
+    @classmethod
+    def unanswered(cls):
+        """Creates a failed response for a call the server did not answer,
+        which may or may not have been applied."""
+        response = cls.failure('Kimai did not answer, the change may have been applied anyway')
+        response.answered = False
+        return response
+
     @property
     def successful(self):
         return self.data['success']
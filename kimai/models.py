@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import sys
+
 from datetime import datetime, timedelta
 
 
@@ -13,14 +15,34 @@ def create_record(data: dict):
         duration=data['duration'],
         formatted_duration=data.get('formattedDuration'),
         comment=data['comment'],
-        customer=Customer(data['customerID'], data['customerName']),
-        project=Project(data['projectID'], data['projectName']),
-        task=Task(data['activityID'], data['activityName']),
-        user_id=data['userID']
+        customer=interned(Customer, data['customerID'], data['customerName']),
+        project=interned(Project, data['projectID'], data['projectName']),
+        task=interned(Task, data['activityID'], data['activityName']),
+        user_id=sys.intern(str(data['userID']))
     )
 
 
+# The same project, task or customer shows up in thousands of records, so
+# records share a single object for each. They are keyed by name as well as
+# by id so that a renamed project never shows up under its old name. Shared
+# objects must not be changed.
+_interned = {}
+
+
+def interned(cls, object_id, name):
+    """Returns the shared instance of a project, task or customer."""
+    key = (cls, object_id, name)
+    instance = _interned.get(key)
+
+    if instance is None:
+        instance = _interned[key] = cls(object_id, name)
+
+    return instance
+
+
 class Project(object):
+    __slots__ = ('id', 'name')
+
     def __init__(self, project_id, name):
         self.id = project_id
         self.name = name
@@ -30,6 +52,8 @@ class Project(object):
 
 
 class Task(object):
+    __slots__ = ('id', 'name')
+
     def __init__(self, task_id, name):
         self.id = task_id
         self.name = name
@@ -39,6 +63,8 @@ class Task(object):
 
 
 class Customer(object):
+    __slots__ = ('id', 'name')
+
     def __init__(self, customer_id, name):
         self.id = customer_id
         self.name = name
@@ -48,6 +74,8 @@ class Customer(object):
 
 
 class Favorite(object):
+    __slots__ = ('project', 'task')
+
     def __init__(self, project, task):
         self.project = project
         self.task = task
@@ -56,6 +84,10 @@ class Favorite(object):
 class Record(object):
     """Represents a single entry in a time sheet."""
 
+    __slots__ = (
+        'id', 'customer', 'task', 'project', 'end', 'start', 'comment', 'duration', 'formatted_duration', 'user_id'
+    )
+
     def __init__(self, record_id, start=None, end=None, project=None, task=None,
                  customer=None, comment=None, duration=None, formatted_duration=None, user_id=None):
         # Convert timestamp strings to something more practical
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import json
+import sys
+
+from datetime import date, datetime, timedelta
+
+from . import trace
+
+
+FORMATS = ('table', 'csv', 'tsv', 'jsonl')
+
+# The table is laid out after this many rows. Later rows are fitted into the
+# same column widths, so a table of any length renders in constant memory.
+TABLE_WINDOW = 100
+
+# Cells longer than this are cut off in tables.
+MAX_COLUMN_WIDTH = 40
+
+
+def write_rows(rows, headers, output='table', display=None, file=None):
+    """Writes rows one by one as soon as they are produced.
+
+    Rows are sequences of plain values. Tables show them as strings, or as
+    returned by `display` for a row. The machine readable formats write
+    dates in ISO format and durations in seconds, see `serialize`.
+    """
+    with trace.span('render', output=output):
+        _write_rows(rows, headers, output, display, sys.stdout if file is None else file)
+
+
+def _write_rows(rows, headers, output, display, file):
+    if output == 'table':
+        if display is not None:
+            rows = map(display, rows)
+        write_table(rows, headers, file)
+    elif output == 'jsonl':
+        for row in rows:
+            file.write(json.dumps(dict(zip(headers, map(serialize, row)))) + '\n')
+    elif output in ('csv', 'tsv'):
+        import csv
+
+        writer = csv.writer(file, delimiter=',' if output == 'csv' else '\t', lineterminator='\n')
+        writer.writerow(headers)
+        writer.writerows([serialize(v) for v in row] for row in rows)
+    else:
+        raise ValueError('Unknown output format %s' % output)
+
+
+def write_table(rows, headers, file, window=TABLE_WINDOW, max_width=MAX_COLUMN_WIDTH):
+    """Writes a grid table. Column widths are taken from the headers and the
+    first `window` rows and are capped at `max_width`."""
+    rows = (list(map(_cell, row)) for row in rows)
+    head = list(itertools.islice(rows, window))
+    headers = [_cell(h) for h in headers]
+
+    widths = [min(max_width, max([len(h)] + [len(r[i]) for r in head])) for i, h in enumerate(headers)]
+
+    border = '+' + '+'.join('-' * (w + 2) for w in widths) + '+\n'
+
+    file.write(border)
+    file.write(_line(headers, widths))
+    file.write(border.replace('-', '='))
+
+    for row in itertools.chain(head, rows):
+        file.write(_line(row, widths))
+        file.write(border)
+
+
+def serialize(value):
+    """Converts a value for the machine readable formats."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def _cell(value):
+    return '' if value is None else ' '.join(str(value).splitlines())
+
+
+def _line(cells, widths):
+    return '| ' + ' | '.join(_fit(c, w) for c, w in zip(cells, widths)) + ' |\n'
+
+
+def _fit(cell, width):
+    if len(cell) > width:
+        return cell[:width - 1] + '…'
+    return cell.ljust(width)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from .columnar import GROUPS, RecordBatch
+
+
+class Report(object):
+    """Aggregates timesheet items by a list of groups in a single pass.
+
+    Items are the raw dicts returned by the Kimai API. Every page of them is
+    turned into a `RecordBatch`, grouped and dropped, so for every
+    combination of group values the report only holds the total duration in
+    seconds and the number of records. Records that are still running count
+    up to `now`. If the report covers a range from `start` to `end` (as
+    timestamps) only the part of every record inside it counts.
+    """
+
+    def __init__(self, groups, now=None, start=None, end=None):
+        unknown = [g for g in groups if g not in GROUPS]
+        if unknown:
+            raise ValueError('Unknown group %s, expected one of %s' % (', '.join(unknown), ', '.join(GROUPS)))
+
+        self.groups = list(groups)
+        self.now = int(time.time() if now is None else now)
+        self.start = None if start is None else int(start)
+        self.end = None if end is None else int(end)
+        self.totals = {}
+
+    def add_all(self, items):
+        batch = RecordBatch.from_items(items, self.now)
+
+        if self.start is not None or self.end is not None:
+            batch.clip(self.start, self.end)
+
+        return self.add_batch(batch)
+
+    def add_batch(self, batch):
+        for key, (seconds, count) in batch.group_by(self.groups).items():
+            total = self.totals.get(key)
+
+            if total is None:
+                self.totals[key] = [seconds, count]
+            else:
+                total[0] += seconds
+                total[1] += count
+
+        return self
+
+    def rows(self):
+        """Yields `(key, seconds, count)` for every group in sorted order.
+        Each group is followed by a subtotal whose key ends in None for
+        every level except the innermost, and the grand total comes last
+        with a key of only None."""
+        depth = len(self.groups)
+        subtotals = [None] * depth
+
+        for key in sorted(self.totals):
+            for level in range(depth - 1, 0, -1):
+                if subtotals[level] is not None and subtotals[level][0] != key[:level]:
+                    yield self._subtotal(subtotals[level], depth)
+                    subtotals[level] = None
+
+            seconds, count = self.totals[key]
+            yield key, seconds, count
+
+            for level in range(1, depth):
+                if subtotals[level] is None:
+                    subtotals[level] = [key[:level], 0, 0]
+                subtotals[level][1] += seconds
+                subtotals[level][2] += count
+
+        for level in range(depth - 1, 0, -1):
+            if subtotals[level] is not None:
+                yield self._subtotal(subtotals[level], depth)
+
+        yield (None,) * depth, self.total[0], self.total[1]
+
+    @property
+    def total(self):
+        seconds = sum(t[0] for t in self.totals.values())
+        count = sum(t[1] for t in self.totals.values())
+        return seconds, count
+
+    @staticmethod
+    def _subtotal(subtotal, depth):
+        prefix, seconds, count = subtotal
+        return prefix + (None,) * (depth - len(prefix)), seconds, count
+
+
+def format_duration(seconds):
+    return '%d:%02d' % (seconds // 3600, seconds % 3600 // 60)
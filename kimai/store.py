@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from datetime import datetime
+
+from .config import config, data_path
+
+
+DEFAULT_TTL = 300
+
+# Records that ended a day before they were synced are rarely changed any
+# more. The part of a range that old stays fresh for DEFAULT_HISTORY_TTL
+# seconds instead of DEFAULT_TTL, unless we change its records ourselves.
+SETTLED_AGE = 24 * 60 * 60
+DEFAULT_HISTORY_TTL = 7 * 24 * 60 * 60
+
+# Stands in for the end of running records when ranges are cut.
+_FOREVER = 2 ** 62
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS records (
+        id INTEGER PRIMARY KEY,
+        start INTEGER NOT NULL,
+        end INTEGER,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS records_start ON records (start);
+    CREATE TABLE IF NOT EXISTS ranges (
+        start INTEGER NOT NULL,
+        end INTEGER NOT NULL,
+        synced_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+'''
+
+
+class TimesheetStore(object):
+    """Local mirror of the user's timesheet.
+
+    Records are kept as the raw items returned by the Kimai API so that they
+    can be turned into `Record` objects with `create_record`. Next to the
+    records we remember which time ranges (in whole seconds, both ends
+    included) have been synced and when, so that reads only have to fetch
+    the parts of a range that are missing or stale, see `missing`.
+
+    Like the Kimai API, a record belongs to a range if the two overlap.
+    Running records have no end and overlap every range after their start.
+
+    Requests may be sent from worker threads, so the store can be used from
+    any thread; a lock serializes access to the connection.
+    """
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        self.modified = False
+        self._lock = threading.RLock()
+
+    def claim(self, owner):
+        """Makes the store belong to `owner`. The records of a previous owner,
+        like another account before `kimai configure`, are removed."""
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'owner'").fetchone()
+
+            if row is not None and row[0] == owner:
+                return
+
+            removed = self.connection.execute('DELETE FROM records').rowcount
+            self.connection.execute('DELETE FROM ranges')
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('owner', ?)", (owner,))
+
+        if removed:
+            self.modified = True
+
+    def items(self, start, end):
+        """Returns the raw items of all records in the range, newest first."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT data FROM records WHERE start <= ? AND (end IS NULL OR end >= ?) ORDER BY start DESC',
+                (_timestamp(end), _timestamp(start))
+            )
+            return [json.loads(data) for data, in rows]
+
+    def missing(self, start, end, ttl=DEFAULT_TTL, history_ttl=DEFAULT_HISTORY_TTL):
+        """Returns the parts of the range that were not synced in the last
+        `ttl` seconds (or `history_ttl` for settled parts) as a list of
+        `(start, end)` datetimes."""
+        start, end = _timestamp(start), _timestamp(end)
+        now = time.time()
+
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT start, end FROM ranges WHERE start <= ? AND end >= ? '
+                'AND (synced_at >= ? OR (end < synced_at - ? AND synced_at >= ?)) ORDER BY start',
+                (end, start, now - ttl, SETTLED_AGE, now - history_ttl)
+            ).fetchall()
+
+        gaps = []
+        cursor = start
+
+        for synced_start, synced_end in rows:
+            if synced_start > cursor:
+                gaps.append((cursor, synced_start - 1))
+            cursor = max(cursor, synced_end + 1)
+
+        if cursor <= end:
+            gaps.append((cursor, end))
+
+        return [(datetime.fromtimestamp(s), datetime.fromtimestamp(e)) for s, e in gaps]
+
+    def is_fresh(self, start, end, ttl=DEFAULT_TTL):
+        """Checks whether the whole range was synced in the last `ttl` seconds."""
+        return not self.missing(start, end, ttl, history_ttl=ttl)
+
+    def replace_range(self, start, end, items):
+        """Replaces all records in the range with the given items and marks
+        the range as freshly synced. The items may be any iterable; they are
+        consumed one by one inside a single transaction."""
+        start, end = _timestamp(start), _timestamp(end)
+        synced_at = time.time()
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                'DELETE FROM records WHERE start <= ? AND (end IS NULL OR end >= ?)', (end, start)
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO records (id, start, end, data) VALUES (?, ?, ?, ?)',
+                (_row(item) for item in items)
+            )
+            # Ranges inside the new one are redundant from now on.
+            self.connection.execute('DELETE FROM ranges WHERE start >= ? AND end <= ?', (start, end))
+
+            # The settled part of the range is kept apart, so that it stays
+            # fresh for longer.
+            settled = int(synced_at - SETTLED_AGE)
+            parts = [(start, settled - 1), (settled, end)] if start < settled <= end else [(start, end)]
+
+            self.connection.executemany(
+                'INSERT INTO ranges (start, end, synced_at) VALUES (?, ?, ?)',
+                ((s, e, synced_at) for s, e in parts)
+            )
+
+        self.modified = True
+
+    def recent_ids(self, limit):
+        """Returns the ids of the most recently started records."""
+        with self._lock:
+            rows = self.connection.execute('SELECT id FROM records ORDER BY start DESC LIMIT ?', (limit,))
+            return [record_id for record_id, in rows]
+
+    def invalidate(self, record_id=None, span=None):
+        """Marks the synced ranges that a change of the timesheet may have
+        made outdated as stale: those overlapping the record with the given
+        id as it is stored, and those overlapping the `(start, end)` span of
+        datetimes. Only the overlapping parts become stale. Without a record
+        or a span, everything is."""
+        with self._lock, self.connection:
+            if record_id is None and span is None:
+                self.connection.execute('DELETE FROM ranges')
+                return
+
+            if record_id is not None:
+                row = self.connection.execute('SELECT start, end FROM records WHERE id = ?', (int(record_id),))
+                for start, end in row.fetchall():
+                    self._cut(start, _FOREVER if end is None else end)
+
+            if span is not None:
+                start, end = span
+                self._cut(_timestamp(start), _FOREVER if end is None else _timestamp(end))
+
+    def _cut(self, start, end):
+        rows = self.connection.execute(
+            'SELECT rowid, start, end, synced_at FROM ranges WHERE start <= ? AND end >= ?', (end, start)
+        ).fetchall()
+
+        for rowid, synced_start, synced_end, synced_at in rows:
+            self.connection.execute('DELETE FROM ranges WHERE rowid = ?', (rowid,))
+
+            if synced_start < start:
+                self.connection.execute(
+                    'INSERT INTO ranges (start, end, synced_at) VALUES (?, ?, ?)', (synced_start, start - 1, synced_at)
+                )
+            if synced_end > end:
+                self.connection.execute(
+                    'INSERT INTO ranges (start, end, synced_at) VALUES (?, ?, ?)', (end + 1, synced_end, synced_at)
+                )
+
+    def close(self):
+        self.connection.close()
+
+
+def _timestamp(date):
+    return int(date.timestamp())
+
+
+def _row(item):
+    end = int(item['end']) if item['end'] and item['end'] != '0' else None
+    return int(item['timeEntryID']), int(item['start']), end, json.dumps(item)
+
+
+_store = None
+_store_owner = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the timesheet store of the configured user, opening it on
+    first use. The store is emptied whenever KimaiUrl or ApiKey changed since
+    its records were synced."""
+    global _store, _store_owner
+
+    owner = _owner()
+
+    with _store_lock:
+        if _store is None:
+            _store = TimesheetStore(data_path('timesheet.db'))
+
+        if owner != _store_owner:
+            _store.claim(owner)
+            _store_owner = owner
+
+    return _store
+
+
+def _owner():
+    # The API key itself is not written to the store.
+    account = '%s\n%s' % (config.get('KimaiUrl'), config.get('ApiKey'))
+    return hashlib.sha256(account.encode('utf-8')).hexdigest()
+
+
+def was_modified():
+    """Whether records were written to the store during this invocation."""
+    return _store is not None and _store.modified
+
+
+def reset_store():
+    global _store, _store_owner
+
+    if _store is not None:
+        _store.close()
+        _store = None
+        _store_owner = None
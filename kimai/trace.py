@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+import threading
+import time
+
+
+# Taken when the kimai package is first imported, so that the time spent on
+# imports before tracing was switched on can be reported as well.
+IMPORTED_AT = time.perf_counter()
+
+FORMATS = ('tree', 'json')
+
+_tracer = None
+_output, _file = 'tree', None
+
+
+class Span(object):
+    """A timed phase of a command. Attributes are kept as given and only
+    turned into strings when the trace is written."""
+
+    __slots__ = ('name', 'attributes', 'started', 'elapsed', 'children')
+
+    def __init__(self, name, attributes, started):
+        self.name = name
+        self.attributes = attributes
+        self.started = started
+        self.elapsed = None
+        self.children = []
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self, origin):
+        return {
+            'name': self.name,
+            'attributes': {k: _value(v) for k, v in self.attributes.items()},
+            'start_ms': round((self.started - origin) * 1000, 3),
+            'duration_ms': None if self.elapsed is None else round(self.elapsed * 1000, 3),
+            'children': [child.to_dict(origin) for child in self.children],
+        }
+
+
+class NullSpan(object):
+    """Stands in for a span while tracing is off."""
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer(object):
+    """Collects the spans of one invocation into a tree.
+
+    Every thread nests its spans on its own stack. Spans opened by a thread
+    without any (like a worker of a pool) belong to the innermost span of
+    the thread that started tracing.
+    """
+
+    def __init__(self, name, clock=time.perf_counter):
+        self.clock = clock
+        self.root = Span(name, {}, clock())
+        self._main = threading.get_ident()
+        self._stacks = {self._main: [self.root]}
+        self._lock = threading.Lock()
+
+    def span(self, name, attributes):
+        return _ActiveSpan(self, Span(name, attributes, self.clock()))
+
+    def add(self, name, started, elapsed, **attributes):
+        """Adds a span that already ended, like the imports before tracing."""
+        span = Span(name, attributes, started)
+        span.elapsed = elapsed
+        self.root.children.append(span)
+
+    def finish(self):
+        self.root.elapsed = self.clock() - self.root.started
+        return self.root
+
+    def _push(self, span):
+        thread = threading.get_ident()
+
+        with self._lock:
+            stack = self._stacks.get(thread)
+
+            if not stack:
+                stack = self._stacks[thread] = [self._stacks[self._main][-1]]
+
+            stack[-1].children.append(span)
+            stack.append(span)
+
+    def _pop(self, span):
+        span.elapsed = self.clock() - span.started
+
+        thread = threading.get_ident()
+
+        with self._lock:
+            stack = self._stacks[thread]
+            stack.remove(span)
+
+            # Only the span borrowed from the main thread is left. The next
+            # span of this thread may belong somewhere else.
+            if len(stack) == 1 and thread != self._main:
+                del self._stacks[thread]
+
+
+class _ActiveSpan(object):
+
+    __slots__ = ('tracer', 'span')
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        self.tracer._push(self.span)
+        return self.span
+
+    def __exit__(self, *args):
+        self.tracer._pop(self.span)
+
+
+def span(name, **attributes):
+    """Times the block as a span of the trace. Returns a shared object that
+    does nothing if tracing is off, so spans may be left in hot paths."""
+    if _tracer is None:
+        return NULL_SPAN
+
+    return _tracer.span(name, attributes)
+
+
+def enabled():
+    return _tracer is not None
+
+
+def start(name='kimai', output='tree', file=None):
+    """Switches tracing on for the rest of the invocation. The time since
+    the package was imported is added as the import phase."""
+    global _tracer, _output, _file
+
+    _tracer = Tracer(name)
+    started, _tracer.root.started = _tracer.root.started, IMPORTED_AT
+    _tracer.add('import', IMPORTED_AT, started - IMPORTED_AT)
+    _output, _file = output, file
+
+    return _tracer
+
+
+def finish():
+    """Switches tracing off and writes the trace, as a tree or as JSON, to
+    the file given to `start` or stderr."""
+    global _tracer
+
+    if _tracer is None:
+        return None
+
+    tracer, _tracer = _tracer, None
+    root = tracer.finish()
+
+    if _file is None:
+        write(root, _output, sys.stderr)
+    else:
+        with open(_file, 'w') as file:
+            write(root, _output, file)
+
+    return root
+
+
+def write(root, output, file):
+    if output == 'json':
+        json.dump(root.to_dict(root.started), file, indent=2)
+        file.write('\n')
+    elif output == 'tree':
+        lines = [
+            ('  ' * depth + ' '.join([span.name] + ['%s=%s' % (k, _value(v)) for k, v in span.attributes.items()]),
+             '-' if span.elapsed is None else '%.1f' % (span.elapsed * 1000))
+            for depth, span in _walk(root, 0)
+        ]
+        width = max(len(label) for label, _ in lines)
+
+        for label, elapsed in lines:
+            file.write('%s %10s ms\n' % (label.ljust(width), elapsed))
+    else:
+        raise ValueError('Unknown trace format %s' % output)
+
+
+def _walk(span, depth):
+    yield depth, span
+
+    for child in sorted(span.children, key=lambda s: s.started):
+        yield from _walk(child, depth + 1)
+
+
+def _value(value):
+    return value if value is None or isinstance(value, (bool, int, float)) else str(value)
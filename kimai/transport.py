@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from .config import config
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 15
+
+
+class Transport(object):
+    """Wraps a keep-alive HTTP session to the Kimai JSON API so that all
+    requests of an invocation share the same pooled connections."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, compress=True):
+        # Importing requests is comparatively slow, so we only do it once we
+        # actually talk to the server.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Kimai's responses (especially the timesheet and the project catalog)
+        # compress very well. Requests already asks for gzip and deflate, and
+        # for brotli if it is installed (see the brotli extra), so the header
+        # is only changed if the user explicitly opted out.
+        if not compress:
+            self.session.headers['Accept-Encoding'] = 'identity'
+
+    def post(self, url, data):
+        return self.session.post(url, data=data, timeout=self.timeout)
+
+    def close(self):
+        self.session.close()
+
+
+_transport = None
+
+
+def api_url():
+    """Returns the url of the Kimai JSON API endpoint."""
+    return '{}/core/json.php'.format(config.get('KimaiUrl'))
+
+
+def get_transport():
+    """Returns the shared transport, creating it on first use."""
+    global _transport
+
+    if _transport is None:
+        _transport = Transport(
+            pool_size=config.get('PoolSize', DEFAULT_POOL_SIZE),
+            timeout=config.get('Timeout', DEFAULT_TIMEOUT),
+            compress=config.get('Compression', True),
+        )
+
+    return _transport
+
+
+def reset_transport():
+    """Closes the shared transport. The next request will open a new one."""
+    global _transport
+
+    if _transport is not None:
+        _transport.close()
+        _transport = None
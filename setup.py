@@ -7,13 +7,11 @@ here = os.path.abspath(os.path.dirname(__file__))
 packages = ['kimai']
 
 requires = [
-    'click',
+    'click>=8.0',
     'requests',
-    'tabulate',
     'PyYAML',
     'parsedatetime',
-    'fuzzyfinder',
-    'prompt_toolkit',
+    'prompt_toolkit>=2.0',
 ]
 
 about = {}
@@ -32,10 +30,17 @@ setup(
     packages=packages,
     package_dir={'kimai': 'kimai'},
     include_package_data=True,
-    python_requires='>3.5.2',
+    python_requires='>=3.7',
     install_requires=requires,
+    extras_require={
+        # Speeds up grouping in reports, see kimai.columnar.
+        'numpy': ['numpy'],
+        # Lets requests ask for brotli compressed responses, see kimai.transport.
+        'brotli': ['brotli'],
+    },
     entry_points='''
         [console_scripts]
         kimai=kimai.cli:cli
+        kimai-complete=kimai.complete:main
     '''
 )
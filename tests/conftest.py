@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+import pytest
+
+# Make sure no test ever reads or writes the real config of the user running them.
+os.environ['KIMAI_CONFIG_PATH'] = os.path.join(tempfile.mkdtemp(prefix='kimai-tests-'), 'config')
+
+from kimai.catalog import reset_catalog  # noqa: E402
+from kimai.config import config  # noqa: E402
+from kimai.store import reset_store  # noqa: E402
+from kimai.transport import reset_transport  # noqa: E402
+
+from .stub_backend import StubBackend, API_KEY, USER_ID  # noqa: E402
+from .stub_server import StubKimaiServer  # noqa: E402
+
+
+def serve(server, api_key, tmp_path, monkeypatch, user_id=None):
+    previous = dict(config.values)
+    monkeypatch.setenv('KIMAI_CONFIG_PATH', str(tmp_path / 'config'))
+    reset_store()
+    reset_catalog()
+
+    with server:
+        config.set('KimaiUrl', server.url)
+        config.set('ApiKey', api_key)
+        if user_id is not None:
+            # Like after `kimai configure`, which resolves the user once.
+            config.set('User', {'Id': user_id, 'ApiKey': api_key})
+        reset_transport()
+
+        yield server
+
+        reset_transport()
+
+    reset_store()
+    reset_catalog()
+    config.values.clear()
+    config.values.update(previous)
+    config.mark_clean()
+
+
+@pytest.fixture
+def stub_server(tmp_path, monkeypatch):
+    """Starts a stub Kimai server without any services and points the
+    global config at it."""
+    yield from serve(StubKimaiServer(), '::api-key::', tmp_path, monkeypatch)
+
+
+@pytest.fixture
+def kimai_server(tmp_path, monkeypatch):
+    """Starts a stub Kimai server implementing all services on a small
+    seeded dataset and points the global config at it."""
+    backend = StubBackend(customers=5, projects=20, tasks=10, records=200)
+    server = StubKimaiServer.from_service_map(backend)
+    yield from serve(server, API_KEY, tmp_path, monkeypatch, user_id=str(USER_ID))
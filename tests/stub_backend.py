@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import random
+import time
+
+from datetime import datetime
+
+from .stub_server import success, failure
+
+
+API_KEY = 'stub-api-key'
+USER_ID = 1
+PASSWORD = 'secret'
+
+# Generated records are never longer than this, which lets range queries
+# bisect on the start time alone.
+MAX_DURATION = 4 * 3600
+
+
+class StubBackend(object):
+    """Implements the Kimai services on top of a seeded, in-memory dataset.
+
+    Every public method is named after the service it implements and takes
+    the parameters listed for it in servicemap.json. Records are stored as
+    small lists ``[id, user, start, end, project, task, comment]`` together
+    with a sorted ``(start, id)`` index so that even hundreds of thousands of
+    rows stay cheap to hold and to query.
+    """
+
+    def __init__(self, seed=0, customers=100, projects=2000, tasks=300, records=200000, now=None):
+        rng = random.Random(seed)
+        self.now = int(time.time() if now is None else now)
+
+        self.customers = {i: 'Customer %d' % i for i in range(1, customers + 1)}
+        self.projects = {
+            i: ('Project %d' % i, rng.randint(1, customers)) for i in range(1, projects + 1)
+        }
+        self.tasks = {i: 'Task %d' % i for i in range(1, tasks + 1)}
+        self.project_tasks = {
+            i: sorted(rng.sample(range(1, tasks + 1), min(tasks, 10))) for i in self.projects
+        }
+
+        self.rows = {}
+        self.order = []
+        self.active = {}
+        self.next_id = 1
+
+        # Lay out the records back to back, ending an hour ago.
+        end = self.now - 3600
+        generated = []
+        for _ in range(records):
+            duration = rng.randint(15, MAX_DURATION // 60) * 60
+            start = end - duration
+            generated.append([start, end, rng.randint(1, projects), rng.randint(1, tasks)])
+            end = start - rng.randint(0, 3) * 900
+
+        for start, end, project, task in reversed(generated):
+            self.insert(USER_ID, start, end, project, task, '')
+
+    # Dataset helpers
+
+    def insert(self, user, start, end, project, task, comment):
+        record_id = self.next_id
+        self.next_id += 1
+        self.rows[record_id] = [record_id, user, start, end, project, task, comment]
+        bisect.insort(self.order, (start, record_id))
+
+        if not end:
+            self.active[user] = record_id
+
+        return record_id
+
+    def remove(self, record_id):
+        row = self.rows.pop(record_id)
+        self.order.remove((row[2], record_id))
+
+        if self.active.get(row[1]) == record_id:
+            del self.active[row[1]]
+
+    def item(self, row):
+        record_id, user, start, end, project, task, comment = row
+        project_name, customer = self.projects.get(project, ('Project %d' % project, 1))
+        duration = (end - start) if end else 0
+
+        return {
+            'timeEntryID': str(record_id),
+            'start': str(start),
+            'end': str(end),
+            'duration': str(duration),
+            'formattedDuration': '%d:%02d' % (duration // 3600, duration % 3600 // 60),
+            'comment': comment,
+            'customerID': str(customer),
+            'customerName': self.customers.get(customer, 'Customer %d' % customer),
+            'projectID': str(project),
+            'projectName': project_name,
+            'activityID': str(task),
+            'activityName': self.tasks.get(task, 'Task %d' % task),
+            'userID': str(user),
+        }
+
+    def check(self, api_key):
+        return api_key == API_KEY
+
+    # Services
+
+    def authenticate(self, username, password):
+        if password != PASSWORD:
+            return failure('Unknown user or no permissions.')
+        return success([{'apiKey': API_KEY}])
+
+    def getUsers(self, api_key):
+        if not self.check(api_key):
+            return failure('Unknown user')
+        return success([{'userID': str(USER_ID), 'name': 'stub'}])
+
+    def getCustomers(self, api_key):
+        if not self.check(api_key):
+            return failure('Unknown user')
+        return success([{'customerID': str(i), 'name': n} for i, n in self.customers.items()])
+
+    def getProjects(self, api_key):
+        if not self.check(api_key):
+            return failure('Unknown user')
+        return success([
+            {'projectID': str(i), 'name': name, 'customerID': str(c), 'customerName': self.customers[c]}
+            for i, (name, c) in self.projects.items()
+        ])
+
+    def getTasks(self, api_key, project_id=None):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        ids = self.tasks if project_id is None else self.project_tasks.get(int(project_id), [])
+        return success([{'activityID': str(i), 'name': self.tasks[i]} for i in ids])
+
+    def getActiveRecording(self, api_key):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        record_id = self.active.get(USER_ID)
+        if record_id is None:
+            return failure('No active recording.')
+        return success([self.item(self.rows[record_id])])
+
+    def getTimesheet(self, api_key, start_date=0, end_date=0, cleared=-1, offset=0, limit=0):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        start_date, end_date = _to_timestamp(start_date), _to_timestamp(end_date)
+        low = bisect.bisect_left(self.order, (start_date - MAX_DURATION,)) if start_date else 0
+        high = bisect.bisect_left(self.order, (end_date,)) if end_date else len(self.order)
+
+        offset, limit = int(offset), int(limit)
+        wanted = offset + limit if limit else len(self.order) + 1
+
+        matches = []
+        # Running records started before the window still belong to it.
+        active = self.rows.get(self.active.get(USER_ID))
+        if active is not None and active[2] < (start_date - MAX_DURATION if start_date else 0):
+            if not end_date or active[2] < end_date:
+                matches.append(active)
+
+        index = high
+        while index > low and len(matches) < wanted:
+            index -= 1
+            row = self.rows[self.order[index][1]]
+            if row[1] == USER_ID and (not start_date or not row[3] or row[3] > start_date):
+                matches.append(row)
+
+        return success([self.item(row) for row in matches[offset:wanted]])
+
+    def getTimesheetRecord(self, api_key, record_id):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        row = self.rows.get(int(record_id))
+        if row is None:
+            return failure('No record found.')
+        return success([self.item(row)])
+
+    def startRecord(self, api_key, project_id, task_id):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        if USER_ID in self.active:
+            self.stopRecord(api_key, self.active[USER_ID])
+
+        record_id = self.insert(USER_ID, int(time.time()), 0, int(project_id), int(task_id), '')
+        return success([{'id': record_id}])
+
+    def stopRecord(self, api_key, record_id):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        row = self.rows.get(int(record_id))
+        if row is None:
+            return failure('No record found.')
+
+        row[3] = int(time.time())
+        if self.active.get(row[1]) == row[0]:
+            del self.active[row[1]]
+        return success()
+
+    def setTimesheetRecord(self, api_key, record, do_update=False):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        start = _to_timestamp(record['start'])
+        end = _to_timestamp(record['end'])
+        project, task = int(record['projectId']), int(record['taskId'])
+        comment = record.get('comment') or ''
+
+        if do_update in (True, 'true') and 'id' in record:
+            record_id = int(record['id'])
+            if record_id not in self.rows:
+                return failure('No record found.')
+            user = self.rows[record_id][1]
+            self.remove(record_id)
+            self.rows[record_id] = [record_id, user, start, end, project, task, comment]
+            bisect.insort(self.order, (start, record_id))
+            if not end:
+                self.active[user] = record_id
+            return success([{'id': record_id}])
+
+        return success([{'id': self.insert(USER_ID, start, end, project, task, comment)}])
+
+    def removeTimesheetRecord(self, api_key, record_id):
+        if not self.check(api_key):
+            return failure('Unknown user')
+
+        if int(record_id) not in self.rows:
+            return failure('No record found.')
+
+        self.remove(int(record_id))
+        return success()
+
+
+def _to_timestamp(value):
+    """Converts the dates the client sends (timestamps or ISO dates) to a
+    unix timestamp. Zero means unbounded, just like in Kimai."""
+    if value in (None, '', 0, '0'):
+        return 0
+
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+
+    return int(datetime.strptime(str(value)[:19], '%Y-%m-%dT%H:%M:%S').timestamp())
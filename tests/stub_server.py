@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SERVICE_MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'servicemap.json')
+
+
+def success(items=None):
+    return {'success': True, 'items': [] if items is None else items}
+
+
+def failure(message):
+    return {'success': False, 'error': {'msg': message}}
+
+
+class StubKimaiServer(object):
+    """A tiny in-process stand-in for the Kimai JSON API. It answers every
+    call through the given handlers and counts the TCP connections and
+    requests it sees (and how many requests overlapped at most) so tests
+    and benchmarks can reason about round trips.
+
+    ``connect_latency`` is slept once per new connection to stand in for the
+    TCP and TLS handshakes of a real server, ``latency`` once per request for
+    the round trip. With ``batches`` disabled the server rejects JSON-RPC
+    batches like Kimai's own endpoint may do."""
+
+    def __init__(self, handlers=None, connect_latency=0, latency=0, batches=True):
+        self.handlers = {} if handlers is None else handlers
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.batches = batches
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @classmethod
+    def from_service_map(cls, backend, path=SERVICE_MAP_PATH, **kwargs):
+        """Creates a server with a handler for every service in the service
+        map. Calls with too many parameters are rejected, missing ones get
+        their documented defaults, and services the backend does not
+        implement answer with an empty result."""
+        with open(path) as file:
+            services = json.load(file)['services']
+
+        handlers = {
+            name: service_handler(name, spec['parameters'], getattr(backend, name, None))
+            for name, spec in services.items()
+        }
+
+        server = cls(handlers, **kwargs)
+        server.backend = backend
+        return server
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%s' % (host, port)
+
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self.max_in_flight = 0
+            self.calls = []
+
+    def dispatch(self, call):
+        method = call.get('method')
+        handler = self.handlers.get(method)
+
+        with self._lock:
+            self.calls.append(method)
+
+        if handler is None:
+            result = failure('Unknown method %s' % method)
+        else:
+            try:
+                result = handler(*call.get('params', []))
+            except Exception as e:
+                # Like a PHP error inside the service, answered without a result.
+                return {'jsonrpc': '2.0', 'error': {'code': -32603, 'message': str(e)}, 'id': call.get('id')}
+
+        return {'jsonrpc': '2.0', 'result': result, 'id': call.get('id')}
+
+    def handle_body(self, body):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            return self._handle(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handle(self, body):
+        if self.latency:
+            time.sleep(self.latency)
+
+        data = json.loads(body)
+
+        if not isinstance(data, list):
+            return self.dispatch(data)
+
+        if not self.batches:
+            return {'jsonrpc': '2.0', 'error': {'code': -32600, 'message': 'Invalid Request'}, 'id': None}
+
+        return [self.dispatch(call) for call in data]
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def service_handler(name, parameters, implementation):
+    # Missing parameters are not rejected even if the map lists them as
+    # required: Kimai's PHP signatures give some of them (like doUpdate of
+    # setTimesheetRecord) a default and the client relies on that.
+    def handler(*args):
+        if len(args) > len(parameters):
+            return failure('Invalid number of parameters for %s' % name)
+
+        if implementation is None:
+            return success()
+
+        defaults = [p.get('default') for p in parameters[len(args):]]
+        return implementation(*(list(args) + defaults))
+
+    return handler
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        # Buffer the response so headers and body leave in a single segment.
+        # Otherwise delayed ACKs stall every request on a kept-alive connection.
+        wbufsize = -1
+
+        def setup(self):
+            super().setup()
+            with stub._lock:
+                stub.connections += 1
+
+            if stub.connect_latency:
+                time.sleep(stub.connect_latency)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode('utf-8')
+            response = json.dumps(stub.handle_body(body)).encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from datetime import datetime
+
+import pytest
+
+from kimai import kimai
+from kimai.aio import AsyncKimaiClient
+from kimai.config import config
+
+
+def run(coroutine_function, **kwargs):
+    async def main():
+        async with AsyncKimaiClient(**kwargs) as client:
+            return await coroutine_function(client)
+
+    return asyncio.run(main())
+
+
+class TestAsyncKimaiClient(object):
+
+    def test_timesheet_matches_the_synchronous_api(self, kimai_server):
+        records = run(lambda client: client.get_timesheet(limit=20))
+
+        assert [r.id for r in kimai.get_timesheet(limit=20)] == [r.id for r in records]
+
+    def test_concurrency_is_bounded(self, kimai_server):
+        kimai_server.latency = 0.02
+
+        async def fetch(client):
+            return await asyncio.gather(*map(client.get_single_record, range(1, 25)))
+
+        records = run(fetch, concurrency=3)
+
+        assert [str(i) for i in range(1, 25)] == [r.id for r in records]
+        assert 3 == kimai_server.max_in_flight
+        assert kimai_server.connections <= 3
+
+    def test_missing_records_raise(self, kimai_server):
+        with pytest.raises(KeyError):
+            run(lambda client: client.get_single_record(999999))
+
+    def test_add_edit_and_delete(self, kimai_server):
+        backend = kimai_server.backend
+        start, end = datetime(2018, 8, 5, 10), datetime(2018, 8, 5, 11)
+
+        response = run(lambda client: client.add_record(start, end, 1, 1, 'Added'))
+        record_id = response.items[0]['id']
+
+        run(lambda client: client.edit_record(record_id, comment='Edited'))
+        assert 'Edited' == backend.rows[record_id][6]
+
+        run(lambda client: client.delete_record(record_id))
+        assert record_id not in backend.rows
+
+    def test_records_of_other_users_are_not_edited(self, kimai_server):
+        backend = kimai_server.backend
+        record_id = backend.insert(2, 1000, 2000, 1, 1, '::comment::')
+
+        with pytest.raises(RuntimeError):
+            run(lambda client: client.edit_record(record_id, comment='Edited'))
+
+        assert '::comment::' == backend.rows[record_id][6]
+
+    def test_start_and_stop(self, kimai_server):
+        backend = kimai_server.backend
+
+        run(lambda client: client.start_recording(2, 3))
+        record_id = int(config.get('CurrentEntry'))
+        assert backend.active == {1: record_id}
+
+        config.set('Comment', 'Did things')
+        run(lambda client: client.stop_recording())
+
+        assert {} == backend.active
+        assert 'Did things' == backend.rows[record_id][6]
+        assert config.get('CurrentEntry') is None
+        assert config.get('Comment') is None
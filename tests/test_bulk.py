@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from kimai import kimai
+from kimai.bulk import TokenBucket, run_bulk
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(object):
+
+    def test_bursts_up_to_the_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, 5, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            bucket.acquire()
+
+        assert [] == clock.slept
+
+    def test_waits_for_tokens_to_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, 5, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire(5)
+        bucket.acquire(2)
+
+        assert [0.2] == clock.slept
+
+    def test_requests_larger_than_the_capacity_wait_for_a_full_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, 5, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire(5)
+        bucket.acquire(50)
+
+        assert [0.5] == clock.slept
+
+
+class TestRunBulk(object):
+
+    def test_results_follow_the_order_of_the_ids(self, kimai_server):
+        ids = list(range(30, 0, -1)) + [999999]
+        progress = []
+
+        responses = run_bulk(kimai.delete_records, ids, workers=3, rate=0, chunk_size=7, progress=progress.append)
+
+        assert ids == list(responses)
+        assert all(responses[i].successful for i in range(1, 31))
+        assert not responses[999999].successful
+        assert 31 == sum(progress)
+
+    def test_failed_chunks_only_fail_their_ids(self):
+        def operation(chunk):
+            if 3 in chunk:
+                raise IOError('::connection-error::')
+            return {i: kimai.KimaiResponse.from_result({'success': True, 'items': []}) for i in chunk}
+
+        responses = run_bulk(operation, range(1, 7), rate=0, chunk_size=2)
+
+        assert [True, True, False, False, True, True] == [r.successful for r in responses.values()]
+        assert '::connection-error::' == responses[3].error
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import time
+
+from kimai.catalog import (
+    Catalog, get_catalog, migrate_from_config, project_tasks, refresh_in_background, tasks_of_project,
+    wait_for_refresh, PROJECTS, TASKS,
+)
+from kimai.config import Config
+
+
+class TestCatalog(object):
+
+    def test_looking_up_names(self):
+        catalog = Catalog()
+        catalog.replace(PROJECTS, {'(Customer) Project': '12', '(Customer) Other': '13'})
+
+        projects = catalog.collection(PROJECTS)
+
+        assert '12' == projects['(Customer) Project']
+        assert '(Customer) Other' in projects
+        assert '(Customer) Missing' not in projects
+        assert ['(Customer) Other', '(Customer) Project'] == list(projects)
+        assert 2 == len(projects)
+
+    def test_values_are_read_with_a_single_query(self):
+        catalog = Catalog()
+        catalog.replace(PROJECTS, {'(Customer) Project': '12', '(Customer) Other': '13'})
+        queries = []
+        catalog.connection.set_trace_callback(queries.append)
+
+        projects = catalog.collection(PROJECTS)
+
+        assert [('(Customer) Other', '13'), ('(Customer) Project', '12')] == projects.items()
+        assert ['13', '12'] == projects.values()
+        assert 2 == len(queries)
+
+    def test_unknown_names_raise_a_key_error(self):
+        catalog = Catalog()
+
+        with pytest.raises(KeyError):
+            catalog.collection(TASKS)['::missing::']
+
+    def test_replacing_a_collection_leaves_others_alone(self):
+        catalog = Catalog()
+        catalog.replace(PROJECTS, {'::project::': 1})
+        catalog.replace(TASKS, {'::old-task::': 2})
+
+        catalog.replace(TASKS, {'::new-task::': 3})
+
+        assert {'::new-task::': 3} == dict(catalog.collection(TASKS))
+        assert {'::project::': 1} == dict(catalog.collection(PROJECTS))
+
+    def test_catalogs_are_moved_out_of_the_config(self):
+        catalog = Catalog()
+        config = Config({'Projects': {'::project::': 1}, 'Tasks': {'::task::': 2}, 'ApiKey': '::key::'})
+
+        migrate_from_config(catalog, config)
+
+        assert {'ApiKey': '::key::'} == config.values
+        assert 1 == catalog.collection(PROJECTS)['::project::']
+        assert 2 == catalog.collection(TASKS)['::task::']
+        assert catalog.is_stale(PROJECTS)
+
+    def test_updating_only_writes_changes(self):
+        catalog = Catalog()
+        catalog.replace(TASKS, {'::same::': 1, '::changed::': 2, '::removed::': 3})
+        catalog.modified = False
+
+        assert 3 == catalog.update(TASKS, {'::same::': 1, '::changed::': 4, '::added::': 5})
+        assert {'::same::': 1, '::changed::': 4, '::added::': 5} == dict(catalog.collection(TASKS))
+        assert catalog.modified
+
+        catalog.modified = False
+
+        assert 0 == catalog.update(TASKS, {'::same::': 1, '::changed::': 4, '::added::': 5})
+        assert not catalog.modified
+
+    def test_collections_remember_when_they_were_fetched(self):
+        catalog = Catalog()
+
+        assert catalog.fetched_at(PROJECTS) is None
+        assert not catalog.is_stale(PROJECTS)
+
+        catalog.update(PROJECTS, {})
+
+        assert time.time() - catalog.fetched_at(PROJECTS) < 5
+        assert not catalog.is_stale(PROJECTS, ttl=60)
+        assert catalog.is_stale(PROJECTS, ttl=0)
+
+
+class TestRefresh(object):
+
+    def test_stale_catalogs_are_refreshed_in_the_background(self, kimai_server):
+        catalog = get_catalog()
+        catalog.replace(PROJECTS, {'::removed::': '1'}, fetched_at=0)
+        catalog.replace(TASKS, {}, fetched_at=0)
+
+        assert refresh_in_background() is not None
+        wait_for_refresh()
+
+        assert ['getProjects', 'getTasks'] == sorted(kimai_server.calls)
+        assert 20 == len(catalog.collection(PROJECTS))
+        assert not catalog.is_stale(TASKS)
+
+    def test_catalogs_that_were_never_downloaded_are_left_alone(self, kimai_server):
+        assert refresh_in_background() is None
+
+    def test_tasks_of_a_project_are_fetched_once(self, kimai_server):
+        tasks = tasks_of_project(3)
+        tasks_of_project(3)
+
+        assert ['getTasks'] == kimai_server.calls
+        assert len(kimai_server.backend.project_tasks[3]) == len(tasks)
+        assert get_catalog().fetched_at(project_tasks(3)) is not None
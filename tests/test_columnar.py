@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from kimai import columnar
+from kimai.columnar import RecordBatch, encode
+
+from .test_report import ITEMS, item
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def implementation(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(columnar, '_numpy', None)
+    else:
+        monkeypatch.setattr(columnar, '_numpy', False)
+    return request.param
+
+
+class TestRecordBatch(object):
+
+    def test_items_are_converted_to_columns(self, implementation):
+        start = datetime(2018, 8, 6, 9)
+        now = start.timestamp() + 600
+        batch = RecordBatch.from_items(ITEMS[:2] + [item(start, None)], now=now)
+
+        assert 3 == len(batch)
+        assert [7200, 3600, 600] == list(batch.duration)
+        assert 0 == batch.end[2]
+        assert (11400, 3) == batch.total()
+
+    def test_names_are_dictionary_encoded(self, implementation):
+        batch = RecordBatch.from_items(ITEMS)
+
+        codes, values = batch.column('project')
+
+        assert ['Website', 'App', 'Support'] == values
+        assert [0, 1, 0, 2] == list(codes)
+
+    def test_group_by(self, implementation):
+        batch = RecordBatch.from_items(ITEMS)
+
+        assert {
+            ('Customer', '2018-W32'): [12600, 3],
+            ('Other', '2018-W33'): [3600, 1],
+        } == batch.group_by(['customer', 'week'])
+
+    def test_group_by_many_distinct_values(self, implementation):
+        items = [
+            item(datetime(2018, 8, 6, 9), datetime(2018, 8, 6, 10), project='P%d' % i, task='T%d' % i)
+            for i in range(300)
+        ]
+        batch = RecordBatch.from_items(items)
+
+        totals = batch.group_by(['project', 'task', 'user', 'day', 'customer'])
+
+        assert 300 == len(totals)
+        assert [3600, 1] == totals[('P42', 'T42', '1', '2018-08-06', 'Customer')]
+
+    def test_clip(self, implementation):
+        night = item(datetime(2018, 8, 5, 22), datetime(2018, 8, 6, 2))
+        running = item(datetime(2018, 8, 6, 9), None)
+        lower, upper = datetime(2018, 8, 6).timestamp(), datetime(2018, 8, 6, 10).timestamp()
+        batch = RecordBatch.from_items([night, running], now=upper + 3600)
+
+        batch.clip(lower, upper)
+
+        assert [7200, 3600] == list(batch.duration)
+        assert {('2018-08-06',): [10800, 2]} == batch.group_by(['day'])
+
+    def test_empty_batches(self, implementation):
+        batch = RecordBatch.from_items([])
+
+        assert (0, 0) == batch.total()
+        assert {} == batch.group_by(['day'])
+
+
+class TestEncode(object):
+
+    def test_keeps_the_order_of_first_appearance(self):
+        codes, values = encode(['b', 'a', 'b', 'c'])
+
+        assert ['b', 'a', 'c'] == values
+        assert [0, 1, 0, 2] == list(codes)
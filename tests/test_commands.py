@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from click.testing import CliRunner
+
+from kimai.catalog import Catalog, get_catalog, PROJECTS
+from kimai.cli import cli
+from kimai.config import config, data_path, flush_config
+from kimai.journal import get_journal
+from kimai.transport import reset_transport
+
+from .stub_backend import API_KEY, PASSWORD
+
+
+def run(server, *args):
+    server.reset_counters()
+    result = CliRunner().invoke(cli, list(args), catch_exceptions=False)
+    assert 0 == result.exit_code, result.output
+    return result
+
+
+@pytest.fixture
+def running(kimai_server):
+    """Starts a recording and returns its id."""
+    run(kimai_server, 'start', '-p', '1', '-t', '1')
+    return int(config.get('CurrentEntry'))
+
+
+class TestRoundTrips(object):
+    """Pins the number of HTTP round trips every command needs."""
+
+    def test_today(self, kimai_server):
+        run(kimai_server, 'today')
+
+        assert 1 == kimai_server.requests
+
+    def test_get_current(self, kimai_server, running):
+        run(kimai_server, 'get-current')
+        assert ['getActiveRecording'] == kimai_server.calls
+
+        run(kimai_server, 'get-current')
+        assert 0 == kimai_server.requests
+
+    def test_start(self, kimai_server):
+        run(kimai_server, 'start', '-p', '1', '-t', '1')
+
+        assert ['startRecord'] == kimai_server.calls
+
+    def test_stop_with_comment(self, kimai_server, running):
+        config.set('Comment', 'Did things')
+
+        run(kimai_server, 'stop')
+
+        assert 2 == kimai_server.requests
+        assert ['getTimesheetRecord', 'stopRecord', 'setTimesheetRecord'] == kimai_server.calls
+        assert 'Did things' == kimai_server.backend.rows[running][6]
+        assert {} == kimai_server.backend.active
+        assert config.get('Comment') is None
+
+    def test_stop_with_comment_after_get_current(self, kimai_server, running):
+        run(kimai_server, 'get-current')
+        config.set('Comment', 'Did things')
+
+        run(kimai_server, 'stop')
+
+        # The snapshot taken by get-current is fresh, so the record is not
+        # fetched again.
+        assert ['stopRecord', 'setTimesheetRecord'] == kimai_server.calls
+        assert 'Did things' == kimai_server.backend.rows[running][6]
+
+    def test_stop_with_comment_without_batches(self, kimai_server, running):
+        kimai_server.batches = False
+        config.set('Comment', 'Did things')
+
+        run(kimai_server, 'stop')
+
+        assert ['getTimesheetRecord', 'stopRecord', 'setTimesheetRecord'] == kimai_server.calls[-3:]
+        assert 'Did things' == kimai_server.backend.rows[running][6]
+
+    def test_stop_without_comment(self, kimai_server, running):
+        run(kimai_server, 'stop')
+
+        assert ['getTimesheetRecord', 'stopRecord'] == kimai_server.calls
+
+    def test_stop_without_recording(self, kimai_server):
+        config.set('Comment', 'Did things')
+
+        result = run(kimai_server, 'stop')
+
+        assert 'No recording running.' in result.output
+        assert 'Did things' == config.get('Comment')
+
+    def test_comment(self, kimai_server, running):
+        run(kimai_server, 'comment', '-c', 'Doing things')
+
+        assert 0 == kimai_server.requests
+
+    def test_favorites_start(self, kimai_server):
+        run(kimai_server, 'favorites', 'add', '-p', '1', '-t', '1', '-n', 'Work')
+        assert 0 == kimai_server.requests
+
+        run(kimai_server, 'favorites', 'start', '-n', 'Work')
+        assert ['startRecord'] == kimai_server.calls
+
+    def test_record_get_today(self, kimai_server):
+        run(kimai_server, 'record', 'get-today', '--refresh')
+
+        assert 1 == kimai_server.requests
+
+    def test_record_get_current(self, kimai_server, running):
+        run(kimai_server, 'record', 'get-current', '--refresh')
+
+        assert 1 == kimai_server.requests
+
+    def test_record_comment(self, kimai_server):
+        run(kimai_server, 'record', 'comment', '-i', '5', '-c', 'Commented')
+
+        assert ['getTimesheetRecord', 'setTimesheetRecord'] == kimai_server.calls
+        assert 'Commented' == kimai_server.backend.rows[5][6]
+
+    def test_record_add(self, kimai_server):
+        run(kimai_server, 'record', 'add', '-s', '2018-08-05 10:00', '-e', '2018-08-05 11:00',
+            '-p', '1', '-t', '1', '-c', 'Added')
+
+        assert ['setTimesheetRecord'] == kimai_server.calls
+
+    def test_record_edit(self, kimai_server):
+        run(kimai_server, 'record', 'edit', '-i', '5', '-c', 'Edited')
+
+        assert 2 == kimai_server.requests
+        assert 'Edited' == kimai_server.backend.rows[5][6]
+
+    def test_record_edit_needs_an_id(self, kimai_server):
+        result = CliRunner().invoke(cli, ['record', 'edit', '-c', 'Edited'])
+
+        assert 2 == result.exit_code
+        assert "Missing option '--id'" in result.output
+
+    def test_record_delete(self, kimai_server):
+        run(kimai_server, 'record', 'delete', '-i', '5', '-i', '6', '-i', '7')
+
+        assert 2 == kimai_server.requests
+        assert not {5, 6, 7} & set(kimai_server.backend.rows)
+
+    def test_record_delete_from_file(self, kimai_server, tmp_path):
+        ids = tmp_path / 'ids'
+        ids.write_text('\n'.join(str(i) for i in range(10, 55)))
+
+        result = run(kimai_server, 'record', 'delete', '--file', str(ids), '--rate', '0')
+
+        # Two batches for every chunk of 20 records.
+        assert 6 == kimai_server.requests
+        assert not set(range(10, 55)) & set(kimai_server.backend.rows)
+        assert '45 succeeded, 0 failed' in result.output
+
+    def test_record_bulk_edit(self, kimai_server):
+        result = run(kimai_server, 'record', 'bulk-edit', '-i', '5', '-i', '6', '-i', '999999', '-p', '3', '-t', '4')
+
+        assert 2 == kimai_server.requests
+        assert [3, 4] == kimai_server.backend.rows[5][4:6]
+        assert [3, 4] == kimai_server.backend.rows[6][4:6]
+        assert 'Record 999999: No record exists for id 999999' in result.output
+        assert '2 succeeded, 1 failed' in result.output
+
+    def test_record_import(self, kimai_server, tmp_path):
+        file = tmp_path / 'records.csv'
+        file.write_text('start,duration,project_id,task_id\n' + ''.join(
+            '2018-08-%02d 10:00,1 hour,1,1\n' % day for day in range(1, 31)
+        ))
+
+        result = run(kimai_server, 'record', 'import', str(file), '--rate', '0')
+
+        # One batch for every chunk of 20 records.
+        assert 2 == kimai_server.requests
+        assert '30 imported, 0 already imported, 0 failed, 0 invalid' in result.output
+
+        result = run(kimai_server, 'record', 'import', str(file))
+
+        assert 0 == kimai_server.requests
+        assert '0 imported, 30 already imported' in result.output
+
+    def test_record_import_with_invalid_rows(self, kimai_server, tmp_path):
+        file = tmp_path / 'records.jsonl'
+        file.write_text('{"start": "2018-08-01 10:00", "duration": "1 hour", "project_id": 1, "task_id": 1}\n'
+                        '{"start": "whenever", "duration": "1 hour", "project_id": 1, "task_id": 1}\n')
+
+        kimai_server.reset_counters()
+        result = CliRunner().invoke(cli, ['record', 'import', str(file)])
+
+        assert 1 == result.exit_code
+        assert 'Line 2: Could not parse start date whenever' in result.output
+        assert 0 == kimai_server.requests
+
+        result = run(kimai_server, 'record', 'import', str(file), '--skip-invalid')
+
+        assert 1 == kimai_server.requests
+        assert '1 imported, 0 already imported, 0 failed, 1 invalid' in result.output
+
+    def test_offline_start_and_stop(self, kimai_server):
+        url = config.get('KimaiUrl')
+        config.set('KimaiUrl', 'http://127.0.0.1:1')
+        reset_transport()
+
+        result = run(kimai_server, 'start', '-p', '1', '-t', '1', '-c', 'Offline')
+        assert 'offline journal' in result.output
+
+        journal = get_journal()
+        journal.replace([dict(journal.entries()[0], at=int(time.time()) - 1800)])
+
+        # The journal still has entries, so stopping needs no server either.
+        run(kimai_server, 'stop')
+        assert 0 == kimai_server.requests
+        assert ['start', 'stop'] == [e['op'] for e in journal.entries()]
+
+        config.set('KimaiUrl', url)
+        result = run(kimai_server, 'sync')
+
+        assert ['getTimesheet', 'setTimesheetRecord'] == kimai_server.calls
+        assert 'Synced 1, rejected 0, 0 left' in result.output
+        assert 'Offline' == kimai_server.backend.rows[max(kimai_server.backend.rows)][6]
+
+    def test_offline_start_needs_no_requests_until_stopped(self, kimai_server):
+        run(kimai_server, 'start', '-p', '1', '-t', '2', '-c', 'Offline', '--offline')
+
+        result = run(kimai_server, 'get-current', '--output', 'jsonl')
+        run(kimai_server, 'comment', '-c', 'Still offline')
+
+        assert 0 == kimai_server.requests
+        assert 'Offline' == json.loads(result.output.splitlines()[0])['Comment']
+
+    def test_stale_catalog_is_refreshed_before_the_command_exits(self, kimai_server):
+        get_catalog().replace(PROJECTS, {'::removed::': '1'}, fetched_at=0)
+        flush_config(config)
+
+        # The refresh runs on a thread, so only a separate process shows
+        # whether it survives the end of the command.
+        subprocess.check_call(
+            [sys.executable, '-c', 'from kimai.cli import cli; cli(["today"], prog_name="kimai")'],
+            env=dict(os.environ), stdout=subprocess.DEVNULL,
+        )
+
+        catalog = Catalog(data_path('catalog.db'))
+        assert {'getProjects', 'getTasks'} <= set(kimai_server.calls)
+        assert catalog.fetched_at(PROJECTS) > 0
+        assert 20 == len(catalog.collection(PROJECTS))
+        catalog.close()
+
+    def test_stale_catalog_is_not_refreshed_by_get_current(self, kimai_server, running):
+        get_catalog().replace(PROJECTS, {}, fetched_at=0)
+
+        run(kimai_server, 'get-current')
+
+        assert 'getProjects' not in kimai_server.calls
+
+    def test_stale_catalog_is_not_refreshed_offline(self, kimai_server):
+        get_catalog().replace(PROJECTS, {}, fetched_at=0)
+
+        run(kimai_server, 'start', '-p', '1', '-t', '1', '--offline')
+
+        assert [] == kimai_server.calls
+
+    def test_stale_catalog_is_not_refreshed_while_the_journal_backs_off(self, kimai_server):
+        get_catalog().replace(PROJECTS, {}, fetched_at=0)
+        get_journal().append('stop')
+        config.set('JournalRetry', {'Attempts': 1, 'NextAt': time.time() + 60})
+
+        run(kimai_server, 'today')
+
+        assert 'getProjects' not in kimai_server.calls
+
+    def test_configure(self, kimai_server):
+        config.delete('User')
+
+        run(kimai_server, 'configure', '-k', kimai_server.url, '-u', 'user', '-p', PASSWORD)
+
+        assert 3 == kimai_server.requests
+        assert {'Id': '1', 'ApiKey': API_KEY} == config.get('User')
+        assert 20 == len(get_catalog().collection(PROJECTS))
+
+    def test_report(self, kimai_server):
+        result = run(kimai_server, 'report', '--from', '2000-01-01', '--group-by', 'customer,project')
+
+        assert ['getTimesheet'] == kimai_server.calls
+        assert '| Total ' in result.output
+
+    def test_report_reads_synced_ranges_locally(self, kimai_server):
+        first = run(kimai_server, 'report', '--from', '2000-01-01', '--to', '2018-01-01')
+        kimai_server.reset_counters()
+
+        second = run(kimai_server, 'report', '--from', '2000-01-01', '--to', '2018-01-01')
+        run(kimai_server, 'report', '--from', '2000-01-01', '--to', '2018-01-01', '--refresh')
+
+        assert first.output == second.output
+        assert ['getTimesheet'] == kimai_server.calls
+
+    def test_today_as_jsonl(self, kimai_server, running):
+        result = run(kimai_server, 'today', '--refresh', '--output', 'jsonl')
+
+        assert 1 == kimai_server.requests
+        assert str(running) == json.loads(result.output.splitlines()[0])['Id']
+
+    def test_list_projects(self, kimai_server):
+        run(kimai_server, 'projects', 'list')
+
+        assert ['getProjects'] == kimai_server.calls
+
+    def test_list_tasks(self, kimai_server):
+        run(kimai_server, 'tasks', 'list')
+
+        assert ['getTasks'] == kimai_server.calls
+
+    def test_list_tasks_of_a_project(self, kimai_server):
+        result = run(kimai_server, 'tasks', 'list', '-p', '3', '-o', 'jsonl')
+
+        assert ['getTasks'] == kimai_server.calls
+        assert len(kimai_server.backend.project_tasks[3]) == len(result.output.splitlines())
+
+    def test_download_projects(self, kimai_server):
+        run(kimai_server, 'projects', 'download')
+
+        assert ['getProjects'] == kimai_server.calls
+
+    def test_download_tasks(self, kimai_server):
+        run(kimai_server, 'tasks', 'download')
+
+        assert ['getTasks'] == kimai_server.calls
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+import sys
+
+from kimai.complete import complete, completions_path, split_words, write_completions
+from kimai.config import config
+
+# Time budget in seconds for answering a completion from the precomputed
+# file, not counting the startup of the interpreter itself. A run over budget
+# is retried a few times so that a busy machine doesn't fail the test.
+COMPLETION_BUDGET = 0.03
+ATTEMPTS = 3
+
+DATA = {
+    'commands': {
+        '': ['favorites', 'record', 'start'],
+        'favorites': ['add', 'delete'],
+        'record': ['delete', 'edit'],
+    },
+    'options': {
+        '': {'--help': ['--help', False]},
+        'start': {'-f': ['--favorite', True], '--favorite': ['--favorite', True]},
+        'record edit': {'-i': ['--id', True], '--id': ['--id', True], '-c': ['--comment', True]},
+        'favorites delete': {'-n': ['--name', True]},
+        'favorites add': {'-n': ['--name', True]},
+    },
+    'values': {'favorites': ['Meeting', 'Support'], 'records': ['12', '11', '7']},
+}
+
+
+class TestComplete(object):
+
+    def test_completes_commands(self):
+        assert ['record'] == complete(DATA, ['kimai', 're'], 1)
+        assert ['delete', 'edit'] == complete(DATA, ['kimai', 'record', ''], 2)
+
+    def test_completes_favorites(self):
+        assert ['Meeting'] == complete(DATA, ['kimai', 'start', '-f', 'M'], 3)
+        assert ['Meeting', 'Support'] == complete(DATA, ['kimai', 'favorites', 'delete', '-n', ''], 4)
+
+    def test_completes_record_ids(self):
+        assert ['12', '11'] == complete(DATA, ['kimai', 'record', 'edit', '-i', '1'], 4)
+
+    def test_options_without_a_source_complete_to_nothing(self):
+        assert [] == complete(DATA, ['kimai', 'record', 'edit', '-c', ''], 4)
+        assert [] == complete(DATA, ['kimai', 'favorites', 'add', '-n', ''], 4)
+
+    def test_words_keep_their_spaces(self):
+        assert ['kimai', 'start', '-f', 'Team Me'] == split_words('kimai\nstart\n-f\nTeam Me')
+        assert ['kimai', 'start', '-f', 'Team Me'] == split_words("kimai start -f 'Team Me")
+        assert ['kimai', 'start', '-f', 'Team Me'] == split_words('kimai\nstart\n-f\nTeam\\ Me')
+        assert ['kimai', 'start', ''] == split_words('kimai\nstart\n')
+
+    def test_completion_file_is_built_from_local_state(self, kimai_server):
+        config.set('Favorites', {'Meeting': {'Project': 1, 'Task': 2}})
+
+        data = write_completions()
+
+        assert ['Meeting'] == data['values']['favorites']
+        assert 'edit' in data['commands']['record']
+        assert [] == kimai_server.calls
+
+
+def test_completion_stays_within_budget(kimai_server, tmp_path):
+    write_completions()
+
+    script = '''
+import json, sys, time
+started = time.perf_counter()
+from kimai.complete import main
+main()
+print(json.dumps({'elapsed': time.perf_counter() - started, 'modules': sorted(sys.modules)}))
+'''
+    env = dict(
+        os.environ,
+        KIMAI_CONFIG_PATH=os.environ['KIMAI_CONFIG_PATH'],
+        COMP_WORDS='kimai record ed',
+        COMP_CWORD='2',
+    )
+
+    def run():
+        output = subprocess.check_output([sys.executable, '-c', script], env=env).decode().splitlines()
+        return output[:-1], json.loads(output[-1])
+
+    completions, result = run()
+    elapsed = result['elapsed']
+
+    for _ in range(ATTEMPTS - 1):
+        if elapsed < COMPLETION_BUDGET:
+            break
+        elapsed = min(elapsed, run()[1]['elapsed'])
+
+    assert ['edit'] == completions
+    assert os.path.exists(completions_path())
+    assert [] == [m for m in ('click', 'yaml', 'sqlite3', 'requests') if m in result['modules']]
+    assert elapsed < COMPLETION_BUDGET
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from kimai.completion import CompletionIndex
+
+# Upper bound in seconds for answering a single keystroke on a large catalog.
+# Typing is repeated a few times so that a busy machine doesn't fail the test.
+KEYSTROKE_BUDGET = 0.05
+ATTEMPTS = 3
+
+
+def catalog(size):
+    return ['(Customer %d) Project %d' % (i % 97, i) for i in range(size)]
+
+
+class TestCompletionIndex(object):
+
+    def test_matches_subsequences_case_insensitively(self):
+        index = CompletionIndex(['(Acme) Website', '(Acme) Backend', '(Other) Web'])
+
+        assert ['(Acme) Website', '(Other) Web'] == index.search('WEB')
+
+    def test_ranks_tight_and_early_matches_first(self):
+        index = CompletionIndex(['xaxxb', 'ab', 'xab', 'axxxxb'])
+
+        assert ['ab', 'xab', 'xaxxb', 'axxxxb'] == index.search('ab')
+
+    def test_narrowing_returns_the_same_as_a_fresh_search(self):
+        names = catalog(500)
+        narrowed = CompletionIndex(names)
+
+        for end in range(1, len('cust 4 proj 12') + 1):
+            query = 'cust 4 proj 12'[:end]
+            assert CompletionIndex(names).search(query) == narrowed.search(query)
+
+    def test_unmatched_characters_return_nothing(self):
+        index = CompletionIndex(['(Acme) Website'])
+
+        assert [] == index.search('z')
+
+    def test_typing_stays_within_the_keystroke_budget(self):
+        names = catalog(10000)
+        query = 'customer 42 project 1'
+
+        def slowest_keystroke():
+            index = CompletionIndex(names)
+            slowest = 0
+            for end in range(1, len(query) + 1):
+                started = time.perf_counter()
+                index.search(query[:end])
+                slowest = max(slowest, time.perf_counter() - started)
+            return slowest
+
+        slowest = min(slowest_keystroke() for _ in range(ATTEMPTS))
+
+        assert slowest < KEYSTROKE_BUDGET
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from kimai.config import Config
+import os
+
+import pytest
+
+from kimai.config import Config, flush_config, load_config
 
 
 class TestConfig(object):
@@ -56,3 +60,50 @@ class TestConfig(object):
 
         result = config.get('::key::')
         assert result is None
+
+
+class TestFlushConfig(object):
+
+    @pytest.fixture
+    def path(self, tmp_path, monkeypatch):
+        path = tmp_path / 'kimai' / 'config'
+        monkeypatch.setenv('KIMAI_CONFIG_PATH', str(path))
+        return path
+
+    def test_nothing_is_written_if_nothing_changed(self, path):
+        config = Config({'::key::': '::value::'})
+
+        flush_config(config)
+
+        assert not path.exists()
+
+    def test_changes_are_written_to_the_configured_path(self, path):
+        config = Config()
+        config.set('::key::', '::value::')
+
+        flush_config(config)
+
+        assert '::value::' == load_config().get('::key::')
+        assert not config.dirty
+
+    def test_changes_of_parallel_invocations_are_merged(self, path):
+        initial = Config()
+        initial.set('::deleted::', '::value::')
+        flush_config(initial)
+
+        first, second = load_config(), load_config()
+        first.set('::first::', 1)
+        second.set('::second::', 2)
+        second.delete('::deleted::')
+        flush_config(first)
+        flush_config(second)
+
+        assert {'::first::': 1, '::second::': 2} == load_config().values
+
+    def test_no_temporary_files_are_left_behind(self, path):
+        config = Config()
+        config.set('::key::', '::value::')
+
+        flush_config(config)
+
+        assert ['config', 'config.lock'] == sorted(os.listdir(str(path.parent)))
@@ -2,7 +2,9 @@
 
 from datetime import datetime, timedelta
 
-from kimai.dates import parse
+import pytest
+
+from kimai.dates import parse, _parse
 
 
 class TestDates(object):
@@ -18,3 +20,37 @@ class TestDates(object):
         delta = relative_date - date
 
         assert delta == timedelta(minutes=15)
+
+    def test_return_none_for_anything_else(self):
+        assert parse('::not-a-date::') is None
+
+    @pytest.mark.parametrize('expression', ['2018-08-05', '2018-8-5', '8/5/2018'])
+    def test_dates_keep_the_time_of_the_relative_date(self, expression):
+        assert datetime(2018, 8, 5, 13, 15) == parse(expression, datetime(2018, 8, 6, 13, 15))
+
+    def test_iso_date_and_time(self):
+        assert datetime(2018, 8, 5, 10, 0, 30) == parse('2018-08-05T10:00:30')
+        assert datetime(2018, 8, 5, 10, 0) == parse(' 2018-08-05 10:00 ')
+        assert datetime(2018, 8, 5, 9, 0) == parse('2018-8-5 9:00')
+
+    def test_time_of_day_is_on_the_relative_date(self):
+        assert datetime(2018, 8, 5, 9, 30) == parse('9:30', datetime(2018, 8, 5, 13, 15))
+
+    def test_invalid_iso_dates(self):
+        assert parse('2018-02-30') is None
+        assert parse('25:00') is None
+
+    def test_times_the_fast_path_cannot_read_are_left_to_parsedatetime(self):
+        date = datetime(2018, 8, 5, 13, 15)
+
+        assert parse('24:00', date) is not None
+        assert _parse('24:00', date) == parse('24:00', date)
+
+    def test_relative_expressions_are_remembered(self):
+        date = datetime(2018, 8, 5, 13, 15, 0, 500)
+        _parse.cache_clear()
+
+        parse('+15 minutes', date)
+        parse('+15 minutes', date.replace(microsecond=0))
+
+        assert 1 == _parse.cache_info().hits
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+from datetime import datetime
+
+import pytest
+
+from kimai.favorites import Favorite
+from kimai.importer import Checkpoint, import_rows, read_rows, resume, validate
+
+from .stub_server import success
+from .test_kimai import timesheet_item
+
+
+FAVORITES = {'::favorite::': Favorite('::favorite::', 3, 4)}
+
+
+def rows(count, start_hour=8):
+    return [
+        validate(line, {
+            'start': '2018-08-%02d %02d:00' % (line, start_hour),
+            'duration': '1 hour',
+            'project_id': '1',
+            'task_id': '2',
+            'comment': '::comment::',
+        }, FAVORITES)
+        for line in range(1, count + 1)
+    ]
+
+
+class TestReadRows(object):
+
+    def test_csv(self):
+        file = io.StringIO('start,end,favorite\n2018-08-05 10:00,2018-08-05 11:00,::favorite::\n')
+
+        assert [(2, {'start': '2018-08-05 10:00', 'end': '2018-08-05 11:00', 'favorite': '::favorite::'})] \
+            == list(read_rows(file, 'csv'))
+
+    def test_jsonl_skips_empty_lines(self):
+        file = io.StringIO('{"start": "2018-08-05 10:00"}\n\n{"start": "2018-08-06 10:00"}\n')
+
+        assert [1, 3] == [line for line, _ in read_rows(file, 'jsonl')]
+
+    def test_jsonl_with_invalid_line(self):
+        with pytest.raises(ValueError, match='Line 2'):
+            list(read_rows(io.StringIO('{}\n[1, 2\n'), 'jsonl'))
+
+
+class TestValidate(object):
+
+    def test_with_favorite_and_duration(self):
+        row = validate(1, {'start': '2018-08-05 10:00', 'duration': '90 minutes', 'favorite': '::favorite::'}, FAVORITES)
+
+        assert datetime(2018, 8, 5, 11, 30) == row.end
+        assert (3, 4) == (row.project_id, row.task_id)
+
+    @pytest.mark.parametrize('values, message', [
+        ({'end': '2018-08-05 11:00', 'favorite': '::favorite::'}, 'Missing start'),
+        ({'start': 'whenever', 'end': '2018-08-05 11:00', 'favorite': '::favorite::'}, 'Could not parse start'),
+        ({'start': '2018-08-05 10:00', 'favorite': '::favorite::'}, 'end or a duration'),
+        ({'start': '2018-08-05 10:00', 'end': '2018-08-05 09:00', 'favorite': '::favorite::'}, 'not after'),
+        ({'start': '2018-08-05 10:00', 'end': '2018-08-05 11:00', 'favorite': '::unknown::'}, 'No favorite'),
+        ({'start': '2018-08-05 10:00', 'end': '2018-08-05 11:00', 'project_id': '1'}, 'project and a task'),
+        ({'start': '2018-08-05 10:00', 'end': '2018-08-05 11:00', 'project_id': 'a', 'task_id': '1'}, 'numbers'),
+        ({'start': '2018-08-05 10:00', 'end': '2018-08-05 11:00', 'color': 'red'}, 'Unknown field color'),
+    ])
+    def test_invalid_rows(self, values, message):
+        with pytest.raises(ValueError, match=message):
+            validate(1, values, FAVORITES)
+
+
+class TestImport(object):
+
+    def test_creates_records_and_logs_them(self, kimai_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+
+        with Checkpoint(path) as checkpoint:
+            responses = import_rows(rows(25), checkpoint, workers=2, rate=0)
+
+        assert all(r.successful for r in responses.values())
+        assert 25 == sum(1 for r in kimai_server.backend.rows.values() if r[6] == '::comment::')
+
+        entries = [json.loads(line) for line in open(path)]
+        assert 25 == len([e for e in entries if e['status'] == 'done'])
+
+    def test_unanswered_rows_stay_pending(self, kimai_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+        add = kimai_server.handlers['setTimesheetRecord']
+        calls = []
+
+        def add_once_unanswered(*params):
+            calls.append(params)
+            response = add(*params)
+            if len(calls) == 2:
+                raise RuntimeError('::error::')
+            return response
+
+        kimai_server.handlers['setTimesheetRecord'] = add_once_unanswered
+
+        with Checkpoint(path) as checkpoint:
+            responses = import_rows(rows(3), checkpoint, rate=0)
+            assert ['done', 'pending', 'done'] == [checkpoint.entries[line]['status'] for line in (1, 2, 3)]
+
+        assert 3 == len(calls)
+        assert not responses[2].answered
+
+        kimai_server.handlers['setTimesheetRecord'] = add
+
+        with Checkpoint(path) as checkpoint:
+            assert {} == import_rows(rows(3), checkpoint, rate=0)
+
+        assert 3 == sum(1 for r in kimai_server.backend.rows.values() if r[6] == '::comment::')
+
+    def test_resume_skips_done_rows(self, kimai_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+
+        with Checkpoint(path) as checkpoint:
+            import_rows(rows(5), checkpoint, rate=0)
+
+        with Checkpoint(path) as checkpoint:
+            assert [6] == [r.line for r in resume(rows(6), checkpoint)]
+
+    def test_resume_finds_pending_rows_in_the_timesheet(self, kimai_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+        imported = rows(3)
+
+        # The import was killed after sending the first two rows but before
+        # their responses were logged.
+        with Checkpoint(path) as checkpoint:
+            checkpoint.pending(imported[:2])
+        for row in imported[:1]:
+            start, end = (int(d.timestamp()) for d in (row.start, row.end))
+            kimai_server.backend.insert(1, start, end, 1, 2, '::comment::')
+
+        with Checkpoint(path) as checkpoint:
+            assert [2, 3] == [r.line for r in resume(imported, checkpoint)]
+            assert 'done' == checkpoint.entries[1]['status']
+
+    def test_resume_matches_numeric_ids_in_the_timesheet(self, stub_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+        imported = rows(1)
+        item = timesheet_item(7)
+        item.update(start=str(int(imported[0].start.timestamp())), end=str(int(imported[0].end.timestamp())),
+                    projectID=1, activityID=2)
+        stub_server.handlers['getTimesheet'] = lambda *args: success([item])
+
+        with Checkpoint(path) as checkpoint:
+            checkpoint.pending(imported)
+
+        with Checkpoint(path) as checkpoint:
+            assert [] == resume(imported, checkpoint)
+            assert 'done' == checkpoint.entries[1]['status']
+
+    def test_resume_rejects_changed_rows(self, kimai_server, tmp_path):
+        path = str(tmp_path / 'checkpoint')
+
+        with Checkpoint(path) as checkpoint:
+            checkpoint.pending(rows(1))
+
+        with Checkpoint(path) as checkpoint, pytest.raises(ValueError, match='Line 1 has changed'):
+            resume(rows(1, start_hour=9), checkpoint)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+
+from kimai.config import config
+from kimai.journal import get_journal, plan, replay, replay_due
+
+
+def item(record_id, start, end):
+    return {'timeEntryID': str(record_id), 'start': str(start), 'end': str(end)}
+
+
+def start(at):
+    return {'op': 'start', 'at': at, 'project_id': 1, 'task_id': 2}
+
+
+def stop(at, comment=None):
+    return {'op': 'stop', 'at': at, 'comment': comment}
+
+
+class TestPlan(object):
+
+    def test_start_and_stop_become_a_record(self):
+        operations, opened = plan([start(100), stop(200, '::comment::')], [])
+
+        assert opened is None
+        assert [('add', 100, 200, '::comment::')] == [(o.kind, o.start, o.end, o.comment) for o in operations]
+
+    def test_start_closes_the_running_record(self):
+        operations, opened = plan([start(100), stop(200)], [item(1, 50, 0)])
+
+        assert [('close', 50, 100), ('add', 100, 200)] == [(o.kind, o.start, o.end) for o in operations]
+        assert not any(o.conflict for o in operations)
+
+    def test_open_start_is_kept(self):
+        first = start(100)
+        operations, opened = plan([first], [])
+
+        assert [] == operations
+        assert first is opened
+
+    def test_consecutive_starts(self):
+        operations, opened = plan([start(100), start(150), stop(200)], [])
+
+        assert [(100, 150), (150, 200)] == [(o.start, o.end) for o in operations]
+
+    def test_overlapping_records_conflict(self):
+        operations, _ = plan([start(100), stop(200), start(190), stop(250), start(300), stop(400)], [item(1, 0, 120)])
+
+        # The second record only overlaps the first one, which is not sent.
+        assert ['Overlaps a record on the server', None, None] == [o.conflict for o in operations]
+
+    def test_stop_without_running_record_conflicts(self):
+        operations, _ = plan([stop(200)], [])
+
+        assert 'Nothing was running' == operations[0].conflict
+
+
+class TestReplay(object):
+
+    def test_sends_entries_and_rejects_conflicts(self, kimai_server):
+        now = int(time.time())
+        journal = get_journal()
+        journal.append('add', at=now, start=now - 1800, end=now - 900, project_id=1, task_id=2, comment='::new::')
+        journal.append('add', at=now, start=now - 4000, end=now - 3000, project_id=1, task_id=2)
+        records = len(kimai_server.backend.rows)
+
+        result = replay()
+
+        assert 1 == len(result.applied)
+        assert ['Overlaps a record on the server'] == [error for _, error in result.rejected]
+        assert records + 1 == len(kimai_server.backend.rows)
+        assert '::new::' == kimai_server.backend.rows[max(kimai_server.backend.rows)][6]
+        assert [] == journal.entries()
+        assert ['Overlaps a record on the server'] == [
+            json.loads(line)['reason'] for line in open(journal.rejected_path)
+        ]
+
+    def test_keeps_entries_and_backs_off_while_offline(self, kimai_server):
+        journal = get_journal()
+        journal.append('stop')
+        config.set('KimaiUrl', 'http://127.0.0.1:1')
+
+        result = replay()
+
+        assert result.error
+        assert 1 == len(journal.entries())
+        assert 1 == config.get('JournalRetry')['Attempts']
+        assert not replay_due()
+
+    def test_keeps_applied_entries_out_when_kimai_answers_with_an_error(self, kimai_server):
+        now = int(time.time())
+        journal = get_journal()
+        journal.append('add', at=now, start=now + 1000, end=now + 2000, project_id=1, task_id=2)
+        journal.append('add', at=now, start=now + 3000, end=now + 4000, project_id=1, task_id=2)
+        add = kimai_server.handlers['setTimesheetRecord']
+        calls = []
+
+        def add_then_fail(*params):
+            calls.append(params)
+            if len(calls) == 2:
+                raise RuntimeError('::error::')
+            return add(*params)
+
+        kimai_server.handlers['setTimesheetRecord'] = add_then_fail
+
+        result = replay()
+
+        assert result.error
+        assert 1 == len(result.applied)
+        assert [now + 3000] == [e['start'] for e in journal.entries()]
+        assert 1 == config.get('JournalRetry')['Attempts']
+
+    def test_an_open_start_is_not_due(self, kimai_server):
+        journal = get_journal()
+        journal.append('start', project_id=1, task_id=2)
+
+        assert not replay_due()
+        assert 1 == replay().remaining
+        assert [] == kimai_server.calls
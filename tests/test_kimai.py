@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from kimai import kimai
+from kimai.config import config
+
+from .stub_server import success, failure
+
+
+def timesheet_item(record_id, user_id=1):
+    return {
+        'timeEntryID': record_id,
+        'start': '1533459600',
+        'end': '1533463200',
+        'duration': '3600',
+        'comment': '',
+        'customerID': 1,
+        'customerName': 'Customer',
+        'projectID': 2,
+        'projectName': 'Project',
+        'activityID': 3,
+        'activityName': 'Task',
+        'userID': user_id,
+    }
+
+
+def serve_records(server, records):
+    def get_record(api_key, record_id):
+        if int(record_id) not in records:
+            return failure('No record')
+        return success([records[int(record_id)]])
+
+    server.handlers['getTimesheetRecord'] = get_record
+    server.handlers['getTimesheet'] = lambda *args: success([timesheet_item(99)])
+    server.handlers['removeTimesheetRecord'] = lambda api_key, record_id: success()
+
+
+class TestBatchRequests(object):
+
+    def test_responses_are_matched_to_their_payloads(self, stub_server):
+        stub_server.handlers['getProjects'] = lambda api_key: success([{'projectID': 1}])
+        stub_server.handlers['getTasks'] = lambda api_key: success([{'activityID': 2}])
+
+        projects, tasks = kimai.get_projects_and_tasks()
+
+        assert [{'projectID': 1}] == projects
+        assert [{'activityID': 2}] == tasks
+        assert 1 == stub_server.requests
+
+    def test_falls_back_to_single_requests_if_batches_are_rejected(self, stub_server):
+        stub_server.batches = False
+        stub_server.handlers['getProjects'] = lambda api_key: success([{'projectID': 1}])
+        stub_server.handlers['getTasks'] = lambda api_key: success([{'activityID': 2}])
+
+        projects, tasks = kimai.get_projects_and_tasks()
+
+        assert [{'projectID': 1}] == projects
+        assert [{'activityID': 2}] == tasks
+        assert config.get('BatchRequests') is None
+
+    def test_stops_sending_batches_after_repeated_rejections(self, stub_server):
+        stub_server.batches = False
+        stub_server.handlers['getProjects'] = lambda api_key: success()
+        stub_server.handlers['getTasks'] = lambda api_key: success()
+
+        for _ in range(kimai.BATCH_REJECTIONS):
+            kimai.get_projects_and_tasks()
+
+        assert config.get('BatchRequests') is False
+
+    def test_unanswered_writes_are_not_sent_again(self, stub_server):
+        added = []
+
+        def add(api_key, record):
+            added.append(record)
+            if len(added) == 2:
+                raise RuntimeError('::error::')
+            return success([{'id': len(added)}])
+
+        stub_server.handlers['setTimesheetRecord'] = add
+        start, end = datetime(2018, 8, 5, 9), datetime(2018, 8, 5, 10)
+
+        responses = kimai.send_batch([kimai.add_payload(start, end, 1, 2) for _ in range(3)])
+
+        assert 3 == len(added)
+        assert [True, False, True] == [r.successful for r in responses]
+        assert [True, False, True] == [r.answered for r in responses]
+
+    def test_unanswered_reads_are_sent_again(self, stub_server):
+        calls = []
+
+        def get_projects(api_key):
+            calls.append(api_key)
+            if len(calls) == 1:
+                raise RuntimeError('::error::')
+            return success([{'projectID': 1}])
+
+        stub_server.handlers['getProjects'] = get_projects
+        stub_server.handlers['getTasks'] = lambda api_key: success([{'activityID': 2}])
+
+        projects, tasks = kimai.get_projects_and_tasks()
+
+        assert [{'projectID': 1}] == projects
+        assert 2 == len(calls)
+
+    def test_deleting_several_records_takes_two_round_trips(self, stub_server):
+        config.set('User', {'Id': '1', 'ApiKey': '::api-key::'})
+        serve_records(stub_server, {1: timesheet_item(1), 2: timesheet_item(2), 3: timesheet_item(3)})
+
+        responses = kimai.delete_records([1, 2, 3])
+
+        assert all(r.successful for r in responses.values())
+        assert 2 == stub_server.requests
+        assert 3 == stub_server.calls.count('removeTimesheetRecord')
+
+    def test_editing_a_record_fetches_it_once(self, stub_server):
+        config.set('User', {'Id': '1', 'ApiKey': '::api-key::'})
+        serve_records(stub_server, {1: timesheet_item(1)})
+        stub_server.handlers['setTimesheetRecord'] = lambda api_key, record, record_id: success()
+
+        assert kimai.comment_on_record(1, '::comment::').successful
+        assert ['getTimesheetRecord', 'setTimesheetRecord'] == stub_server.calls
+
+    def test_records_of_other_users_are_not_deleted(self, stub_server):
+        serve_records(stub_server, {1: timesheet_item(1), 2: timesheet_item(2, user_id=2)})
+
+        responses = kimai.delete_records([1, 2, 3])
+
+        assert responses[1].successful
+        assert 'You are not authorized to edit this record' == responses[2].error
+        assert 'No record exists for id 3' == responses[3].error
+        assert 1 == stub_server.calls.count('removeTimesheetRecord')
+
+
+class TestRequestScope(object):
+
+    def test_read_requests_are_sent_once(self, stub_server):
+        serve_records(stub_server, {1: timesheet_item(1), 2: timesheet_item(2)})
+
+        with kimai.request_scope():
+            kimai.get_single_record(1)
+            kimai.get_single_record(1)
+            kimai.send_batch([kimai.record_payload(1), kimai.record_payload(2)])
+
+        kimai.get_single_record(1)
+
+        assert ['getTimesheetRecord'] * 3 == stub_server.calls
+
+    def test_writes_forget_all_responses(self, stub_server):
+        serve_records(stub_server, {1: timesheet_item(1)})
+
+        with kimai.request_scope():
+            kimai.get_single_record(1)
+            kimai.send_request(kimai.delete_payload(1))
+            kimai.get_single_record(1)
+
+        assert ['getTimesheetRecord', 'removeTimesheetRecord', 'getTimesheetRecord'] == stub_server.calls
+
+
+class TestCurrentRecording(object):
+
+    def test_start_takes_the_id_from_the_response(self, kimai_server):
+        kimai.start_recording(1, 2)
+
+        assert ['startRecord'] == kimai_server.calls
+        assert str(kimai_server.backend.active[1]) == config.get('CurrentEntry')
+
+    def test_is_answered_locally_while_fresh(self, kimai_server):
+        kimai.start_recording(1, 2)
+
+        first = kimai.get_current(cached=True)
+        second = kimai.get_current(cached=True)
+
+        assert first.id == second.id == config.get('CurrentEntry')
+        assert ['startRecord', 'getActiveRecording'] == kimai_server.calls
+
+    def test_stale_snapshots_are_not_used(self, kimai_server):
+        kimai.start_recording(1, 2)
+        kimai.get_current(cached=True)
+        config.set('CacheTTL', 0)
+
+        kimai.get_current(cached=True)
+
+        assert 2 == kimai_server.calls.count('getActiveRecording')
+
+    def test_snapshots_of_another_account_are_not_used(self, kimai_server):
+        kimai.start_recording(1, 2)
+        kimai.get_current(cached=True)
+        config.set('ApiKey', '::other-api-key::')
+
+        kimai.get_current(cached=True)
+
+        assert 2 == kimai_server.calls.count('getActiveRecording')
+
+    def test_nothing_running(self, kimai_server):
+        assert kimai.get_current(cached=True) is None
+        assert kimai.get_current(cached=True) is None
+        assert ['getActiveRecording'] == kimai_server.calls
+
+        # Stopping does not trust the snapshot.
+        assert kimai.stop_recording() is None
+
+    def test_stop_forgets_the_running_record(self, kimai_server):
+        kimai.start_recording(1, 2)
+        kimai.stop_recording()
+
+        assert kimai.get_current(cached=True) is None
+        assert ['startRecord', 'getTimesheetRecord', 'stopRecord'] == kimai_server.calls
+
+
+class TestCurrentUser(object):
+
+    def test_is_resolved_once(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([timesheet_item(1, user_id='7')])
+
+        assert '7' == kimai.current_user_id()
+        assert '7' == kimai.current_user_id()
+        assert 1 == stub_server.requests
+
+    def test_is_resolved_again_when_the_api_key_changes(self, stub_server):
+        config.set('User', {'Id': '7', 'ApiKey': '::old-api-key::'})
+        stub_server.handlers['getTimesheet'] = lambda *args: success([timesheet_item(1, user_id='8')])
+
+        assert '8' == kimai.current_user_id()
+        assert {'Id': '8', 'ApiKey': '::api-key::'} == config.get('User')
+
+    def test_is_cached_as_a_string(self, stub_server):
+        kimai.remember_user_id(7)
+        assert '7' == kimai.cached_user_id()
+
+        config.set('User', {'Id': 7, 'ApiKey': '::api-key::'})
+        assert '7' == kimai.cached_user_id()
+
+    def test_falls_back_to_the_only_user(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+        stub_server.handlers['getUsers'] = lambda api_key: success([{'userID': '3'}])
+
+        assert '3' == kimai.current_user_id()
+
+    def test_is_unknown_without_records_and_several_users(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+        stub_server.handlers['getUsers'] = lambda api_key: success([{'userID': '3'}, {'userID': '4'}])
+
+        assert kimai.current_user_id() is None
+        assert config.get('User') is None
+
+
+class TestTimesheetPaging(object):
+
+    def serve_timesheet(self, server, count):
+        items = [timesheet_item(i) for i in range(count)]
+
+        def get_timesheet(api_key, start_date, end_date, cleared, offset, limit):
+            return success(items[int(offset):int(offset) + int(limit)])
+
+        server.handlers['getTimesheet'] = get_timesheet
+
+    def test_walks_all_pages(self, stub_server):
+        self.serve_timesheet(stub_server, 25)
+
+        records = list(kimai.iter_timesheet(page_size=10, adaptive=False))
+
+        assert list(range(25)) == [r.id for r in records]
+        assert 3 == stub_server.requests
+
+    def test_failed_pages_raise_an_error(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: failure('::error::')
+
+        with pytest.raises(RuntimeError, match='::error::'):
+            list(kimai.iter_timesheet_pages())
+
+    def test_pages_are_fetched_lazily(self, stub_server):
+        self.serve_timesheet(stub_server, 25)
+
+        records = kimai.iter_timesheet(page_size=10, adaptive=False)
+        next(records)
+
+        assert 1 == stub_server.requests
+
+    def test_page_size_adapts_to_latency(self):
+        assert 200 == kimai.adapt_page_size(100, kimai.TARGET_PAGE_LATENCY / 10)
+        assert 100 == kimai.adapt_page_size(100, kimai.TARGET_PAGE_LATENCY * 0.75)
+        assert 50 == kimai.adapt_page_size(100, kimai.TARGET_PAGE_LATENCY * 2)
+        assert kimai.MAX_PAGE_SIZE == kimai.adapt_page_size(kimai.MAX_PAGE_SIZE, 0)
+        assert kimai.MIN_PAGE_SIZE == kimai.adapt_page_size(kimai.MIN_PAGE_SIZE, 10)
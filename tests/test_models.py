@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from kimai.models import create_record
+
+from .test_kimai import timesheet_item
+
+
+class TestCreateRecord(object):
+
+    def test_records_share_projects_tasks_and_customers(self):
+        first = create_record(timesheet_item(1))
+        second = create_record(timesheet_item(2))
+
+        assert first.project is second.project
+        assert first.task is second.task
+        assert first.customer is second.customer
+
+    def test_renamed_projects_are_not_shared(self):
+        renamed = dict(timesheet_item(2), projectName='Renamed')
+
+        first = create_record(timesheet_item(1))
+        second = create_record(renamed)
+
+        assert 'Project' == first.project.name
+        assert 'Renamed' == second.project.name
+
+    def test_records_have_no_instance_dict(self):
+        record = create_record(timesheet_item(1))
+
+        assert not hasattr(record, '__dict__')
+        assert '1' == record.user_id
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from kimai.output import write_rows, write_table
+
+
+ROWS = [
+    ['1', datetime(2018, 8, 6, 9), timedelta(hours=2), 'Website'],
+    ['2', datetime(2018, 8, 6, 13), timedelta(minutes=90), None],
+]
+HEADERS = ['Id', 'Start', 'Duration', 'Project']
+
+
+def render(output, rows=ROWS, **kwargs):
+    file = io.StringIO()
+    write_rows(rows, HEADERS, output, file=file, **kwargs)
+    return file.getvalue()
+
+
+class TestWriteRows(object):
+
+    def test_jsonl(self):
+        lines = render('jsonl').splitlines()
+
+        assert {'Id': '1', 'Start': '2018-08-06T09:00:00', 'Duration': 7200, 'Project': 'Website'} == json.loads(lines[0])
+        assert json.loads(lines[1])['Project'] is None
+
+    def test_csv_and_tsv(self):
+        assert 'Id,Start,Duration,Project\n1,2018-08-06T09:00:00,7200,Website\n' == render('csv', ROWS[:1])
+        assert 'Id\tStart\tDuration\tProject\n2\t2018-08-06T13:00:00\t5400\t\n' == render('tsv', ROWS[1:])
+
+    def test_table_uses_the_display_format(self):
+        table = render('table', display=lambda row: [row[0], row[1].strftime('%H:%M'), '', row[3]])
+
+        assert '| 1  | 09:00 |          | Website |' in table.splitlines()
+
+    def test_unknown_formats_are_rejected(self):
+        with pytest.raises(ValueError):
+            render('xml')
+
+
+class TestWriteTable(object):
+
+    def test_rows_after_the_window_are_cut_to_its_widths(self):
+        file = io.StringIO()
+
+        write_table([['a'], ['b'], ['a much longer cell']], ['Name'], file, window=2)
+
+        assert '| a m… |' in file.getvalue()
+
+    def test_long_cells_are_capped(self):
+        file = io.StringIO()
+
+        write_table([['x' * 50]], ['Name'], file, max_width=10)
+
+        assert '| xxxxxxxxx… |' in file.getvalue()
+
+    def test_rows_are_written_as_they_arrive(self):
+        file = io.StringIO()
+
+        def rows():
+            yield ['a']
+            yield ['b']
+            raise RuntimeError('::stop::')
+
+        with pytest.raises(RuntimeError):
+            write_table(rows(), ['Name'], file, window=1)
+
+        assert '| a    |' in file.getvalue()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from kimai.report import Report, format_duration
+
+
+def item(start, end, customer='Customer', project='Project', task='Task', user_id='1'):
+    return {
+        'timeEntryID': '1',
+        'start': str(int(start.timestamp())),
+        'end': str(int(end.timestamp())) if end else '0',
+        'customerName': customer,
+        'projectName': project,
+        'activityName': task,
+        'userID': user_id,
+    }
+
+
+ITEMS = [
+    item(datetime(2018, 8, 6, 9), datetime(2018, 8, 6, 11), project='Website'),
+    item(datetime(2018, 8, 6, 13), datetime(2018, 8, 6, 14), project='App'),
+    item(datetime(2018, 8, 7, 9), datetime(2018, 8, 7, 9, 30), project='Website'),
+    item(datetime(2018, 8, 13, 9), datetime(2018, 8, 13, 10), customer='Other', project='Support'),
+]
+
+
+class TestReport(object):
+
+    def test_groups_are_summed_up(self):
+        report = Report(['project']).add_all(ITEMS)
+
+        assert [
+            (('App',), 3600, 1),
+            (('Support',), 3600, 1),
+            (('Website',), 9000, 2),
+            ((None,), 16200, 4),
+        ] == list(report.rows())
+
+    def test_nested_groups_are_followed_by_subtotals(self):
+        report = Report(['customer', 'project']).add_all(ITEMS)
+
+        assert [
+            (('Customer', 'App'), 3600, 1),
+            (('Customer', 'Website'), 9000, 2),
+            (('Customer', None), 12600, 3),
+            (('Other', 'Support'), 3600, 1),
+            (('Other', None), 3600, 1),
+            ((None, None), 16200, 4),
+        ] == list(report.rows())
+
+    def test_days_and_weeks(self):
+        days = Report(['day']).add_all(ITEMS)
+        weeks = Report(['week']).add_all(ITEMS)
+
+        assert {('2018-08-06',): [10800, 2], ('2018-08-07',): [1800, 1], ('2018-08-13',): [3600, 1]} == days.totals
+        assert {('2018-W32',): [12600, 3], ('2018-W33',): [3600, 1]} == weeks.totals
+
+    def test_running_records_count_until_now(self):
+        start = datetime(2018, 8, 6, 9)
+        report = Report(['task'], now=start.timestamp() + 600).add_all([item(start, None)])
+
+        assert (600, 1) == report.total
+
+    def test_records_are_cut_at_the_edges_of_the_range(self):
+        start, end = datetime(2018, 8, 6, 10), datetime(2018, 8, 7, 9, 15)
+        report = Report(['project'], start=start.timestamp(), end=end.timestamp()).add_all(ITEMS[:3])
+
+        assert {('Website',): [3600 + 900, 2], ('App',): [3600, 1]} == report.totals
+
+    def test_unknown_groups_are_rejected(self):
+        with pytest.raises(ValueError):
+            Report(['project', 'planet'])
+
+    def test_format_duration(self):
+        assert '0:00' == format_duration(0)
+        assert '26:05' == format_duration(26 * 3600 + 5 * 60 + 59)
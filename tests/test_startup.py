@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules that must never be imported just to start the CLI.
+HEAVY_MODULES = ['requests', 'prompt_toolkit', 'tabulate', 'fuzzyfinder', 'parsedatetime']
+
+# Time budget in seconds for importing the CLI and dispatching a command,
+# not counting the startup of the interpreter itself. A run over budget is
+# retried a few times so that a busy machine doesn't fail the test.
+STARTUP_BUDGET = 0.1
+ATTEMPTS = 3
+
+SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from kimai.cli import cli
+try:
+    cli(sys.argv[1:], prog_name='kimai')
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - started
+print(json.dumps({'elapsed': elapsed, 'modules': sorted(sys.modules)}))
+'''
+
+
+def command_paths(command, path=()):
+    yield path
+
+    for name, sub_command in getattr(command, 'commands', {}).items():
+        yield from command_paths(sub_command, path + (name,))
+
+
+def start(tmp_path, *args):
+    env = dict(os.environ, HOME=str(tmp_path), KIMAI_CONFIG_PATH=str(tmp_path / 'config'))
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT] + list(args), env=env)
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def all_command_paths():
+    from kimai.cli import cli
+    return list(command_paths(cli))
+
+
+@pytest.mark.parametrize('path', all_command_paths(), ids=' '.join)
+def test_help_does_not_import_heavy_modules(tmp_path, path):
+    result = start(tmp_path, *path, '--help')
+    elapsed = result['elapsed']
+
+    for _ in range(ATTEMPTS - 1):
+        if elapsed < STARTUP_BUDGET:
+            break
+        elapsed = min(elapsed, start(tmp_path, *path, '--help')['elapsed'])
+
+    assert [] == [m for m in HEAVY_MODULES if m in result['modules']]
+    assert elapsed < STARTUP_BUDGET
+
+
+@pytest.mark.parametrize('args', [['--version'], ['--help']])
+def test_config_is_not_parsed_for_version_and_help(tmp_path, args):
+    (tmp_path / 'config').write_text('KimaiUrl: http://localhost\n')
+
+    result = start(tmp_path, *args)
+
+    assert 'yaml' not in result['modules']
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from kimai import kimai
+from kimai.config import config
+from kimai.store import TimesheetStore
+
+from .stub_server import failure, success
+from .test_kimai import timesheet_item
+
+
+def item(record_id, start, end):
+    data = timesheet_item(record_id)
+    data['start'] = str(int(start.timestamp()))
+    data['end'] = str(int(end.timestamp())) if end else '0'
+    return data
+
+
+class TestTimesheetStore(object):
+
+    def test_returns_records_overlapping_the_range(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [
+            item(1, datetime(2018, 8, 4, 10), datetime(2018, 8, 4, 12)),
+            item(2, datetime(2018, 8, 5, 23), datetime(2018, 8, 6, 1)),
+            item(3, datetime(2018, 8, 7, 9), None),
+        ])
+
+        items = store.items(datetime(2018, 8, 6), datetime(2018, 8, 8))
+
+        assert [3, 2] == [i['timeEntryID'] for i in items]
+
+    def test_range_is_fresh_after_sync(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [])
+
+        assert store.is_fresh(datetime(2018, 8, 2), datetime(2018, 8, 3))
+        assert not store.is_fresh(datetime(2018, 8, 2), datetime(2018, 8, 11))
+        assert not store.is_fresh(datetime(2018, 8, 2), datetime(2018, 8, 3), ttl=-1)
+
+    def test_replacing_a_range_removes_deleted_records(self):
+        store = TimesheetStore()
+        start, end = datetime(2018, 8, 1), datetime(2018, 8, 10)
+        store.replace_range(start, end, [item(1, datetime(2018, 8, 4, 10), datetime(2018, 8, 4, 12))])
+
+        store.replace_range(start, end, [])
+
+        assert [] == store.items(start, end)
+
+    def test_invalidating_marks_everything_stale(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [])
+
+        store.invalidate()
+
+        assert not store.is_fresh(datetime(2018, 8, 2), datetime(2018, 8, 3))
+
+
+    def test_only_the_parts_not_synced_are_missing(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 5), datetime(2018, 8, 10), [])
+
+        assert [
+            (datetime(2018, 8, 1), datetime(2018, 8, 4, 23, 59, 59)),
+            (datetime(2018, 8, 10, 0, 0, 1), datetime(2018, 8, 12)),
+        ] == store.missing(datetime(2018, 8, 1), datetime(2018, 8, 12))
+
+    def test_settled_history_stays_fresh_longer(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [])
+
+        assert [] == store.missing(datetime(2018, 8, 2), datetime(2018, 8, 3), ttl=-1)
+        assert 1 == len(store.missing(datetime(2018, 8, 2), datetime(2018, 8, 3), ttl=-1, history_ttl=-1))
+
+    def test_recent_records_are_not_settled(self):
+        store = TimesheetStore()
+        now = datetime.now().replace(microsecond=0)
+        store.replace_range(now - timedelta(days=3), now, [])
+
+        missing = store.missing(now - timedelta(days=3), now, ttl=-1)
+
+        assert 1 == len(missing)
+        assert now == missing[0][1]
+        assert now - timedelta(days=2) < missing[0][0] < now
+
+    def test_invalidating_a_record_marks_only_its_time_stale(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [
+            item(1, datetime(2018, 8, 4, 10), datetime(2018, 8, 4, 12)),
+        ])
+
+        store.invalidate(record_id=1)
+
+        assert [
+            (datetime(2018, 8, 4, 10), datetime(2018, 8, 4, 12)),
+        ] == store.missing(datetime(2018, 8, 1), datetime(2018, 8, 10))
+
+    def test_invalidating_a_span_without_end_marks_everything_after_it_stale(self):
+        store = TimesheetStore()
+        store.replace_range(datetime(2018, 8, 1), datetime(2018, 8, 10), [])
+
+        store.invalidate(span=(datetime(2018, 8, 8), None))
+
+        assert store.is_fresh(datetime(2018, 8, 1), datetime(2018, 8, 7))
+        assert not store.is_fresh(datetime(2018, 8, 9), datetime(2018, 8, 10))
+
+    def test_claiming_for_another_owner_empties_the_store(self):
+        store = TimesheetStore()
+        start, end = datetime(2018, 8, 1), datetime(2018, 8, 10)
+        store.claim('::first-owner::')
+        store.replace_range(start, end, [item(1, datetime(2018, 8, 4, 10), datetime(2018, 8, 4, 12))])
+
+        store.claim('::first-owner::')
+        assert 1 == len(store.items(start, end))
+
+        store.claim('::second-owner::')
+        assert [] == store.items(start, end)
+        assert not store.is_fresh(start, end)
+
+
+class TestCachedTimesheet(object):
+
+    def test_todays_records_are_read_locally_while_fresh(self, stub_server):
+        now = datetime.now().replace(microsecond=0)
+        stub_server.handlers['getTimesheet'] = lambda *args: success([item(1, now, None)])
+
+        first = kimai.get_todays_records()
+        second = kimai.get_todays_records()
+
+        assert [1] == [r.id for r in first] == [r.id for r in second]
+        assert 1 == stub_server.requests
+
+    def test_refresh_bypasses_the_store(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+
+        kimai.get_todays_records()
+        kimai.get_todays_records(refresh=True)
+
+        assert 2 == stub_server.requests
+
+    def test_writes_invalidate_the_store(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+        stub_server.handlers['setTimesheetRecord'] = lambda *args: success([{'id': 1}])
+
+        kimai.get_todays_records()
+        kimai.add_record(datetime.now(), datetime.now(), 1, 1)
+        kimai.get_todays_records()
+
+        assert ['getTimesheet', 'setTimesheetRecord', 'getTimesheet'] == stub_server.calls
+
+    def test_only_the_missing_part_of_a_range_is_fetched(self, stub_server):
+        ranges = []
+
+        def get_timesheet(api_key, start, end, *args):
+            ranges.append((start, end))
+            return success([])
+
+        stub_server.handlers['getTimesheet'] = get_timesheet
+
+        kimai.get_records_between(datetime(2018, 8, 5), datetime(2018, 8, 10))
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+
+        assert [
+            ('2018-08-05T00:00:00', '2018-08-10T00:00:00'),
+            ('2018-08-01T00:00:00', '2018-08-04T23:59:59'),
+        ] == ranges
+
+    def test_writes_only_invalidate_the_range_they_touch(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+        stub_server.handlers['setTimesheetRecord'] = lambda *args: success([{'id': 1}])
+
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+        kimai.add_record(datetime(2018, 9, 1, 10), datetime(2018, 9, 1, 12), 1, 1)
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+
+        assert ['getTimesheet', 'setTimesheetRecord'] == stub_server.calls
+
+    def test_changing_the_api_key_empties_the_store(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: success([item(1, datetime(2018, 8, 4), None)])
+
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+        config.set('ApiKey', '::other-api-key::')
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+
+        assert [] == kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+        assert ['getTimesheet', 'getTimesheet'] == stub_server.calls
+
+    def test_failed_syncs_leave_the_range_stale(self, stub_server):
+        stub_server.handlers['getTimesheet'] = lambda *args: failure('::error::')
+
+        with pytest.raises(RuntimeError):
+            kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+
+        stub_server.handlers['getTimesheet'] = lambda *args: success([])
+        kimai.get_records_between(datetime(2018, 8, 1), datetime(2018, 8, 10))
+
+        assert ['getTimesheet', 'getTimesheet'] == stub_server.calls
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import threading
+
+import pytest
+
+from kimai import trace
+from kimai.trace import NULL_SPAN, Tracer
+
+from .test_commands import run
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.5
+        return self.now
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = Tracer('::command::', clock=FakeClock())
+    monkeypatch.setattr(trace, '_tracer', tracer)
+    return tracer
+
+
+class TestTracer(object):
+
+    def test_spans_do_nothing_while_tracing_is_off(self):
+        assert NULL_SPAN is trace.span('::span::', size=1)
+
+    def test_spans_nest(self, tracer):
+        with trace.span('outer'):
+            with trace.span('inner', action='::action::') as span:
+                span.set(status=200)
+
+        outer, = tracer.root.children
+        inner, = outer.children
+
+        assert ('outer', 1.5) == (outer.name, outer.elapsed)
+        assert {'action': '::action::', 'status': 200} == inner.attributes
+
+    def test_spans_of_other_threads_belong_to_the_current_span(self, tracer):
+        def work():
+            with trace.span('worker'):
+                pass
+
+        with trace.span('command'):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        assert ['worker'] == [s.name for s in tracer.root.children[0].children]
+
+    def test_tree(self, tracer):
+        with trace.span('request', action='getTimesheet'):
+            pass
+
+        file = io.StringIO()
+        trace.write(tracer.finish(), 'tree', file)
+
+        lines = file.getvalue().splitlines()
+        assert lines[0].startswith('::command::')
+        assert lines[1].startswith('  request action=getTimesheet')
+        assert lines[1].endswith('500.0 ms')
+
+
+class TestCommand(object):
+
+    def test_trace_as_json(self, kimai_server, tmp_path):
+        path = tmp_path / 'trace.json'
+
+        run(kimai_server, '--trace', '--trace-format', 'json', '--trace-file', str(path), 'today', '--refresh')
+        trace.finish()
+
+        root = json.loads(path.read_text())
+        command = next(s for s in root['children'] if s['name'] == 'command')
+        names = [s['name'] for s in command['children']]
+
+        assert 'kimai today' == root['name']
+        assert ['request', 'records', 'render'] == names
+        assert {'action': 'getTimesheet', 'status': 200, 'successful': True} == {
+            k: v for k, v in command['children'][0]['attributes'].items() if k != 'bytes'
+        }
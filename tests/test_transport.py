@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from kimai import kimai
+from kimai.config import config
+from kimai.transport import get_transport, reset_transport
+
+from .stub_server import success
+
+
+class TestTransport(object):
+
+    def test_requests_reuse_a_single_connection(self, stub_server):
+        stub_server.handlers['getProjects'] = lambda api_key: success([])
+
+        for _ in range(5):
+            kimai.get_projects()
+
+        assert 5 == stub_server.requests
+        assert 1 == stub_server.connections
+
+    def test_authentication_uses_the_shared_session(self, stub_server):
+        stub_server.handlers['authenticate'] = lambda user, password: success([{'apiKey': '::key::'}])
+        stub_server.handlers['getTasks'] = lambda api_key: success([])
+
+        response = kimai.authenticate('::user::', '::password::')
+        kimai.get_tasks()
+
+        assert '::key::' == response.api_key
+        assert 1 == stub_server.connections
+
+    def test_transport_is_configured_from_config(self, stub_server):
+        config.set('Timeout', 3)
+        config.set('Compression', False)
+        reset_transport()
+
+        transport = get_transport()
+
+        assert 3 == transport.timeout
+        assert 'identity' == transport.session.headers['Accept-Encoding']
+
+    def test_compression_uses_the_encodings_requests_can_decode(self, stub_server):
+        from requests.utils import DEFAULT_ACCEPT_ENCODING
+
+        assert DEFAULT_ACCEPT_ENCODING == get_transport().session.headers['Accept-Encoding']